@@ -0,0 +1,74 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+# Per-lookup latency of the grid and STRtree /area paths vs. the previous linear bbox scan.
+#
+#   python benchmarks/bench_area_lookup.py [area_polygons.json]
+#
+# Uses the given file (or redalert.AREA_POLYGONS_FILE when present) so it can be
+# run against the full Israeli dataset; otherwise falls back to the synthetic
+# ~1,500-area dataset from synthetic_areas.py covering the same extent.
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+import redalert
+from shapely.geometry import Point
+from synthetic_areas import generate_area_data, random_points
+
+LOOKUPS = 20000
+
+
+def load_dataset(path: str) -> tuple:
+    if path and os.path.exists(path):
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f), path
+    return generate_area_data(), "synthetic"
+
+
+def linear_scan_lookup(lat: float, lon: float):
+    # Previous implementation: scan every bbox, then test candidates in dict order
+    candidates = []
+    for name, info in redalert.area_bbox_index.items():
+        min_lat, max_lat, min_lon, max_lon = info["bbox"]
+        if min_lat <= lat <= max_lat and min_lon <= lon <= max_lon:
+            candidates.append((name, info["migun_time"]))
+    if not candidates:
+        return None
+    point = Point(lon, lat)
+    for name, migun_time in candidates:
+        polygon = redalert.area_geometries.get(name)
+        if polygon is not None and polygon.contains(point):
+            return {"area": name, "migun_time": migun_time}
+    return None
+
+
+def bench(label: str, fn, points: list) -> list:
+    start = time.perf_counter()
+    results = [fn(lat, lon) for lat, lon in points]
+    elapsed = time.perf_counter() - start
+    print(f"{label:<12} {elapsed / len(points) * 1e6:10.1f} us/lookup  ({len(points)} lookups)")
+    return results
+
+
+def main():
+    path = sys.argv[1] if len(sys.argv) > 1 else redalert.AREA_POLYGONS_FILE
+    data, source = load_dataset(path)
+    redalert.apply_area_data(data)
+    print(f"dataset: {source} ({len(redalert.area_spatial_index.names)} areas)")
+
+    points = random_points(LOOKUPS)
+
+    grid = redalert.area_spatial_index.grid
+    scan_results = bench("dict scan", linear_scan_lookup, points)
+    redalert.area_spatial_index.grid = None
+    tree_results = bench("strtree", redalert.lookup_area, points)
+    redalert.area_spatial_index.grid = grid
+    grid_results = bench("grid", redalert.lookup_area, points)
+    mismatches = sum(1 for a, b, c in zip(scan_results, tree_results, grid_results) if not a == b == c)
+    print(f"mismatches: {mismatches}")
+
+
+if __name__ == '__main__':
+    main()
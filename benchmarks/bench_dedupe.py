@@ -0,0 +1,70 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+# Dedupe bookkeeping with 100k tracked alert IDs: front-only expiry vs. the
+# previous full scan, plus insert and duplicate-check cost.
+#
+#   python benchmarks/bench_dedupe.py
+import os
+import sys
+import time
+from collections import OrderedDict
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+import redalert
+
+IDS = 100_000
+EXPIRED = 1_000  # entries past ALERT_TTL at cleanup time
+
+
+def full_scan_cleanup(alerts: dict):
+    # Previous implementation: scan every entry on each cleanup
+    now = time.time()
+    to_remove = [aid for aid, ts in alerts.items() if now - ts > redalert.ALERT_TTL]
+    for aid in to_remove:
+        del alerts[aid]
+
+
+def populate() -> OrderedDict:
+    now = time.time()
+    alerts = OrderedDict()
+    for i in range(IDS):
+        # The first EXPIRED IDs are older than the TTL, the rest spread over the last hour
+        ts = now - redalert.ALERT_TTL - 60 if i < EXPIRED else now - redalert.ALERT_TTL + i * redalert.ALERT_TTL / IDS
+        alerts[f"1339081307{i:08d}"] = ts
+    return alerts
+
+
+def timed(label: str, fn, per: int = 1):
+    start = time.perf_counter()
+    fn()
+    elapsed = time.perf_counter() - start
+    unit = f"{elapsed / per * 1e6:8.2f} us/op" if per > 1 else f"{elapsed * 1e3:8.2f} ms"
+    print(f"{label:<28} {unit}")
+
+
+def main():
+    redalert.ALERT_MAX_ENTRIES = IDS * 2
+    print(f"{IDS} tracked IDs, {EXPIRED} expired")
+
+    alerts = populate()
+    timed("full scan cleanup", lambda: full_scan_cleanup(alerts))
+    assert len(alerts) == IDS - EXPIRED
+
+    redalert.alerts = populate()
+    timed("front-pop cleanup", redalert.cleanup_alerts)
+    assert len(redalert.alerts) == IDS - EXPIRED
+    timed("front-pop cleanup (no-op)", redalert.cleanup_alerts)
+
+    redalert.alerts = OrderedDict()
+    ids = [f"new-{i}" for i in range(IDS)]
+    timed("remember_alert", lambda: [redalert.remember_alert(i) for i in ids], IDS)
+    timed("is_new_alert (hit)", lambda: [redalert.is_new_alert(i) for i in ids], IDS)
+
+    redalert.ALERT_MAX_ENTRIES = IDS // 2
+    redalert.alerts = OrderedDict()
+    timed("remember_alert (evicting)", lambda: [redalert.remember_alert(i) for i in ids], IDS)
+    print(f"evicted: {redalert.dedupe_counters['evicted']}")
+
+
+if __name__ == '__main__':
+    main()
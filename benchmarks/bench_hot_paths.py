@@ -0,0 +1,163 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+# Hot-path benchmark suite with stable, diffable output for tracking between releases.
+#
+#   python benchmarks/bench_hot_paths.py [--json results.json] [--repeat 5]
+#
+# Everything runs offline: alerts.json responses and the MQTT client are
+# in-process fakes and areas come from synthetic_areas.py (fixed seeds).
+# Each case runs --repeat times; the median and best per-operation times are
+# reported.
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import sys
+import time
+from collections import OrderedDict
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+import redalert
+from synthetic_areas import generate_area_data, random_points
+
+AREA_NAMES = [f"אזור {i} - מרכז" for i in range(60)]
+
+
+class FakeResponse:
+    def __init__(self, body: bytes):
+        self.status = 200
+        self.headers = {}
+        self._body = body
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        pass
+
+    async def read(self):
+        return self._body
+
+
+class FakeSession:
+    # Serves the given bodies in turn, like consecutive alerts.json polls
+    def __init__(self, bodies: list):
+        self.bodies = bodies
+        self.calls = 0
+
+    async def get(self, url, headers=None):
+        body = self.bodies[self.calls % len(self.bodies)]
+        self.calls += 1
+        return FakeResponse(body)
+
+
+class FakeMqttClient:
+    async def publish(self, topic, payload, qos=0):
+        pass
+
+
+def alert_body(alert_id: int) -> bytes:
+    alert = {"id": str(alert_id), "cat": "1", "title": "ירי רקטות וטילים", "data": AREA_NAMES, "desc": "היכנסו למרחב המוגן"}
+    return ('\ufeff' + json.dumps(alert, ensure_ascii=False) + '\r\n').encode('utf-8')
+
+
+def measure(fn, ops: int, repeat: int, setup=None) -> tuple:
+    samples = []
+    for _ in range(repeat):
+        if setup is not None:
+            setup()
+        start = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - start) / ops)
+    return statistics.median(samples), min(samples)
+
+
+def run_async(coro_fn, ops: int):
+    async def batch():
+        for _ in range(ops):
+            await coro_fn()
+    return lambda: asyncio.run(batch())
+
+
+def bench_fetch_alert(repeat: int) -> dict:
+    ops = 5000
+    redalert.alert_sources = [redalert.AlertSource(redalert.url)]
+    changing = FakeSession([alert_body(i) for i in range(ops)])
+    unchanged = FakeSession([alert_body(0)])
+    return {
+        "fetch_alert.parse": measure(run_async(lambda: redalert.fetch_alert(changing), ops), ops, repeat),
+        "fetch_alert.unchanged": measure(run_async(lambda: redalert.fetch_alert(unchanged), ops), ops, repeat),
+    }
+
+
+def bench_is_test_alert(repeat: int) -> dict:
+    ops = 100000
+    alert = redalert.AlertObject(id="1", cat="1", title="t", data=AREA_NAMES, desc="d", raw_data="")
+    return {"is_test_alert": measure(lambda: [redalert.is_test_alert(alert) for _ in range(ops)], ops, repeat)}
+
+
+def bench_cleanup_alerts(repeat: int) -> dict:
+    ids, expired = 100000, 1000
+
+    def populate():
+        now = time.time()
+        redalert.alerts = OrderedDict(
+            (f"id-{i}", now - redalert.ALERT_TTL - 1 if i < expired else now) for i in range(ids))
+
+    saved_max, redalert.ALERT_MAX_ENTRIES = redalert.ALERT_MAX_ENTRIES, ids
+    results = {
+        "cleanup_alerts.100k_1pct_expired": measure(redalert.cleanup_alerts, 1, repeat, setup=populate),
+        "cleanup_alerts.100k_none_expired": measure(redalert.cleanup_alerts, 1, repeat),
+    }
+    redalert.ALERT_MAX_ENTRIES = saved_max
+    redalert.alerts = OrderedDict()
+    return results
+
+
+def bench_area_index(repeat: int) -> dict:
+    data = generate_area_data()
+    store = redalert.area_store_from_data(data)
+    redalert.apply_area_data(data)
+    lookups = 20000
+    points = random_points(lookups)
+    grid = redalert.area_spatial_index.grid
+    results = {
+        "area_store_from_data.1500": measure(lambda: redalert.area_store_from_data(data), 1, repeat),
+        "build_bbox_index.1500": measure(lambda: redalert.build_bbox_index(store), 1, repeat),
+        "lookup_area.grid": measure(lambda: [redalert.lookup_area(lat, lon) for lat, lon in points], lookups, repeat),
+    }
+    redalert.area_spatial_index.grid = None
+    results["lookup_area.strtree"] = measure(lambda: [redalert.lookup_area(lat, lon) for lat, lon in points], lookups, repeat)
+    redalert.area_spatial_index.grid = grid
+    return results
+
+
+def bench_publish_alert(repeat: int) -> dict:
+    ops = 5000
+    client = FakeMqttClient()
+    alert = redalert.parse_alert(alert_body(1).decode('utf-8-sig').strip())
+    return {"publish_alert": measure(run_async(lambda: redalert.publish_alert(client, alert), ops), ops, repeat)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the redalert hot paths")
+    parser.add_argument("--json", help="also write {case: median_us} to this file")
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+    redalert.logger.setLevel("WARNING")
+
+    results = {}
+    for bench in (bench_fetch_alert, bench_is_test_alert, bench_cleanup_alerts, bench_area_index, bench_publish_alert):
+        results.update(bench(args.repeat))
+
+    print(f"{'case':<36} {'median':>12} {'best':>12}")
+    for name, (median, best) in results.items():
+        print(f"{name:<36} {median * 1e6:9.2f} us {best * 1e6:9.2f} us")
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump({name: round(median * 1e6, 3) for name, (median, _) in results.items()}, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,70 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+# Parse/serialize cost of each JSON backend on alert payloads and the area file.
+#
+#   python benchmarks/bench_json.py [area_polygons.json]
+#
+# Uses the given file (or redalert.AREA_POLYGONS_FILE when present); otherwise the
+# synthetic dataset from synthetic_areas.py is written to a temp file first (removed afterwards).
+import json
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+import redalert
+from synthetic_areas import generate_area_data
+
+ALERT_ROUNDS = 20000
+AREA_ROUNDS = 5
+# Shape of a real multi-area alerts.json body
+ALERT_PAYLOAD = {
+    "id": "133908130700000000",
+    "cat": "1",
+    "title": "ירי רקטות וטילים",
+    "data": [f"אזור {i} - מרכז" for i in range(60)],
+    "desc": "היכנסו למרחב המוגן ושהו בו 10 דקות",
+}
+
+
+def area_file(path: str, tmp_dir: str) -> str:
+    if path and os.path.exists(path):
+        return path
+    tmp_path = os.path.join(tmp_dir, "area_polygons.json")
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(generate_area_data(), f, ensure_ascii=False)
+    return tmp_path
+
+
+def timed(fn, rounds: int) -> float:
+    start = time.perf_counter()
+    for _ in range(rounds):
+        fn()
+    return (time.perf_counter() - start) / rounds
+
+
+def main():
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        path = area_file(sys.argv[1] if len(sys.argv) > 1 else redalert.AREA_POLYGONS_FILE, tmp_dir)
+        with open(path, 'rb') as f:
+            area_bytes = f.read()
+    alert_text = json.dumps(ALERT_PAYLOAD, ensure_ascii=False)
+    area_data = json.loads(area_bytes)
+    print(f"alert payload: {len(alert_text.encode('utf-8'))} bytes, area file: {len(area_bytes) / 1e6:.1f} MB ({len(area_data)} areas)")
+
+    backends = ["json"] + (["orjson"] if redalert.orjson is not None else [])
+    for backend in backends:
+        redalert.json_backend = backend
+        alert_loads = timed(lambda: redalert.parse_alert(alert_text), ALERT_ROUNDS)
+        alert_dumps = timed(lambda: redalert.json_dumps({"title": ALERT_PAYLOAD["title"], "data": ALERT_PAYLOAD["data"], "desc": ALERT_PAYLOAD["desc"]}), ALERT_ROUNDS)
+        area_loads = timed(lambda: redalert.json_loads(area_bytes), AREA_ROUNDS)
+        area_dumps = timed(lambda: redalert.json_dumps(area_data), AREA_ROUNDS)
+        print(f"{backend:<8} alert parse {alert_loads * 1e6:7.1f} us  alert publish {alert_dumps * 1e6:7.1f} us  "
+              f"area load {area_loads * 1e3:8.1f} ms  area save {area_dumps * 1e3:8.1f} ms")
+    if redalert.orjson is None:
+        print("orjson is not installed; pip install orjson to compare")
+
+
+if __name__ == '__main__':
+    main()
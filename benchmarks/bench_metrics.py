@@ -0,0 +1,67 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+# Cost of the /metrics instrumentation on the poll path, and of rendering /metrics.
+#
+#   python benchmarks/bench_metrics.py
+#
+# Runs poll_once() against an instant in-process fetch_alert, with the
+# histograms live and with them swapped for no-ops, so the difference is the
+# instrumentation overhead per poll.
+import asyncio
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+import redalert
+
+POLLS = 50000
+
+
+class NoopHistogram:
+    def observe(self, seconds: float):
+        pass
+
+
+async def instant_fetch(session):
+    return redalert.AlertObject(id="1", cat="1", title="t", data=["Area 1"], desc="d", raw_data="{}")
+
+
+async def run_polls() -> float:
+    scheduler = redalert.PollScheduler(1, 1, 1)
+    queue = asyncio.Queue()
+    start = time.perf_counter()
+    for _ in range(POLLS):
+        await redalert.poll_once(None, queue, scheduler, scheduler.next_seq())
+    return (time.perf_counter() - start) / POLLS
+
+
+def main():
+    redalert.fetch_alert = instant_fetch
+    redalert.alerts.clear()
+
+    hist = redalert.Histogram((0.05, 0.1, 0.25, 0.5, 1, 2, 4, 8))
+    start = time.perf_counter()
+    for i in range(POLLS):
+        hist.observe(i * 1e-5)
+    print(f"Histogram.observe       {(time.perf_counter() - start) / POLLS * 1e6:8.3f} us")
+
+    asyncio.run(run_polls())  # warm-up
+    live = asyncio.run(run_polls())
+    saved = dict(redalert.metric_histograms)
+    for name in redalert.metric_histograms:
+        redalert.metric_histograms[name] = NoopHistogram()
+    noop = asyncio.run(run_polls())
+    redalert.metric_histograms.update(saved)
+    print(f"poll_once, metrics on   {live * 1e6:8.3f} us")
+    print(f"poll_once, metrics off  {noop * 1e6:8.3f} us")
+    print(f"overhead per poll       {(live - noop) * 1e6:8.3f} us ({(live - noop) / redalert.POLL_INTERVAL * 100:.5f}% of a {redalert.POLL_INTERVAL:g}s interval)")
+
+    start = time.perf_counter()
+    for _ in range(1000):
+        text = redalert.render_metrics()
+    print(f"render_metrics          {(time.perf_counter() - start) / 1000 * 1e6:8.1f} us ({len(text)} bytes)")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,273 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+# End-to-end load harness: runs the real monitor() against a stand-in
+# alerts.json server and an in-process MQTT broker, drives a scripted alert
+# timeline and reports detection latency, publish latency and missed or
+# duplicate alerts.
+#
+#   python benchmarks/load_harness.py [--scenario steps.json] [--poll-interval 0.25]
+#
+# A scenario is a JSON list of steps applied at "at" seconds after start:
+#   {"at": 0.5, "alert": {"id": "1", "cat": "1", "title": "...", "data": [...], "desc": "..."}}
+#   {"at": 2.0, "alert": null}      -> empty alerts.json body
+#   {"at": 3.0, "delay": 1.5}       -> delay every response by 1.5s from now on
+# Without --scenario a built-in timeline is used: a 300-area salvo that grows
+# under the same ID, empty bodies, rapid ID changes and a slow-response window.
+import argparse
+import asyncio
+import json
+import os
+import random
+import struct
+import sys
+import time
+
+import aiohttp.web
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+import redalert
+from synthetic_areas import generate_area_data
+
+
+class FakeBroker:
+    # Just enough MQTT 3.1.1 for a publishing client: CONNECT, PUBLISH (QoS 0-2), PINGREQ, DISCONNECT
+    def __init__(self):
+        self.messages = []  # (monotonic receive time, topic, payload)
+        self.connected = asyncio.Event()
+        self.clients = {}  # handler task -> writer
+        self.server = None
+        self.port = None
+
+    async def start(self):
+        self.server = await asyncio.start_server(self.handle, "127.0.0.1", 0)
+        self.port = self.server.sockets[0].getsockname()[1]
+
+    async def stop(self):
+        self.server.close()
+        for writer in self.clients.values():
+            writer.close()
+        await asyncio.gather(*self.clients, return_exceptions=True)
+        await self.server.wait_closed()
+
+    async def read_packet(self, reader) -> tuple:
+        header = (await reader.readexactly(1))[0]
+        length, shift = 0, 0
+        while True:
+            byte = (await reader.readexactly(1))[0]
+            length |= (byte & 0x7F) << shift
+            shift += 7
+            if not byte & 0x80:
+                break
+        return header >> 4, header & 0x0F, await reader.readexactly(length)
+
+    async def handle(self, reader, writer):
+        self.clients[asyncio.current_task()] = writer
+        try:
+            while True:
+                packet_type, flags, body = await self.read_packet(reader)
+                if packet_type == 1:  # CONNECT
+                    writer.write(b"\x20\x02\x00\x00")
+                    self.connected.set()
+                elif packet_type == 3:  # PUBLISH
+                    received_at = time.monotonic()
+                    qos = (flags >> 1) & 0x03
+                    topic_length = struct.unpack("!H", body[:2])[0]
+                    topic = body[2:2 + topic_length].decode('utf-8')
+                    offset = 2 + topic_length
+                    if qos:
+                        packet_id = body[offset:offset + 2]
+                        offset += 2
+                        writer.write((b"\x40\x02" if qos == 1 else b"\x50\x02") + packet_id)
+                    self.messages.append((received_at, topic, body[offset:].decode('utf-8')))
+                elif packet_type == 6:  # PUBREL
+                    writer.write(b"\x70\x02" + body[:2])
+                elif packet_type == 8:  # SUBSCRIBE
+                    writer.write(b"\x90\x03" + body[:2] + b"\x00")
+                elif packet_type == 12:  # PINGREQ
+                    writer.write(b"\xd0\x00")
+                elif packet_type == 14:  # DISCONNECT
+                    break
+                await writer.drain()
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            writer.close()
+            self.clients.pop(asyncio.current_task(), None)
+
+
+class FakeOref:
+    # Serves the scenario's current alerts.json body, optionally slowed down
+    def __init__(self):
+        self.body = b""
+        self.delay = 0.0
+        self.requests = 0
+        self.runner = None
+        self.url = None
+
+    async def handler(self, request):
+        self.requests += 1
+        body, delay = self.body, self.delay
+        if delay:
+            await asyncio.sleep(delay)
+        return aiohttp.web.Response(body=body, content_type="application/json")
+
+    async def start(self):
+        app = aiohttp.web.Application()
+        app.router.add_get("/alerts.json", self.handler)
+        self.runner = aiohttp.web.AppRunner(app, access_log=None)
+        await self.runner.setup()
+        site = aiohttp.web.TCPSite(self.runner, "127.0.0.1", 0)
+        await site.start()
+        port = self.runner.addresses[0][1]
+        self.url = f"http://127.0.0.1:{port}/alerts.json"
+
+    async def stop(self):
+        await self.runner.cleanup()
+
+    def show(self, alert):
+        self.body = b"" if alert is None else ('﻿' + json.dumps(alert, ensure_ascii=False)).encode('utf-8')
+
+
+def default_scenario(seed: int = 1) -> list:
+    rng = random.Random(seed)
+    names = list(generate_area_data(600, seed))
+
+    def alert(alert_id, areas):
+        return {"id": alert_id, "cat": "1", "title": "ירי רקטות וטילים", "data": areas, "desc": "היכנסו למרחב המוגן"}
+
+    steps = [
+        {"at": 0.5, "alert": alert("salvo", names[:300])},
+        {"at": 1.5, "alert": alert("salvo", names[:400])},  # same ID, 100 more areas
+        {"at": 2.5, "alert": None},
+    ]
+    at = 3.0
+    for i in range(8):  # rapid ID changes
+        steps.append({"at": at, "alert": alert(f"rapid-{i}", rng.sample(names, rng.randint(5, 20)))})
+        at += 0.4
+    steps += [
+        {"at": at, "alert": None},
+        {"at": at + 0.5, "delay": 1.5},
+        {"at": at + 1.0, "alert": alert("slow", names[400:450])},
+        {"at": at + 3.0, "delay": 0.0},
+        {"at": at + 4.0, "alert": None},
+    ]
+    return steps
+
+
+async def run_scenario(steps: list, poll_interval: float, grace: float = 3.0) -> dict:
+    broker, oref = FakeBroker(), FakeOref()
+    await broker.start()
+    await oref.start()
+
+    redalert.server, redalert.port = "127.0.0.1", broker.port
+    redalert.alert_sources = [redalert.AlertSource(oref.url)]
+    redalert.POLL_INTERVAL = poll_interval
+    redalert.KEEPALIVE_INTERVAL = 3600
+    redalert.alerts.clear()
+    redalert.alert_areas.clear()
+
+    # Record when each alert (or delta) leaves the dedupe stage
+    enqueued = {}
+    enqueue_alert = redalert.enqueue_alert
+
+    def recording_enqueue(queue, alert):
+        enqueued.setdefault((alert.id, alert.delta), time.monotonic())
+        enqueue_alert(queue, alert)
+    redalert.enqueue_alert = recording_enqueue
+
+    monitor = asyncio.create_task(redalert.monitor())
+    try:
+        await asyncio.wait_for(broker.connected.wait(), timeout=10)
+        visible = {}  # alert id -> monotonic time it first appeared
+        added_visible = {}  # alert id -> time its area list first grew
+        areas = {}  # alert id -> every area the scenario showed under it
+        start = time.monotonic()
+        for step in sorted(steps, key=lambda s: s["at"]):
+            await asyncio.sleep(max(start + step["at"] - time.monotonic(), 0))
+            if "delay" in step:
+                oref.delay = step["delay"]
+            if "alert" in step:
+                alert = step["alert"]
+                oref.show(alert)
+                if alert is not None:
+                    now = time.monotonic()
+                    if alert["id"] not in visible:
+                        visible[alert["id"]] = now
+                    elif not set(alert["data"]) <= areas[alert["id"]]:
+                        added_visible.setdefault(alert["id"], now)
+                    areas.setdefault(alert["id"], set()).update(alert["data"])
+        await asyncio.sleep(grace)
+    finally:
+        monitor.cancel()
+        try:
+            await monitor
+        except asyncio.CancelledError:
+            pass
+        redalert.enqueue_alert = enqueue_alert
+        await oref.stop()
+        await broker.stop()
+
+    return build_report(visible, added_visible, areas, enqueued, broker.messages, oref.requests)
+
+
+def build_report(visible: dict, added_visible: dict, areas: dict, enqueued: dict, messages: list, requests: int) -> dict:
+    detection, publish, end_to_end = redalert.LatencyStats(), redalert.LatencyStats(), redalert.LatencyStats()
+    published, published_areas, duplicates = {}, {}, 0
+    for received_at, topic, payload in messages:
+        if topic.endswith("/raw_data"):
+            alert = json.loads(payload)
+            delta = False
+        elif topic.endswith("/delta"):
+            alert = json.loads(payload)
+            delta = True
+        else:
+            continue
+        key = (alert["id"], delta)
+        published_areas.setdefault(alert["id"], set()).update(alert["data"])
+        if key in published:
+            duplicates += 1
+            continue
+        published[key] = received_at
+        shown_at = added_visible.get(alert["id"]) if delta else visible.get(alert["id"])
+        if shown_at is None:
+            continue
+        if key in enqueued:
+            detection.observe(enqueued[key] - shown_at)
+            publish.observe(received_at - enqueued[key])
+        end_to_end.observe(received_at - shown_at)
+
+    missed = sorted(alert_id for alert_id in visible if (alert_id, False) not in published)
+    missed_areas = sum(len(areas[alert_id] - published_areas.get(alert_id, set())) for alert_id in visible)
+    return {
+        "alerts_shown": len(visible),
+        "alerts_published": sum(1 for _, delta in published if not delta),
+        "deltas_published": sum(1 for _, delta in published if delta),
+        "missed": missed,
+        "missed_areas": missed_areas,
+        "duplicates": duplicates,
+        "oref_requests": requests,
+        "detection_latency": detection.summary(),
+        "publish_latency": publish.summary(),
+        "end_to_end_latency": end_to_end.summary(),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run monitor() against a fake Oref server and MQTT broker")
+    parser.add_argument("--scenario", help="JSON list of steps (default: built-in salvo/rapid/empty/slow timeline)")
+    parser.add_argument("--poll-interval", type=float, default=redalert.POLL_INTERVAL)
+    parser.add_argument("--grace", type=float, default=3.0, help="seconds to keep running after the last step")
+    args = parser.parse_args()
+    redalert.logger.setLevel("WARNING")
+
+    if args.scenario:
+        with open(args.scenario, 'r', encoding='utf-8') as f:
+            steps = json.load(f)
+    else:
+        steps = default_scenario()
+    report = asyncio.run(run_scenario(steps, args.poll_interval, args.grace))
+    print(json.dumps(report, indent=2, ensure_ascii=False))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,108 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+# Replay alerts.json traffic recorded with RECORD_FILE through the
+# fetch_alert -> dedupe -> publish_alert path, at real time or accelerated.
+#
+#   RECORD_FILE=salvo-day.jsonl python redalert.py        # record during normal operation
+#   python benchmarks/replay_traffic.py salvo-day.jsonl [--speed 100] [--mqtt host:port]
+#
+# Each recorded body is served once by an in-process session at its recorded
+# offset divided by --speed (0 = as fast as possible, the throughput ceiling).
+# Alerts are published to a fake client unless --mqtt points at a real broker.
+# Dedupe expiry still runs on the wall clock, so at high speeds an ID that
+# repeats more than ALERT_TTL apart in the recording stays deduplicated.
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+
+import aiomqtt
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+import redalert
+from bench_hot_paths import FakeMqttClient, FakeResponse
+
+
+class ReplaySession:
+    # Answers every alerts.json request with the recorded body currently being replayed
+    def __init__(self):
+        self.body = b""
+
+    async def get(self, url, headers=None):
+        return FakeResponse(self.body)
+
+
+async def replay(entries: list, speed: float, client) -> dict:
+    redalert.alerts.clear()
+    redalert.alert_areas.clear()
+    redalert.poll_cache.update(digest=None, alert=None)
+    redalert.alert_sources = [redalert.AlertSource(redalert.url)]
+    session = ReplaySession()
+    queue = asyncio.Queue()
+    scheduler = redalert.PollScheduler(redalert.POLL_INTERVAL, redalert.POLL_INTERVAL_MAX, 1)
+    poll_cost, publish_cost, lag = redalert.LatencyStats(), redalert.LatencyStats(), redalert.LatencyStats()
+    published = {"alerts": 0, "deltas": 0, "failed": 0}
+
+    first = entries[0][0]
+    start = time.monotonic()
+    for t, body in entries:
+        if speed:
+            wait = start + (t - first) / speed - time.monotonic()
+            if wait > 0:
+                await asyncio.sleep(wait)
+            else:
+                lag.observe(-wait)
+        session.body = body
+        poll_start = time.monotonic()
+        await redalert.poll_once(session, queue, scheduler, scheduler.next_seq())
+        poll_cost.observe(time.monotonic() - poll_start)
+        while not queue.empty():
+            alert, _ = queue.get_nowait()
+            publish_start = time.monotonic()
+            if await redalert.publish_alert(client, alert):
+                published["deltas" if alert.delta else "alerts"] += 1
+            else:
+                published["failed"] += 1
+            publish_cost.observe(time.monotonic() - publish_start)
+    wall = time.monotonic() - start
+
+    span = entries[-1][0] - first
+    return {
+        "entries": len(entries),
+        "recorded_span_s": round(span, 3),
+        "replay_wall_s": round(wall, 3),
+        "effective_speed": round(span / wall, 1) if wall else None,
+        "entries_per_s": round(len(entries) / wall, 1) if wall else None,
+        "published": published,
+        "late_entries": lag.summary(),
+        "poll_cost": poll_cost.summary(),
+        "publish_cost": publish_cost.summary(),
+    }
+
+
+async def run(path: str, speed: float, mqtt: str) -> dict:
+    entries = redalert.load_recording(path)
+    if not entries:
+        raise SystemExit(f"{path} has no recorded responses")
+    if not mqtt:
+        return await replay(entries, speed, FakeMqttClient())
+    host, _, mqtt_port = mqtt.partition(":")
+    async with aiomqtt.Client(hostname=host, port=int(mqtt_port or 1883), timeout=10) as client:
+        return await replay(entries, speed, client)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay a RECORD_FILE recording through fetch/dedupe/publish")
+    parser.add_argument("recording")
+    parser.add_argument("--speed", type=float, default=1.0, help="replay speed multiplier; 0 replays as fast as possible")
+    parser.add_argument("--mqtt", default="", help="publish to this broker (host[:port]) instead of a fake client")
+    args = parser.parse_args()
+    redalert.logger.setLevel("WARNING")
+    report = asyncio.run(run(args.recording, args.speed, args.mqtt))
+    print(json.dumps(report, indent=2, ensure_ascii=False))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,98 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+# Deterministic synthetic area dataset in the area_polygons.json format, so
+# benchmarks run offline without the Oref/Meser endpoints.
+#
+#   python benchmarks/synthetic_areas.py [out.json] [--count 1500] [--seed 1]
+#
+# Areas tile the rough extent of Israel as a jittered grid: neighbours share
+# their (densified) edges, so polygons are irregular, do not overlap and have
+# a few dozen vertices each, like the real Meser polygons.
+import argparse
+import json
+import math
+import random
+
+# Rough extent of Israel: (min_lat, max_lat, min_lon, max_lon)
+EXTENT = (29.5, 33.3, 34.3, 35.9)
+MIGUN_TIMES = (0, 15, 30, 45, 60, 90, 180)
+NAME_PREFIXES = ("תל אביב", "ירושלים", "חיפה", "באר שבע", "אשדוד", "נתניה", "ראשון לציון", "קריית שמונה", "שדרות", "אילת")
+NAME_SUFFIXES = ("מרכז", "צפון", "דרום", "מזרח", "מערב", "אזור תעשייה")
+
+
+def grid_shape(count: int) -> tuple:
+    # Cells roughly square in degrees over EXTENT
+    min_lat, max_lat, min_lon, max_lon = EXTENT
+    aspect = (max_lat - min_lat) / (max_lon - min_lon)
+    rows = max(1, round(math.sqrt(count * aspect)))
+    cols = max(1, math.ceil(count / rows))
+    return rows, cols
+
+
+def generate_area_data(count: int = 1500, seed: int = 1, edge_points: int = 6, jitter: float = 0.3) -> dict:
+    rng = random.Random(seed)
+    min_lat, max_lat, min_lon, max_lon = EXTENT
+    rows, cols = grid_shape(count)
+    dlat = (max_lat - min_lat) / rows
+    dlon = (max_lon - min_lon) / cols
+
+    # Shared corner points, jittered inside the grid (borders stay straight)
+    corners = {}
+    for r in range(rows + 1):
+        for c in range(cols + 1):
+            jlat = rng.uniform(-jitter, jitter) * dlat if 0 < r < rows else 0.0
+            jlon = rng.uniform(-jitter, jitter) * dlon if 0 < c < cols else 0.0
+            corners[r, c] = (min_lat + r * dlat + jlat, min_lon + c * dlon + jlon)
+
+    # Shared edge midpoints, wobbled perpendicular to the edge; keyed by the sorted corner pair
+    edges = {}
+
+    def edge(a: tuple, b: tuple) -> list:
+        key = (a, b) if a <= b else (b, a)
+        if key not in edges:
+            (lat0, lon0), (lat1, lon1) = corners[key[0]], corners[key[1]]
+            points = []
+            for k in range(1, edge_points + 1):
+                t = k / (edge_points + 1)
+                wobble = rng.uniform(-0.05, 0.05)
+                points.append([lat0 + (lat1 - lat0) * t + wobble * (lon1 - lon0) * dlat / dlon,
+                               lon0 + (lon1 - lon0) * t - wobble * (lat1 - lat0) * dlon / dlat])
+            edges[key] = points
+        points = edges[key]
+        return points if key == (a, b) else points[::-1]
+
+    data = {}
+    for r in range(rows):
+        for c in range(cols):
+            if len(data) == count:
+                return data
+            ring = [(r, c), (r + 1, c), (r + 1, c + 1), (r, c + 1)]
+            polygon = []
+            for a, b in zip(ring, ring[1:] + ring[:1]):
+                polygon.append(list(corners[a]))
+                polygon.extend(edge(a, b))
+            name = f"{NAME_PREFIXES[(r * cols + c) % len(NAME_PREFIXES)]} {r}-{c} - {NAME_SUFFIXES[c % len(NAME_SUFFIXES)]}"
+            data[name] = {"migun_time": rng.choice(MIGUN_TIMES), "polygon": polygon}
+    return data
+
+
+def random_points(count: int, seed: int = 1) -> list:
+    rng = random.Random(seed)
+    min_lat, max_lat, min_lon, max_lon = EXTENT
+    return [(rng.uniform(min_lat, max_lat), rng.uniform(min_lon, max_lon)) for _ in range(count)]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Write a synthetic area_polygons.json")
+    parser.add_argument("out", nargs="?", default="area_polygons.synthetic.json")
+    parser.add_argument("--count", type=int, default=1500)
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+    data = generate_area_data(args.count, args.seed)
+    with open(args.out, 'w', encoding='utf-8') as f:
+        json.dump(data, f, ensure_ascii=False)
+    print(f"wrote {len(data)} areas to {args.out}")
+
+
+if __name__ == '__main__':
+    main()
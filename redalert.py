@@ -1,5 +1,7 @@
 #!/usr/bin/env python
 # -*- coding: utf-8 -*-
+import time
+_startup_t0 = time.monotonic()
 import asyncio
 import aiohttp
 import aiohttp.web
@@ -7,11 +9,21 @@ import os
 import json
 import logging
 import aiomqtt
-import time
 import pathlib
-from dataclasses import dataclass, asdict
+import hashlib
+import bisect
+import math
+import numpy as np
+from collections import OrderedDict, deque
+from dataclasses import dataclass, asdict, replace, field
 from typing import List, Optional
-from shapely.geometry import Point, Polygon
+import shapely
+from shapely.geometry import Point
+from shapely.strtree import STRtree
+try:
+    import orjson
+except ImportError:
+    orjson = None
 
 @dataclass
 class AlertObject:
@@ -21,6 +33,562 @@ class AlertObject:
     data: List[str]
     desc: str
     raw_data: str
+    # True when data holds only the areas added to an already published alert
+    delta: bool = False
+    # Monotonic stage timestamps ("received", "parsed", "deduped") in this process; never persisted
+    trace: dict = field(default_factory=dict, compare=False, repr=False)
+
+
+@dataclass
+class OutgoingMessage:
+    kind: str  # topic kind, used for per-topic QoS and metrics
+    topic: str
+    payload: str
+    qos: int = 0
+
+
+@dataclass
+class OutboxEntry:
+    alert: AlertObject
+    enqueued_at: float  # monotonic, for queue wait
+    seq: int  # key of the entry's records in the outbox log
+    created: float  # Unix time the alert entered the outbox
+    done: set = field(default_factory=set)  # message kinds already accepted by the broker
+
+
+# Grid cell markers; non-negative cell values are the index of the single owning area
+GRID_EMPTY = -1
+GRID_BOUNDARY = -2
+GRID_OUTSIDE = -3
+
+
+@dataclass
+class AreaGrid:
+    min_lon: float
+    min_lat: float
+    cell_size: float
+    rows: int
+    cols: int
+    owners: np.ndarray
+    # CSR candidate lists for GRID_BOUNDARY cells
+    candidate_offsets: np.ndarray
+    candidate_indices: np.ndarray
+
+    def cell_of(self, lat: float, lon: float) -> int:
+        row = int((lat - self.min_lat) // self.cell_size)
+        col = int((lon - self.min_lon) // self.cell_size)
+        if 0 <= row < self.rows and 0 <= col < self.cols:
+            return row * self.cols + col
+        return -1
+
+    def owners_of(self, lats: np.ndarray, lons: np.ndarray) -> np.ndarray:
+        rows = np.floor((lats - self.min_lat) / self.cell_size)
+        cols = np.floor((lons - self.min_lon) / self.cell_size)
+        inside = (rows >= 0) & (rows < self.rows) & (cols >= 0) & (cols < self.cols)
+        result = np.full(len(lats), GRID_OUTSIDE, dtype=np.int32)
+        cells = rows[inside].astype(np.int64) * self.cols + cols[inside].astype(np.int64)
+        result[inside] = self.owners[cells]
+        return result
+
+
+@dataclass
+class AreaStore:
+    names: List[str]
+    migun_times: np.ndarray
+    # Ring i spans coords[offsets[i]:offsets[i + 1]]
+    offsets: np.ndarray
+    # (n, 2) float64 as (x=lon, y=lat); memory-mapped when read from the binary store
+    coords: np.ndarray
+
+
+@dataclass
+class AreaSpatialIndex:
+    names: List[str]
+    migun_times: List[int]
+    tree: STRtree
+    grid: Optional[AreaGrid] = None
+
+class AreaLookupCache:
+    def __init__(self, maxsize: int, precision: int):
+        self.maxsize = maxsize
+        self.precision = precision
+        self.entries: OrderedDict = OrderedDict()
+        self.version = 0
+        self.hits = 0
+        self.misses = 0
+
+    def key(self, lat: float, lon: float) -> tuple:
+        return round(lat, self.precision), round(lon, self.precision)
+
+    def get(self, key: tuple):
+        try:
+            value = self.entries[key]
+        except KeyError:
+            self.misses += 1
+            raise
+        self.entries.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def put(self, key: tuple, value, version: int):
+        # Drop results computed against a dataset that has since been replaced
+        if version != self.version or self.maxsize <= 0:
+            return
+        self.entries[key] = value
+        self.entries.move_to_end(key)
+        if len(self.entries) > self.maxsize:
+            self.entries.popitem(last=False)
+
+    def invalidate(self, version: int):
+        self.entries = OrderedDict()
+        self.version = version
+
+    def info(self) -> dict:
+        return {
+            "size": len(self.entries),
+            "maxsize": self.maxsize,
+            "precision": self.precision,
+            "version": self.version,
+            "hits": self.hits,
+            "misses": self.misses,
+        }
+
+
+class LatencyStats:
+    def __init__(self, window: int = 1024):
+        self.samples: deque = deque(maxlen=window)
+        self.count = 0
+
+    def observe(self, seconds: float):
+        self.samples.append(seconds)
+        self.count += 1
+
+    def summary(self) -> dict:
+        result = {"count": self.count}
+        if self.samples:
+            ordered = sorted(self.samples)
+            n = len(ordered)
+            for label, q in (("p50", 0.5), ("p95", 0.95), ("p99", 0.99)):
+                result[f"{label}_ms"] = round(ordered[min(int(q * n), n - 1)] * 1000, 3)
+            result["max_ms"] = round(ordered[-1] * 1000, 3)
+        return result
+
+
+class Histogram:
+    # Prometheus-style cumulative histogram; observe() is a bisect and two additions
+    def __init__(self, buckets: tuple):
+        self.buckets = tuple(sorted(buckets))
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, seconds: float):
+        self.counts[bisect.bisect_left(self.buckets, seconds)] += 1
+        self.sum += seconds
+        self.count += 1
+
+    def render(self, name: str, labels: str = "") -> List[str]:
+        prefix = f"{labels}," if labels else ""
+        lines = []
+        cumulative = 0
+        for bound, count in zip(self.buckets, self.counts):
+            cumulative += count
+            lines.append(f'{name}_bucket{{{prefix}le="{bound:g}"}} {cumulative}')
+        lines.append(f'{name}_bucket{{{prefix}le="+Inf"}} {self.count}')
+        suffix = f"{{{labels}}}" if labels else ""
+        lines.append(f"{name}_sum{suffix} {self.sum:.6f}")
+        lines.append(f"{name}_count{suffix} {self.count}")
+        return lines
+
+
+class PollScheduler:
+    def __init__(self, min_interval: float, max_interval: float, max_in_flight: int, alpha: float = 0.2):
+        self.min_interval = min_interval
+        self.max_interval = max(max_interval, min_interval)
+        self.max_in_flight = max(max_in_flight, 1)
+        self.alpha = alpha
+        self.interval = min_interval
+        self.latency_ewma = 0.0
+        self.error_rate = 0.0
+        self.issued = 0
+        self.applied_seq = 0
+        self.applied_sent_at: Optional[float] = None
+        self.stale = 0
+
+    def next_seq(self) -> int:
+        self.issued += 1
+        return self.issued
+
+    def observe(self, latency: float, failed: bool):
+        self.latency_ewma += self.alpha * (latency - self.latency_ewma)
+        self.error_rate += self.alpha * ((1.0 if failed else 0.0) - self.error_rate)
+        if failed:
+            # Back off gently while upstream is failing; shelter times leave no room for long gaps
+            self.interval = min(self.interval * 1.5, self.max_interval)
+        else:
+            # Recover on the first success, but never issue requests faster than max_in_flight can absorb
+            floor = max(self.min_interval, self.latency_ewma / self.max_in_flight)
+            self.interval = min(floor, self.max_interval)
+
+    def accept(self, seq: int, sent_at: float) -> bool:
+        # Responses can complete out of order; only apply ones newer than the last applied
+        if seq <= self.applied_seq:
+            self.stale += 1
+            return False
+        self.applied_seq = seq
+        self.applied_sent_at = sent_at
+        return True
+
+    def info(self) -> dict:
+        return {
+            "interval_ms": round(self.interval * 1000, 1),
+            "min_interval_ms": round(self.min_interval * 1000, 1),
+            "max_in_flight": self.max_in_flight,
+            "latency_ewma_ms": round(self.latency_ewma * 1000, 1),
+            "error_rate": round(self.error_rate, 3),
+            "stale_dropped": self.stale,
+        }
+
+
+class AlertSource:
+    def __init__(self, url: str):
+        self.url = url
+        # Validators and result of this source's last 200 response, reused on 304
+        self.etag: Optional[str] = None
+        self.last_modified: Optional[str] = None
+        self.alert: Optional[AlertObject] = None
+        self.latency = LatencyStats()
+        self.first = 0  # polls this source answered first, including empty and 304 answers
+        self.wins = 0  # of those, answers that carried an alert
+        self.errors = 0
+        self.cancelled = 0
+        # Every answer from this source by poll_counters path; last_answer is the latest one's path
+        self.answers = {"not_modified": 0, "empty": 0, "unchanged": 0, "parsed": 0}
+        self.last_answer: Optional[str] = None
+
+    def answered(self, path: str):
+        self.answers[path] += 1
+        self.last_answer = path
+
+    def headers(self) -> dict:
+        headers = dict(_headers)
+        if self.etag:
+            headers["If-None-Match"] = self.etag
+        if self.last_modified:
+            headers["If-Modified-Since"] = self.last_modified
+        return headers
+
+    def info(self) -> dict:
+        return {
+            "url": self.url,
+            "first": self.first,
+            "wins": self.wins,
+            "errors": self.errors,
+            "cancelled": self.cancelled,
+            "answers": self.answers,
+            "latency": self.latency.summary(),
+        }
+
+
+class AppendLog:
+    # Line-per-record file that is appended to and flushed as changes happen, and compacted by
+    # writing the live records to a temp file that replaces it
+    def __init__(self, path: str, name: str):
+        self.path = path
+        self.name = name  # what the file holds, for log messages
+        self.file = None
+        self.lines = 0
+
+    def append(self, line: str) -> bool:
+        try:
+            if self.file is None:
+                self.file = open(self.path, 'a', encoding='utf-8')
+            self.file.write(line + "\n")
+            self.file.flush()
+            self.lines += 1
+            return True
+        except Exception as e:
+            logger.error(f"Failed to write {self.name} to {self.path}: {e}")
+            return False
+
+    def needs_compaction(self, live: int) -> bool:
+        # Rewrite only once most of the file is records that no longer matter
+        return self.lines > 2 * live + 100
+
+    def rewrite(self, lines):
+        try:
+            tmp_path = f"{self.path}.tmp"
+            written = 0
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                for line in lines:
+                    f.write(line + "\n")
+                    written += 1
+            if self.file is not None:
+                self.file.close()
+                self.file = None
+            os.replace(tmp_path, self.path)
+            self.lines = written
+        except Exception as e:
+            logger.error(f"Failed to compact {self.name} {self.path}: {e}")
+
+
+class AlertOutbox:
+    # With a path, changes are appended to a JSONL log of "add"/"done"/"ack" records that is compacted as entries are acked
+    def __init__(self, maxsize: int, path: str = "", max_age: float = 0):
+        self.maxsize = maxsize
+        self.path = path
+        self.max_age = max_age  # seconds; older alerts are not restored or published (0 keeps all)
+        self.entries: deque = deque()
+        self.dropped = 0
+        self.expired = 0  # of dropped, alerts that outlived max_age
+        self.head_attempts = 0  # failed publish attempts of the alert at the head
+        self.flush_stats = LatencyStats()
+        self.next_seq = 0
+        self.log = AppendLog(path, "MQTT outbox")
+        if path:
+            self._load()
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    def add(self, alert: AlertObject, enqueued_at: float):
+        if len(self.entries) >= self.maxsize:
+            dropped = self.entries.popleft()
+            self.dropped += 1
+            self.head_attempts = 0
+            logger.error(f"MQTT outbox full, dropped alert {dropped.alert.id}")
+            self._append({"op": "ack", "seq": dropped.seq})
+        entry = OutboxEntry(alert, enqueued_at, self.next_seq, time.time())
+        self.next_seq += 1
+        self.entries.append(entry)
+        self._append(self._add_record(entry))
+
+    def peek(self) -> tuple:
+        entry = self.entries[0]
+        return entry.alert, entry.enqueued_at
+
+    def head_done(self) -> set:
+        return self.entries[0].done
+
+    def record_done(self):
+        # Persist partial progress of the head alert so a retry skips the topics already sent
+        entry = self.entries[0]
+        self._append({"op": "done", "seq": entry.seq, "kinds": sorted(entry.done)})
+
+    def pop(self):
+        entry = self.entries.popleft()
+        self.head_attempts = 0
+        if not self.path:
+            return
+        if not self.entries or self.log.needs_compaction(len(self.entries)):
+            self._rewrite()
+        else:
+            self._append({"op": "ack", "seq": entry.seq})
+
+    def drop_head(self):
+        self.pop()
+        self.dropped += 1
+
+    def expire_head(self) -> bool:
+        # Drop the head alert if it waited longer than max_age; it is no longer worth publishing
+        entry = self.entries[0]
+        if not self.max_age or time.time() - entry.created <= self.max_age:
+            return False
+        logger.warning(f"Dropping alert {entry.alert.id} that waited more than {self.max_age}s in the MQTT outbox")
+        self.drop_head()
+        self.expired += 1
+        return True
+
+    def _add_record(self, entry: OutboxEntry) -> dict:
+        fields = asdict(entry.alert)
+        del fields["trace"]
+        record = {"op": "add", "seq": entry.seq, "ts": round(entry.created, 3), "alert": fields}
+        if entry.done:
+            record["done"] = sorted(entry.done)
+        return record
+
+    def _load(self):
+        pending = {}
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                for line in f:
+                    if not line.strip():
+                        continue
+                    self.log.lines += 1
+                    try:
+                        record = json_loads(line)
+                        seq = record["seq"]
+                        self.next_seq = max(self.next_seq, seq + 1)
+                        if record["op"] == "ack":
+                            pending.pop(seq, None)
+                        elif record["op"] == "done":
+                            if seq in pending:
+                                pending[seq].done.update(record["kinds"])
+                        else:
+                            fields = record["alert"]
+                            fields.pop("trace", None)
+                            pending[seq] = OutboxEntry(AlertObject(**fields), time.monotonic(), seq, record["ts"], set(record.get("done", ())))
+                    except Exception as e:
+                        logger.error(f"Skipping bad line in MQTT outbox {self.path}: {e}")
+        except FileNotFoundError:
+            return
+        except Exception as e:
+            logger.error(f"Failed to load MQTT outbox from {self.path}: {e}")
+        cutoff = time.time() - self.max_age if self.max_age else None
+        expired = 0
+        for entry in pending.values():
+            if cutoff is not None and entry.created < cutoff:
+                expired += 1
+            else:
+                self.entries.append(entry)
+        if expired:
+            logger.warning(f"Discarded {expired} unpublished alerts older than {self.max_age}s from {self.path}")
+            self.dropped += expired
+            self.expired += expired
+        while len(self.entries) > self.maxsize:
+            self.entries.popleft()
+            self.dropped += 1
+        if self.entries:
+            logger.info(f"Loaded {len(self.entries)} unpublished alerts from {self.path}")
+        if self.log.lines != len(self.entries):
+            self._rewrite()
+
+    def _append(self, record: dict):
+        if self.path:
+            self.log.append(json_dumps(record))
+
+    def _rewrite(self):
+        # Compaction: only the entries still waiting, or an empty file once everything is published
+        self.log.rewrite(json_dumps(self._add_record(entry)) for entry in self.entries)
+
+    def info(self) -> dict:
+        return {
+            "depth": len(self.entries),
+            "maxsize": self.maxsize,
+            "dropped": self.dropped,
+            "expired": self.expired,
+            "persistent": bool(self.path),
+            "flush_latency": self.flush_stats.summary(),
+        }
+
+
+class AlertHistory:
+    # Fixed-size ring of published alerts; each area maps to the sequence numbers that mention it
+    def __init__(self, capacity: int):
+        self.capacity = max(capacity, 1)
+        self.slots: list = [None] * self.capacity
+        self.next_seq = 0
+        self.by_area: dict = {}
+
+    def add(self, alert: AlertObject, published_at: float):
+        seq = self.next_seq
+        if seq:
+            # recent() relies on timestamps never going backwards
+            published_at = max(published_at, self.slots[(seq - 1) % self.capacity][0])
+        slot = seq % self.capacity
+        previous = self.slots[slot]
+        if previous is not None:
+            # The overwritten entry is the oldest one for each of its areas
+            for area in set(previous[1].data):
+                positions = self.by_area[area]
+                positions.popleft()
+                if not positions:
+                    del self.by_area[area]
+        self.slots[slot] = (published_at, alert)
+        for area in set(alert.data):
+            self.by_area.setdefault(area, deque()).append(seq)
+        self.next_seq += 1
+
+    def recent(self, since: float = 0.0, area: Optional[str] = None) -> list:
+        if area is not None:
+            seqs = reversed(self.by_area.get(area, ()))
+        else:
+            seqs = range(self.next_seq - 1, max(self.next_seq - self.capacity, 0) - 1, -1)
+        # Walk back from the newest entry and stop at the first one older than since
+        result = []
+        for seq in seqs:
+            published_at, alert = self.slots[seq % self.capacity]
+            if published_at < since:
+                break
+            result.append((published_at, alert))
+        result.reverse()
+        return result
+
+    def __len__(self):
+        return min(self.next_seq, self.capacity)
+
+
+class DedupeLog:
+    # Append-only "<id>\t<timestamp>" log of seen alert IDs, compacted as entries expire
+    def __init__(self, path: str):
+        self.path = path
+        self.log = AppendLog(path, "seen alerts log")
+        self.load_ms: Optional[float] = None
+
+    def load(self, ttl: float) -> dict:
+        load_start = time.monotonic()
+        cutoff = time.time() - ttl
+        seen = {}
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                for line in f:
+                    alert_id, _, ts = line.rstrip("\n").rpartition("\t")
+                    self.log.lines += 1
+                    try:
+                        ts = float(ts)
+                    except ValueError:
+                        continue
+                    if alert_id and ts > cutoff:
+                        seen.pop(alert_id, None)
+                        seen[alert_id] = ts
+        except FileNotFoundError:
+            pass
+        except Exception as e:
+            logger.error(f"Failed to load seen alerts from {self.path}: {e}")
+        self.load_ms = round((time.monotonic() - load_start) * 1000, 1)
+        logger.info(f"Loaded {len(seen)} seen alert IDs from {self.path} in {self.load_ms}ms")
+        return seen
+
+    def append(self, alert_id: str, ts: float):
+        self.log.append(f"{alert_id}\t{ts:.3f}")
+
+    def compact(self, seen: dict):
+        if self.log.needs_compaction(len(seen)):
+            self.log.rewrite(f"{alert_id}\t{ts:.3f}" for alert_id, ts in seen.items())
+
+    def info(self) -> dict:
+        return {"log_lines": self.log.lines, "load_ms": self.load_ms}
+
+
+class TrafficRecorder:
+    # Appends {"t": unix time, "body": alerts.json text} lines whenever the polled body changes
+    def __init__(self, path: str):
+        self.path = path
+        self.log = AppendLog(path, "alerts.json recording")
+        self.last_digest: Optional[bytes] = None
+        self.records = 0
+
+    def record(self, body: bytes, digest: bytes):
+        if digest == self.last_digest:
+            return
+        self.last_digest = digest
+        if self.log.append(json_dumps({"t": round(time.time(), 3), "body": body.decode('utf-8', errors='replace')})):
+            self.records += 1
+
+    def info(self) -> dict:
+        return {"path": self.path, "records": self.records}
+
+
+def load_recording(path: str) -> List[tuple]:
+    # (unix time, body bytes) pairs from a TrafficRecorder file, in recorded order
+    entries = []
+    with open(path, 'rb') as f:
+        for line in f:
+            if line.strip():
+                entry = json_loads(line)
+                entries.append((entry["t"], entry["body"].encode('utf-8')))
+    return entries
+
 
 os.environ['PYTHONIOENCODING'] = 'utf-8'
 os.environ['LANG'] = 'C.UTF-8'
@@ -39,19 +607,58 @@ port = int(os.getenv('MQTT_PORT', 1883))
 user = os.getenv('MQTT_USER', 'user')
 passw = os.getenv('MQTT_PASS', 'password')
 MQTT_TOPIC = os.environ.get("MQTT_TOPIC", "/redalert")
+MQTT_TOPIC_QOS = os.getenv("MQTT_TOPIC_QOS", "")  # per topic kind, e.g. "cat=1,raw_data=0,keepalive=0"
 INCLUDE_TEST_ALERTS = os.getenv("INCLUDE_TEST_ALERTS", "False")
 IS_DEBUG = os.getenv("DEBUG", "False")
 HEALTH_PORT = int(os.getenv("HEALTH_PORT", 8080))
+JSON_BACKEND = os.getenv("JSON_BACKEND", "auto")  # auto, orjson or json
 HEALTH_THRESHOLD = 30  # seconds of silence before considered frozen
 KEEPALIVE_INTERVAL = int(os.getenv("KEEPALIVE_INTERVAL", 300))  # default 5 min
+POLL_INTERVAL = float(os.getenv("POLL_INTERVAL", 1))  # seconds between polls, sub-second values allowed
+POLL_INTERVAL_MAX = float(os.getenv("POLL_INTERVAL_MAX", 3))  # back-off ceiling while Oref is failing
+POLL_MAX_IN_FLIGHT = int(os.getenv("POLL_MAX_IN_FLIGHT", 2))  # overlapping requests allowed
+FETCH_TIMEOUT = float(os.getenv("FETCH_TIMEOUT", 4))  # max seconds for a single fetch attempt
+ALERT_QUEUE_SIZE = int(os.getenv("ALERT_QUEUE_SIZE", 100))  # alerts waiting between fetch and publish stages
+MQTT_RECONNECT_INTERVAL = 5  # seconds
+OUTBOX_SIZE = int(os.getenv("OUTBOX_SIZE", 1000))  # unpublished alerts retained across broker reconnects
+OUTBOX_FILE = os.getenv("OUTBOX_FILE", "")  # persist the outbox to this file when set
+OUTBOX_MAX_ATTEMPTS = int(os.getenv("OUTBOX_MAX_ATTEMPTS", 5))  # publish attempts before an alert is dropped
+OUTBOX_MAX_AGE = int(os.getenv("OUTBOX_MAX_AGE", 3600))  # seconds an alert may wait in the outbox (0 = no limit)
+ALERT_HISTORY_SIZE = int(os.getenv("ALERT_HISTORY_SIZE", 1000))  # published alerts kept for /alerts/recent
+TRACE_RECEIVE_TIME = os.getenv("TRACE_RECEIVE_TIME", "False")  # add "received_at" to cat/ payloads
+DEDUPE_FILE = os.getenv("DEDUPE_FILE", "")  # persist seen alert IDs to this file when set
+RECORD_FILE = os.getenv("RECORD_FILE", "")  # append every changed alerts.json body to this file when set
 logger.info(f"Monitoring alerts, sending to topic: {MQTT_TOPIC}")
 
+
+def parse_topic_qos(value: str) -> dict:
+    qos = {}
+    for item in value.split(","):
+        if not item.strip():
+            continue
+        kind, _, level = item.partition("=")
+        try:
+            level = int(level)
+            if level not in (0, 1, 2):
+                raise ValueError(level)
+        except ValueError:
+            logger.warning(f"Ignoring invalid MQTT_TOPIC_QOS entry: {item!r}")
+            continue
+        qos[kind.strip()] = level
+    return qos
+
+
+topic_qos = parse_topic_qos(MQTT_TOPIC_QOS)
+
 _headers = {
     'Referer': 'https://www.oref.org.il/',
     'User-Agent': "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/78.0.3904.97 Safari/537.36",
     'X-Requested-With': 'XMLHttpRequest'
 }
 url = 'https://www.oref.org.il/WarningMessages/alert/alerts.json'
+# Queried in parallel on every poll; the first valid answer wins
+ALERT_SOURCES = [u.strip() for u in os.getenv("ALERT_SOURCES", url).split(",") if u.strip()]
+alert_sources = [AlertSource(u) for u in ALERT_SOURCES]
 
 index = 0
 DEBUG_ALERT_DATA = {
@@ -62,88 +669,370 @@ DEBUG_ALERT_DATA = {
     "desc": "עליך לשפר את מיקומך למיגון המיטבי בקרבתך. במקרה של קבלת התרעה, יש להיכנס למרחב המוגן ולשהות בו 10 דקות."
 }
 
-# Replace alerts set with a dict for time-based cleanup
-alerts = {}
+if JSON_BACKEND == "orjson" and orjson is None:
+    logger.warning("JSON_BACKEND=orjson but orjson is not installed, using the json module")
+json_backend = "orjson" if orjson is not None and JSON_BACKEND != "json" else "json"
+logger.info(f"JSON backend: {json_backend}")
+
+
+def json_loads(data):
+    if json_backend == "orjson":
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+def json_dumps(obj) -> str:
+    if json_backend == "orjson":
+        return orjson.dumps(obj).decode('utf-8')
+    return json.dumps(obj, ensure_ascii=False)
+
+
+# Seen alert IDs -> last-seen time, least recently seen first so expiry and eviction only touch the front
+alerts: OrderedDict = OrderedDict()
 ALERT_TTL = 3600  # 1 hour in seconds
+ALERT_MAX_ENTRIES = int(os.getenv("ALERT_MAX_ENTRIES", 10000))  # oldest IDs are evicted beyond this
+dedupe_counters = {"new": 0, "hits": 0, "test_filtered": 0, "expired": 0, "evicted": 0, "deltas": 0}
+# Recently filtered test alert IDs, so a test alert shown for many polls is counted once
+filtered_test_ids: OrderedDict = OrderedDict()
+FILTERED_TEST_IDS_MAX = 100
+# Area set last published for each tracked alert ID, to detect cities added under the same ID
+alert_areas: dict = {}
+alert_history = AlertHistory(ALERT_HISTORY_SIZE)
+dedupe_log: Optional[DedupeLog] = DedupeLog(DEDUPE_FILE) if DEDUPE_FILE else None
+traffic_recorder: Optional[TrafficRecorder] = TrafficRecorder(RECORD_FILE) if RECORD_FILE else None
 last_heartbeat: float = 0.0
 last_successful_fetch: float = 0.0
 last_mqtt_success: float = 0.0
+# Fetch -> publish pipeline state, created by monitor()
+alert_queue: Optional[asyncio.Queue] = None
+alert_outbox: Optional[AlertOutbox] = None
+pipeline_stats = {
+    "fetch": LatencyStats(),
+    "queue_wait": LatencyStats(),
+    "publish": LatencyStats(),
+    # Poll response that first showed an alert minus the send time of the previous applied poll
+    "detection": LatencyStats(),
+}
+# Per-alert stage breakdown from alerts.json receive to each topic's publish completing
+trace_stats: dict = {}
+pipeline_counters = {"enqueued": 0, "dropped": 0, "published": 0}
+# Publish latency per topic kind ("cat", "raw_data", "keepalive", ...)
+topic_stats: dict = {}
+# Histograms exposed on /metrics; publish latency is kept per topic kind
+metric_histograms = {
+    "oref_fetch": Histogram((0.05, 0.1, 0.25, 0.5, 1, 2, 4, 8)),
+    "alert_parse": Histogram((1e-5, 5e-5, 1e-4, 5e-4, 1e-3, 5e-3, 0.01)),
+    "area_lookup": Histogram((1e-5, 5e-5, 1e-4, 5e-4, 1e-3, 5e-3, 0.01, 0.05)),
+}
+publish_histograms: dict = {}
+PUBLISH_BUCKETS = (0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1, 5)
+# Body digest and result of the previous alerts.json response, reused while it is unchanged
+poll_cache = {"digest": None, "alert": None}
+EMPTY_DIGEST = hashlib.blake2b(b"", digest_size=16).digest()
+poll_counters = {"polls": 0, "not_modified": 0, "empty": 0, "unchanged": 0, "parsed": 0, "errors": 0, "timeouts": 0}
+poll_scheduler: Optional[PollScheduler] = None
+# Seconds from module load to each startup milestone, recorded once
+startup_timings: dict = {"imports": round(time.monotonic() - _startup_t0, 3)}
 
 # Area endpoint configuration
 AREA_POLYGONS_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "area_polygons.json")
 AREA_REFRESH_INTERVAL = 86400  # 24 hours in seconds
 AREA_FETCH_CONCURRENCY = 20
+AREA_POLYGON_MAX_AGE = int(os.getenv("AREA_POLYGON_MAX_AGE", 30 * 86400))  # refetch unchanged segments after this
+AREA_BATCH_MAX_POINTS = int(os.getenv("AREA_BATCH_MAX_POINTS", 50000))
+AREA_BATCH_BYTES_PER_POINT = 64  # request body allowance per point, sizes the server's client_max_size
+AREA_GRID_CELL_SIZE = float(os.getenv("AREA_GRID_CELL_SIZE", 0.01))  # degrees, 0 disables the grid
+AREA_CACHE_SIZE = int(os.getenv("AREA_CACHE_SIZE", 4096))  # 0 disables the /area cache
+AREA_CACHE_PRECISION = int(os.getenv("AREA_CACHE_PRECISION", 4))  # decimal places, 4 ~= 11m
+AREA_STORE_MAGIC = b"RAREA001"
 OREF_CITIES_URL = "https://alerts-history.oref.org.il/Shared/Ajax/GetCitiesMix.aspx"
 MESER_SEGMENTS_URL = "https://dist-android.meser-hadash.org.il/smart-dist/services/anonymous/segments/android?instance=1544803905&locale=iw_IL"
 MESER_POLYGON_URL_TEMPLATE = "https://services.meser-hadash.org.il/smart-dist/services/anonymous/polygon/id/android?instance=1544803905&id={segment_id}"
 
 # In-memory bounding box index: {"city_name": {"migun_time": int, "bbox": (min_lat, max_lat, min_lon, max_lon)}}
 area_bbox_index: dict = {}
+# Resident prepared polygons, built once per dataset load: {"city_name": Polygon}
+area_geometries: dict = {}
+# STRtree over area_geometries, rebuilt together with area_bbox_index
+area_spatial_index: Optional[AreaSpatialIndex] = None
 area_data_loaded: bool = False
+# Bumped on every dataset swap; /area cache entries from older versions are discarded
+area_dataset_version: int = 0
+area_lookup_cache = AreaLookupCache(AREA_CACHE_SIZE, AREA_CACHE_PRECISION)
+
+
+def mark_startup(stage: str):
+    if stage not in startup_timings:
+        startup_timings[stage] = round(time.monotonic() - _startup_t0, 3)
+        logger.info(f"Startup: {stage} after {startup_timings[stage]}s")
 
 
 def is_test_alert(alert: AlertObject) -> bool:
     return INCLUDE_TEST_ALERTS == 'False' and ('בדיקה' in alert.data or 'בדיקה מחזורית' in alert.data)
 
 
-async def fetch_alert(session: aiohttp.ClientSession) -> Optional[AlertObject]:
-    global last_successful_fetch
-    try:
-        async with await session.get(url, headers=_headers) as response:
-            if response.status != 200:
-                logger.warning(f"Failed to fetch alerts: HTTP {response.status}")
-                return None
+def parse_alert(alert_data: str) -> Optional[AlertObject]:
+    if not alert_data or alert_data.isspace():
+        return None
+    alert = json_loads(alert_data)
+    # Convert alert data to dataclass
+    return AlertObject(
+        id=alert.get("id", f"random-id-{time.time()}"),
+        cat=alert.get("cat", "-1"),
+        title=alert.get("title", "unknown"),
+        data=alert.get("data", []),
+        desc=alert.get("desc", "unknown"),
+        raw_data=alert_data
+    )
 
+
+async def fetch_alert_from(session: aiohttp.ClientSession, source: AlertSource) -> Optional[AlertObject]:
+    # Raises on any failure so fetch_alert can fall back to another source
+    global last_successful_fetch
+    request_start = time.monotonic()
+    async with await session.get(source.url, headers=source.headers()) as response:
+        if response.status == 304:
             last_successful_fetch = time.time()
-            alert_data = await response.text(encoding='utf-8-sig')
-            alert_data = alert_data.replace('\x00', '').strip()
-            
-            if IS_DEBUG == "True":
-                global index
-                index += 1
-                DEBUG_ALERT_DATA["id"] = str(index)
-                alert_data = json.dumps(DEBUG_ALERT_DATA, ensure_ascii=False)
-                
-            if not alert_data or alert_data.isspace():
-                return None
+            source.answered("not_modified")
+            source.latency.observe(time.monotonic() - request_start)
+            return source.alert
+        if response.status != 200:
+            logger.warning(f"Failed to fetch alerts: HTTP {response.status}")
+            raise aiohttp.ClientError(f"HTTP {response.status} from {source.url}")
 
-            alert = json.loads(alert_data)
-            # Convert alert data to dataclass
-            alert_object = AlertObject(
-                id=alert.get("id", f"random-id-{time.time()}"),
-                cat=alert.get("cat", "-1"),
-                title=alert.get("title", "unknown"),
-                data=alert.get("data", []),
-                desc=alert.get("desc", "unknown"),
-                raw_data=alert_data
-            )
-            logger.debug("Alert data successfully parsed.")
+        last_successful_fetch = time.time()
+        mark_startup("first_fetch")
+        headers = response.headers
+        source.etag = headers.get("ETag")
+        source.last_modified = headers.get("Last-Modified")
+
+        if IS_DEBUG == "True":
+            global index
+            index += 1
+            DEBUG_ALERT_DATA["id"] = str(index)
+            alert_data = json_dumps(DEBUG_ALERT_DATA)
+            alert_object = parse_alert(alert_data)
+            source.answered("parsed")
             return alert_object
-    except json.JSONDecodeError as jde:
-        logger.error(f"Failed to parse JSON: {jde}")
-        return None
-    except Exception as ex:
-        logger.error(f"Exception during fetch_alert: {ex}")
-        return None
 
+        if headers.get("Content-Length") == "0":
+            source.answered("empty")
+            alert_object = None
+            if traffic_recorder is not None:
+                traffic_recorder.record(b"", EMPTY_DIGEST)
+        else:
+            body = await response.read()
+            received_at = time.monotonic()
+            digest = hashlib.blake2b(body, digest_size=16).digest()
+            if traffic_recorder is not None:
+                traffic_recorder.record(body, digest)
+            if digest == poll_cache["digest"]:
+                source.answered("unchanged")
+                alert_object = poll_cache["alert"]
+            else:
+                parse_start = time.monotonic()
+                alert_data = body.decode('utf-8-sig').replace('\x00', '').strip()
+                alert_object = parse_alert(alert_data)
+                parsed_at = time.monotonic()
+                metric_histograms["alert_parse"].observe(parsed_at - parse_start)
+                if alert_object is not None:
+                    alert_object.trace.update(received=received_at, parsed=parsed_at)
+                source.answered("parsed")
+                poll_cache["digest"] = digest
+                poll_cache["alert"] = alert_object
+                if alert_object is not None:
+                    logger.debug("Alert data successfully parsed.")
+        source.alert = alert_object
+        source.latency.observe(time.monotonic() - request_start)
+        return alert_object
 
-async def publish_alert(mqtt_client: aiomqtt.Client, alert: AlertObject):
-    global last_mqtt_success
+
+class FetchError(Exception):
+    pass
+
+
+async def fetch_alert(session: aiohttp.ClientSession) -> Optional[AlertObject]:
+    # Hedge across all configured sources: first valid answer wins, the rest are cancelled.
+    # Raises FetchError when every source failed, so each poll knows its own outcome.
+    pending = {asyncio.create_task(fetch_alert_from(session, source)): source for source in alert_sources}
     try:
-        # Publish the data section
-        await mqtt_client.publish(f"{MQTT_TOPIC}/cat/{alert.cat}", json.dumps({"title": alert.title, "data": alert.data, "desc": alert.desc}, ensure_ascii=False), qos=0)
-        # Publish the full raw alert
-        await mqtt_client.publish(f"{MQTT_TOPIC}/raw_data", alert.raw_data, qos=0)
-        last_mqtt_success = time.time()
-        logger.info("Alert published to MQTT topics.")
-    except Exception as e:
-        logger.error(f"Failed to publish alert to MQTT: {e}")
+        while pending:
+            done, _ = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                source = pending.pop(task)
+                try:
+                    alert = task.result()
+                except json.JSONDecodeError as jde:
+                    source.errors += 1
+                    logger.error(f"Failed to parse JSON from {source.url}: {jde}")
+                except Exception as ex:
+                    source.errors += 1
+                    logger.error(f"Exception during fetch_alert from {source.url}: {ex}")
+                else:
+                    # Poll counters follow the answer that was used, once per poll
+                    poll_counters["polls"] += 1
+                    poll_counters[source.last_answer] += 1
+                    source.first += 1
+                    if alert is not None:
+                        source.wins += 1
+                    return alert
+        poll_counters["errors"] += 1
+        raise FetchError(f"all {len(alert_sources)} alert sources failed")
+    finally:
+        for task, source in pending.items():
+            task.cancel()
+            source.cancelled += 1
 
-def cleanup_alerts():
+
+def polling_info() -> dict:
+    fast = poll_counters["not_modified"] + poll_counters["empty"] + poll_counters["unchanged"]
+    return {
+        **poll_counters,
+        "fast_path": fast,
+        "scheduler": poll_scheduler.info() if poll_scheduler is not None else None,
+        "sources": [source.info() for source in alert_sources],
+        "recording": traffic_recorder.info() if traffic_recorder is not None else None,
+    }
+
+
+def plan_alert_messages(alert: AlertObject) -> List[OutgoingMessage]:
+    # Every outgoing message for an alert, each payload serialized exactly once
+    if alert.delta:
+        # Only the newly added areas of an alert that was already published
+        return [
+            OutgoingMessage("delta", f"{MQTT_TOPIC}/delta",
+                            json_dumps({"id": alert.id, "cat": alert.cat, "title": alert.title, "data": alert.data, "desc": alert.desc}),
+                            topic_qos.get("delta", 0)),
+        ]
+    payload = {"title": alert.title, "data": alert.data, "desc": alert.desc}
+    if TRACE_RECEIVE_TIME == "True" and "received" in alert.trace:
+        # Wall-clock time alerts.json was received, for subscribers measuring their own latency
+        payload["received_at"] = round(time.time() - (time.monotonic() - alert.trace["received"]), 3)
+    return [
+        # The data section
+        OutgoingMessage("cat", f"{MQTT_TOPIC}/cat/{alert.cat}", json_dumps(payload), topic_qos.get("cat", 0)),
+        # The full raw alert
+        OutgoingMessage("raw_data", f"{MQTT_TOPIC}/raw_data", alert.raw_data, topic_qos.get("raw_data", 0)),
+    ]
+
+
+async def publish_message(mqtt_client: aiomqtt.Client, message: OutgoingMessage) -> float:
+    publish_start = time.monotonic()
+    await mqtt_client.publish(message.topic, message.payload, qos=message.qos)
+    published_at = time.monotonic()
+    elapsed = published_at - publish_start
+    topic_stats.setdefault(message.kind, LatencyStats()).observe(elapsed)
+    if message.kind not in publish_histograms:
+        publish_histograms[message.kind] = Histogram(PUBLISH_BUCKETS)
+    publish_histograms[message.kind].observe(elapsed)
+    return published_at
+
+
+def observe_trace(alert: AlertObject, publish_start: float, published: dict):
+    trace = alert.trace
+    if "received" not in trace:
+        return  # e.g. restored from the outbox file after a restart
+
+    def stage(name: str, seconds: float):
+        trace_stats.setdefault(name, LatencyStats()).observe(seconds)
+
+    if "parsed" in trace:
+        stage("parse", trace["parsed"] - trace["received"])
+    if "deduped" in trace:
+        stage("dedupe", trace["deduped"] - trace.get("parsed", trace["received"]))
+        stage("queue", publish_start - trace["deduped"])
+    for kind, published_at in published.items():
+        stage(f"publish:{kind}", published_at - publish_start)
+        stage(f"end_to_end:{kind}", published_at - trace["received"])
+
+
+async def send_alert(mqtt_client: aiomqtt.Client, alert: AlertObject, done: Optional[set] = None) -> List[BaseException]:
+    # Publishes the alert's messages whose kind is not in done, adds each accepted kind to it and returns the errors
+    global last_mqtt_success
+    if done is None:
+        done = set()
+    messages = [m for m in plan_alert_messages(alert) if m.kind not in done]
+    publish_start = time.monotonic()
+    results = await asyncio.gather(*(publish_message(mqtt_client, m) for m in messages), return_exceptions=True)
+    errors = [r for r in results if isinstance(r, BaseException)]
+    published = {m.kind: r for m, r in zip(messages, results) if not isinstance(r, BaseException)}
+    done.update(published)
+    if errors:
+        logger.error(f"Failed to publish alert to MQTT: {errors[0]}")
+        return errors
+    observe_trace(alert, publish_start, published)
+    last_mqtt_success = time.time()
+    logger.info("Alert published to MQTT topics.")
+    return errors
+
+
+async def publish_alert(mqtt_client: aiomqtt.Client, alert: AlertObject) -> bool:
+    return not await send_alert(mqtt_client, alert)
+
+def is_new_alert(alert_id: str) -> bool:
+    previous = alerts.get(alert_id)
+    if previous is not None:
+        dedupe_counters["hits"] += 1
+        # Still in alerts.json: refresh it so neither expiry nor eviction can forget it while it is shown
+        now = time.time()
+        alerts[alert_id] = now
+        alerts.move_to_end(alert_id)
+        if dedupe_log is not None and now - previous > ALERT_TTL / 2:
+            dedupe_log.append(alert_id, now)
+        return False
+    return True
+
+
+def remember_alert(alert_id: str, areas: Optional[List[str]] = None):
     now = time.time()
-    to_remove = [aid for aid, ts in alerts.items() if now - ts > ALERT_TTL]
-    for aid in to_remove:
-        del alerts[aid]
+    alerts[alert_id] = now
+    alerts.move_to_end(alert_id)
+    if areas is not None:
+        alert_areas[alert_id] = frozenset(areas)
+    while len(alerts) > ALERT_MAX_ENTRIES:
+        # Salvo with more distinct IDs than we track: forget the least recently seen
+        evicted, _ = alerts.popitem(last=False)
+        alert_areas.pop(evicted, None)
+        dedupe_counters["evicted"] += 1
+    if dedupe_log is not None:
+        dedupe_log.append(alert_id, now)
+
+
+def cleanup_alerts():
+    cutoff = time.time() - ALERT_TTL
+    while alerts:
+        aid, ts = next(iter(alerts.items()))
+        if ts >= cutoff:
+            break
+        alerts.popitem(last=False)
+        alert_areas.pop(aid, None)
+        dedupe_counters["expired"] += 1
+    if dedupe_log is not None:
+        dedupe_log.compact(alerts)
+
+
+def added_alert_areas(alert: AlertObject) -> List[str]:
+    # Areas in a repeat of a known alert ID that were not published yet, in upstream order
+    areas = frozenset(alert.data)
+    known = alert_areas.get(alert.id)
+    if known is None:
+        # Seen before a restart; its area set was not persisted, so start tracking from here
+        alert_areas[alert.id] = areas
+        return []
+    if areas <= known:
+        return []
+    alert_areas[alert.id] = known | areas
+    return [area for area in alert.data if area not in known]
+
+
+def dedupe_info() -> dict:
+    return {
+        "entries": len(alerts),
+        "max_entries": ALERT_MAX_ENTRIES,
+        "ttl": ALERT_TTL,
+        **dedupe_counters,
+        "persistent": dedupe_log.info() if dedupe_log is not None else None,
+    }
 
 
 def _area_file_is_fresh() -> bool:
@@ -154,7 +1043,20 @@ def _area_file_is_fresh() -> bool:
     return age < AREA_REFRESH_INTERVAL
 
 
-async def fetch_area_polygons(session: aiohttp.ClientSession) -> dict:
+def segment_fingerprint(segment: dict) -> str:
+    return hashlib.sha1(json.dumps(segment, sort_keys=True, ensure_ascii=False).encode('utf-8')).hexdigest()[:16]
+
+
+def load_previous_area_data() -> dict:
+    try:
+        with open(AREA_POLYGONS_FILE, 'rb') as f:
+            return json_loads(f.read())
+    except Exception:
+        return {}
+
+
+async def fetch_area_polygons(session: aiohttp.ClientSession, previous: Optional[dict] = None) -> dict:
+    previous = previous or {}
     logger.info("Starting area polygon data fetch...")
     try:
         # Step 1: Fetch city list from Pikud Haoref
@@ -181,25 +1083,38 @@ async def fetch_area_polygons(session: aiohttp.ClientSession) -> dict:
             segments_data = await resp.json(content_type=None)
 
         segments = segments_data.get("segments", {})
-        # Build name -> segment_id mapping
+        # Build name -> (segment_id, fingerprint) mapping
         segment_by_name = {}
         for seg_id, seg in segments.items():
             name = seg.get("name", "").strip()
             if name:
-                segment_by_name[name] = seg.get("id", seg_id)
+                segment_by_name[name] = (seg.get("id", seg_id), segment_fingerprint(seg))
 
-        # Step 3: Match cities to segments and fetch polygons
+        # Step 3: Match cities to segments; reuse stored polygons whose segment is unchanged
+        now = time.time()
         matched = []
+        reused = {}
+        to_fetch = []
         for city_name, migun_time in city_map.items():
-            if city_name in segment_by_name:
-                matched.append((city_name, migun_time, segment_by_name[city_name]))
+            if city_name not in segment_by_name:
+                continue
+            segment_id, fingerprint = segment_by_name[city_name]
+            matched.append(city_name)
+            prev = previous.get(city_name)
+            if (prev and prev.get("polygon")
+                    and prev.get("segment_id") == segment_id
+                    and prev.get("fingerprint") == fingerprint
+                    and now - prev.get("fetched_at", 0) < AREA_POLYGON_MAX_AGE):
+                reused[city_name] = {**prev, "migun_time": migun_time}
+            else:
+                to_fetch.append((city_name, migun_time, segment_id, fingerprint))
 
-        logger.info(f"Matched {len(matched)} cities to segments")
+        logger.info(f"Matched {len(matched)} cities to segments, {len(to_fetch)} polygons to fetch")
 
-        result = {}
+        fetched = {}
         sem = asyncio.Semaphore(AREA_FETCH_CONCURRENCY)
 
-        async def fetch_polygon(city_name, migun_time, segment_id):
+        async def fetch_polygon(city_name, migun_time, segment_id, fingerprint):
             async with sem:
                 try:
                     poly_url = MESER_POLYGON_URL_TEMPLATE.format(segment_id=segment_id)
@@ -210,45 +1125,295 @@ async def fetch_area_polygons(session: aiohttp.ClientSession) -> dict:
                     point_list = poly_data.get("polygonPointList", [])
                     if point_list and len(point_list) > 0:
                         polygon = point_list[0] if isinstance(point_list[0][0], list) else point_list
-                        result[city_name] = {"migun_time": migun_time, "polygon": polygon}
+                        fetched[city_name] = {
+                            "migun_time": migun_time,
+                            "polygon": polygon,
+                            "segment_id": segment_id,
+                            "fingerprint": fingerprint,
+                            "fetched_at": round(now),
+                        }
                 except Exception as e:
                     logger.warning(f"Failed to fetch polygon for {city_name}: {e}")
 
-        tasks = [fetch_polygon(cn, mt, sid) for cn, mt, sid in matched]
+        tasks = [fetch_polygon(cn, mt, sid, fp) for cn, mt, sid, fp in to_fetch]
         await asyncio.gather(*tasks)
 
-        logger.info(f"Area polygon fetch complete. Total areas: {len(result)}")
+        # Keep city-list order; a failed refetch keeps the previously stored polygon
+        result = {}
+        for city_name in matched:
+            if city_name in fetched:
+                result[city_name] = fetched[city_name]
+            elif city_name in reused:
+                result[city_name] = reused[city_name]
+            elif previous.get(city_name, {}).get("polygon"):
+                result[city_name] = {**previous[city_name], "migun_time": city_map[city_name]}
+
+        logger.info(f"Area polygon fetch complete. Total areas: {len(result)}, fetched: {len(fetched)}, reused: {len(reused)}")
         return result
     except Exception as e:
         logger.error(f"Error fetching area polygons: {e}")
         return {}
 
 
-def build_bbox_index(area_data: dict) -> dict:
-    index = {}
+def area_store_from_data(area_data: dict) -> AreaStore:
+    names = []
+    migun_times = []
+    offsets = [0]
+    coords = []
     for name, data in area_data.items():
-        polygon = data.get("polygon", [])
-        if not polygon:
+        poly_coords = data.get("polygon", [])
+        closed = len(poly_coords) > 0 and poly_coords[0] == poly_coords[-1]
+        if len(poly_coords) < (4 if closed else 3):
             continue
-        lats = [p[0] for p in polygon]
-        lons = [p[1] for p in polygon]
-        index[name] = {
-            "migun_time": data.get("migun_time", 0),
-            "bbox": (min(lats), max(lats), min(lons), max(lons))
+        names.append(name)
+        migun_times.append(data.get("migun_time", 0))
+        # JSON stores [lat, lon], the store keeps shapely order (x=lon, y=lat)
+        coords.extend((p[1], p[0]) for p in poly_coords)
+        offsets.append(len(coords))
+    return AreaStore(
+        names=names,
+        migun_times=np.array(migun_times, dtype=np.int64),
+        offsets=np.array(offsets, dtype=np.int64),
+        coords=np.array(coords, dtype=np.float64).reshape(-1, 2),
+    )
+
+
+def area_store_path() -> str:
+    return os.path.join(os.path.dirname(AREA_POLYGONS_FILE), "area_polygons.bin")
+
+
+def write_area_store(store: AreaStore, path: str):
+    names = [name.encode('utf-8') for name in store.names]
+    name_offsets = np.concatenate(([0], np.cumsum([len(n) for n in names]))).astype(np.int64)
+    header = np.array([len(store.names), len(store.coords), int(name_offsets[-1])], dtype=np.uint64)
+    # Write to a temp file and rename, so processes still mapping the old file keep a valid view
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'wb') as f:
+        f.write(AREA_STORE_MAGIC)
+        f.write(header.tobytes())
+        f.write(np.ascontiguousarray(store.coords, dtype=np.float64).tobytes())
+        f.write(store.offsets.astype(np.int64).tobytes())
+        f.write(store.migun_times.astype(np.int64).tobytes())
+        f.write(name_offsets.tobytes())
+        f.write(b"".join(names))
+    os.replace(tmp_path, path)
+
+
+def read_area_store(path: str) -> AreaStore:
+    buf = np.memmap(path, dtype=np.uint8, mode='r')
+    if bytes(buf[:len(AREA_STORE_MAGIC)]) != AREA_STORE_MAGIC:
+        raise ValueError(f"{path} is not an area store")
+    pos = len(AREA_STORE_MAGIC)
+    n_areas, n_coords, names_len = (int(v) for v in np.frombuffer(buf, dtype=np.uint64, count=3, offset=pos))
+    pos += 24
+    coords = np.frombuffer(buf, dtype=np.float64, count=n_coords * 2, offset=pos).reshape(-1, 2)
+    pos += n_coords * 16
+    offsets = np.frombuffer(buf, dtype=np.int64, count=n_areas + 1, offset=pos)
+    pos += (n_areas + 1) * 8
+    migun_times = np.frombuffer(buf, dtype=np.int64, count=n_areas, offset=pos)
+    pos += n_areas * 8
+    name_offsets = np.frombuffer(buf, dtype=np.int64, count=n_areas + 1, offset=pos).tolist()
+    pos += (n_areas + 1) * 8
+    name_bytes = bytes(buf[pos:pos + names_len])
+    names = [name_bytes[name_offsets[i]:name_offsets[i + 1]].decode('utf-8') for i in range(n_areas)]
+    return AreaStore(names=names, migun_times=migun_times, offsets=offsets, coords=coords)
+
+
+def build_bbox_index(store: AreaStore) -> dict:
+    if not store.names:
+        return {}
+    starts = store.offsets[:-1]
+    mins = np.minimum.reduceat(store.coords, starts, axis=0).tolist()
+    maxs = np.maximum.reduceat(store.coords, starts, axis=0).tolist()
+    migun_times = store.migun_times.tolist()
+    return {
+        name: {
+            "migun_time": migun_times[i],
+            "bbox": (mins[i][1], maxs[i][1], mins[i][0], maxs[i][0])
         }
-    return index
+        for i, name in enumerate(store.names)
+    }
 
 
-async def load_area_data():
-    global area_bbox_index, area_data_loaded
+def build_area_geometries(store: AreaStore) -> dict:
+    if not store.names:
+        return {}
+    ring_ids = np.repeat(np.arange(len(store.names)), np.diff(store.offsets))
+    polygons = shapely.polygons(shapely.linearrings(store.coords, indices=ring_ids))
+    shapely.prepare(polygons)
+    return dict(zip(store.names, polygons.tolist()))
+
+
+def build_spatial_index(bbox_index: dict, geometries: dict) -> AreaSpatialIndex:
+    names = [name for name in bbox_index if name in geometries]
+    return AreaSpatialIndex(
+        names=names,
+        migun_times=[bbox_index[name]["migun_time"] for name in names],
+        tree=STRtree([geometries[name] for name in names]),
+    )
+
 
+def build_area_grid(spatial_index: AreaSpatialIndex, cell_size: float) -> Optional[AreaGrid]:
+    geometries = spatial_index.tree.geometries
+    if len(geometries) == 0:
+        return None
+    min_lon, min_lat, max_lon, max_lat = shapely.total_bounds(geometries)
+    cols = max(int(np.ceil((max_lon - min_lon) / cell_size)), 1)
+    rows = max(int(np.ceil((max_lat - min_lat) / cell_size)), 1)
+    row_idx, col_idx = np.divmod(np.arange(rows * cols), cols)
+    x0 = min_lon + col_idx * cell_size
+    y0 = min_lat + row_idx * cell_size
+    boxes = shapely.box(x0, y0, x0 + cell_size, y0 + cell_size)
+
+    cell_idx, area_idx = spatial_index.tree.query(boxes, predicate="intersects")
+    order = np.lexsort((area_idx, cell_idx))
+    cell_idx = cell_idx[order]
+    area_idx = area_idx[order]
+
+    # A cell is owned when the first intersecting area fully contains it
+    owners = np.full(rows * cols, GRID_EMPTY, dtype=np.int32)
+    touched, first = np.unique(cell_idx, return_index=True)
+    first_area = area_idx[first]
+    owned = shapely.contains_properly(geometries[first_area], boxes[touched])
+    owners[touched] = GRID_BOUNDARY
+    owners[touched[owned]] = first_area[owned]
+
+    boundary = owners[cell_idx] == GRID_BOUNDARY
+    counts = np.bincount(cell_idx[boundary], minlength=rows * cols)
+    return AreaGrid(
+        min_lon=float(min_lon),
+        min_lat=float(min_lat),
+        cell_size=cell_size,
+        rows=rows,
+        cols=cols,
+        owners=owners,
+        candidate_offsets=np.concatenate(([0], np.cumsum(counts))).astype(np.int64),
+        candidate_indices=area_idx[boundary].astype(np.int32),
+    )
+
+
+def area_grid_path() -> str:
+    return os.path.join(os.path.dirname(AREA_POLYGONS_FILE), "area_grid.npz")
+
+
+def save_area_grid(grid: AreaGrid, names: List[str], path: str):
+    with open(path, 'wb') as f:
+        np.savez(
+            f,
+            bounds=np.array([grid.min_lon, grid.min_lat, grid.cell_size]),
+            shape=np.array([grid.rows, grid.cols]),
+            owners=grid.owners,
+            candidate_offsets=grid.candidate_offsets,
+            candidate_indices=grid.candidate_indices,
+            names=np.array(names, dtype=str),
+        )
+
+
+def load_area_grid(names: List[str], path: str) -> Optional[AreaGrid]:
+    p = pathlib.Path(path)
+    source = pathlib.Path(AREA_POLYGONS_FILE)
+    if not p.exists() or (source.exists() and p.stat().st_mtime < source.stat().st_mtime):
+        return None
+    with np.load(path, allow_pickle=False) as f:
+        min_lon, min_lat, cell_size = f["bounds"].tolist()
+        if cell_size != AREA_GRID_CELL_SIZE or f["names"].tolist() != names:
+            return None
+        rows, cols = f["shape"].tolist()
+        return AreaGrid(
+            min_lon=min_lon,
+            min_lat=min_lat,
+            cell_size=cell_size,
+            rows=rows,
+            cols=cols,
+            owners=f["owners"],
+            candidate_offsets=f["candidate_offsets"],
+            candidate_indices=f["candidate_indices"],
+        )
+
+
+def load_or_build_area_grid(spatial_index: AreaSpatialIndex, path: Optional[str] = None) -> Optional[AreaGrid]:
+    if path:
+        try:
+            grid = load_area_grid(spatial_index.names, path)
+            if grid is not None:
+                logger.info(f"Loaded area grid from {path}")
+                return grid
+        except Exception as e:
+            logger.warning(f"Failed to load area grid: {e}")
+
+    grid = build_area_grid(spatial_index, AREA_GRID_CELL_SIZE)
+    if grid is not None and path:
+        try:
+            save_area_grid(grid, spatial_index.names, path)
+        except Exception as e:
+            logger.warning(f"Failed to save area grid: {e}")
+    return grid
+
+
+def build_area_index(store: AreaStore, grid_path: Optional[str] = None) -> tuple:
+    bbox_index = build_bbox_index(store)
+    geometries = build_area_geometries(store)
+    spatial_index = build_spatial_index(bbox_index, geometries)
+    if AREA_GRID_CELL_SIZE > 0:
+        spatial_index.grid = load_or_build_area_grid(spatial_index, grid_path)
+    return bbox_index, geometries, spatial_index
+
+
+def install_area_index(bbox_index: dict, geometries: dict, spatial_index: AreaSpatialIndex):
+    global area_bbox_index, area_geometries, area_spatial_index, area_data_loaded, area_dataset_version
+    # Swap the fully built index in and invalidate the lookup cache together (no await in between)
+    area_bbox_index = bbox_index
+    area_geometries = geometries
+    area_spatial_index = spatial_index
+    area_dataset_version += 1
+    area_lookup_cache.invalidate(area_dataset_version)
+    area_data_loaded = True
+    mark_startup("area_ready")
+
+
+def apply_area_store(store: AreaStore, grid_path: Optional[str] = None):
+    install_area_index(*build_area_index(store, grid_path))
+
+
+def apply_area_data(data: dict, grid_path: Optional[str] = None):
+    apply_area_store(area_store_from_data(data), grid_path)
+
+
+def load_local_area_store() -> AreaStore:
+    json_path = pathlib.Path(AREA_POLYGONS_FILE)
+    bin_path = pathlib.Path(area_store_path())
+    if bin_path.exists() and (not json_path.exists() or bin_path.stat().st_mtime >= json_path.stat().st_mtime):
+        return read_area_store(str(bin_path))
+
+    # Only the JSON export is present (or newer) — import it and write the binary store
+    with open(AREA_POLYGONS_FILE, 'rb') as f:
+        store = area_store_from_data(json_loads(f.read()))
+    try:
+        write_area_store(store, str(bin_path))
+    except Exception as e:
+        logger.warning(f"Failed to write area store: {e}")
+    return store
+
+
+def build_local_area_index() -> tuple:
+    return build_area_index(load_local_area_store(), area_grid_path())
+
+
+def save_and_build_area_index(data: dict) -> tuple:
+    with open(AREA_POLYGONS_FILE, 'w', encoding='utf-8') as f:
+        f.write(json_dumps(data))
+    store = area_store_from_data(data)
+    write_area_store(store, area_store_path())
+    return build_area_index(store, area_grid_path())
+
+
+async def load_area_data():
+    # File I/O and index builds run in a worker thread; the current index keeps
+    # serving /area until the new one is complete and swapped in on the loop.
     if _area_file_is_fresh():
         logger.info("Loading area data from fresh file...")
         try:
-            with open(AREA_POLYGONS_FILE, 'r', encoding='utf-8') as f:
-                data = json.load(f)
-            area_bbox_index = build_bbox_index(data)
-            area_data_loaded = True
+            install_area_index(*await asyncio.to_thread(build_local_area_index))
             logger.info(f"Loaded {len(area_bbox_index)} areas from file")
             return
         except Exception as e:
@@ -258,38 +1423,33 @@ async def load_area_data():
     logger.info("Fetching fresh area data...")
     timeout = aiohttp.ClientTimeout(sock_connect=10, sock_read=30)
     try:
+        previous = await asyncio.to_thread(load_previous_area_data)
         async with aiohttp.ClientSession(timeout=timeout) as session:
-            data = await fetch_area_polygons(session)
+            data = await fetch_area_polygons(session, previous)
     except Exception as e:
         logger.error(f"Failed to create session for area fetch: {e}")
         data = {}
 
     if data:
         try:
-            with open(AREA_POLYGONS_FILE, 'w', encoding='utf-8') as f:
-                json.dump(data, f, ensure_ascii=False)
-            area_bbox_index = build_bbox_index(data)
-            area_data_loaded = True
+            install_area_index(*await asyncio.to_thread(save_and_build_area_index, data))
             logger.info(f"Saved and indexed {len(area_bbox_index)} areas")
             return
         except Exception as e:
             logger.error(f"Failed to save area file: {e}")
 
     # Fetch failed — try stale file as fallback
-    if pathlib.Path(AREA_POLYGONS_FILE).exists():
+    if pathlib.Path(AREA_POLYGONS_FILE).exists() or pathlib.Path(area_store_path()).exists():
         logger.warning("Fetch failed, falling back to stale area file")
         try:
-            with open(AREA_POLYGONS_FILE, 'r', encoding='utf-8') as f:
-                data = json.load(f)
-            area_bbox_index = build_bbox_index(data)
-            area_data_loaded = True
+            install_area_index(*await asyncio.to_thread(build_local_area_index))
             logger.info(f"Loaded {len(area_bbox_index)} areas from stale file")
             return
         except Exception as e:
             logger.error(f"Failed to load stale area file: {e}")
 
+    # Keep serving whatever index is already installed
     logger.error("No area data available")
-    area_data_loaded = False
 
 
 async def area_refresh_loop():
@@ -303,39 +1463,132 @@ async def area_refresh_loop():
             logger.error(f"Error in area refresh loop: {e}")
 
 
+def _area_result(spatial_index: AreaSpatialIndex, i: int) -> dict:
+    return {"area": spatial_index.names[i], "migun_time": spatial_index.migun_times[i]}
+
+
 def lookup_area(lat: float, lon: float) -> Optional[dict]:
-    # Pre-filter candidates using bounding box
-    candidates = []
-    for name, info in area_bbox_index.items():
-        min_lat, max_lat, min_lon, max_lon = info["bbox"]
-        if min_lat <= lat <= max_lat and min_lon <= lon <= max_lon:
-            candidates.append((name, info["migun_time"]))
-
-    if not candidates:
+    spatial_index = area_spatial_index
+    if spatial_index is None:
         return None
 
-    # Load polygons from file and check containment
-    try:
-        with open(AREA_POLYGONS_FILE, 'r', encoding='utf-8') as f:
-            all_data = json.load(f)
-    except Exception:
+    candidates = None
+    grid = spatial_index.grid
+    if grid is not None:
+        cell = grid.cell_of(lat, lon)
+        if cell >= 0:
+            # Interior and empty cells resolve without any polygon test
+            owner = int(grid.owners[cell])
+            if owner >= 0:
+                return _area_result(spatial_index, owner)
+            if owner == GRID_EMPTY:
+                return None
+            candidates = grid.candidate_indices[grid.candidate_offsets[cell]:grid.candidate_offsets[cell + 1]]
+
+    if candidates is None:
+        # STRtree returns the bbox candidates; test them against the prepared polygons
+        candidates = spatial_index.tree.query(Point(lon, lat))
+        candidates.sort()
+    if len(candidates) == 0:
+        return None
+    hits = candidates[shapely.contains_xy(spatial_index.tree.geometries[candidates], lon, lat)]
+    if len(hits) == 0:
         return None
 
-    point = Point(lon, lat)
-    for name, migun_time in candidates:
-        area_entry = all_data.get(name)
-        if not area_entry:
-            continue
-        poly_coords = area_entry.get("polygon", [])
-        if len(poly_coords) < 3:
-            continue
-        # File stores [lat, lon], shapely needs (x=lon, y=lat)
-        shapely_coords = [(p[1], p[0]) for p in poly_coords]
-        polygon = Polygon(shapely_coords)
-        if polygon.contains(point):
-            return {"area": name, "migun_time": migun_time}
+    return _area_result(spatial_index, int(hits[0]))
 
-    return None
+
+def cached_lookup_area(lat: float, lon: float) -> Optional[dict]:
+    cache = area_lookup_cache
+    if cache.maxsize <= 0:
+        # Without a cache there is no reason to give up the exact coordinates
+        return lookup_area(lat, lon)
+    key = cache.key(lat, lon)
+    try:
+        return cache.get(key)
+    except KeyError:
+        pass
+    version = area_dataset_version
+    result = lookup_area(*key)
+    cache.put(key, result, version)
+    return result
+
+
+def lookup_areas(lats: np.ndarray, lons: np.ndarray) -> List[Optional[dict]]:
+    results: List[Optional[dict]] = [None] * len(lats)
+    spatial_index = area_spatial_index
+    if spatial_index is None or len(lats) == 0:
+        return results
+
+    pending = np.arange(len(lats))
+    grid = spatial_index.grid
+    if grid is not None:
+        owners = grid.owners_of(lats, lons)
+        owned = np.flatnonzero(owners >= 0)
+        for p, a in zip(owned.tolist(), owners[owned].tolist()):
+            results[p] = _area_result(spatial_index, a)
+        pending = np.flatnonzero((owners == GRID_BOUNDARY) | (owners == GRID_OUTSIDE))
+        if len(pending) == 0:
+            return results
+
+    # One bulk tree query for the remaining points, then one vectorized containment test over all pairs
+    lats = lats[pending]
+    lons = lons[pending]
+    point_idx, area_idx = spatial_index.tree.query(shapely.points(lons, lats))
+    inside = shapely.contains_xy(spatial_index.tree.geometries[area_idx], lons[point_idx], lats[point_idx])
+    point_idx = point_idx[inside]
+    area_idx = area_idx[inside]
+
+    # Keep the lowest area index per point so overlaps resolve like lookup_area
+    order = np.lexsort((area_idx, point_idx))
+    point_idx = point_idx[order]
+    area_idx = area_idx[order]
+    first_points, first = np.unique(point_idx, return_index=True)
+    for p, a in zip(pending[first_points].tolist(), area_idx[first].tolist()):
+        results[p] = _area_result(spatial_index, a)
+    return results
+
+
+class BatchTooLarge(ValueError):
+    pass
+
+
+def parse_batch_points(body: str, max_points: int = 0) -> tuple:
+    body = body.strip()
+    if not body:
+        raise ValueError("empty body")
+    items = None
+    if body.startswith("["):
+        # A JSON array of points, unless it is NDJSON whose lines are [lat, lon] pairs
+        try:
+            items = json_loads(body)
+        except ValueError:
+            items = None
+        if not (isinstance(items, list) and all(isinstance(item, (dict, list)) for item in items)):
+            items = None
+        elif max_points and len(items) > max_points:
+            raise BatchTooLarge(f"Too many points (max {max_points})")
+    if items is None:
+        # NDJSON: one point per line; count them before parsing any
+        lines = [line for line in body.splitlines() if line.strip()]
+        if max_points and len(lines) > max_points:
+            raise BatchTooLarge(f"Too many points (max {max_points})")
+        items = [json_loads(line) for line in lines]
+
+    lats = np.empty(len(items), dtype=np.float64)
+    lons = np.empty(len(items), dtype=np.float64)
+    for i, item in enumerate(items):
+        if isinstance(item, dict):
+            lats[i] = float(item["lat"])
+            lons[i] = float(item["lon"])
+        elif isinstance(item, (list, tuple)) and len(item) == 2:
+            lats[i] = float(item[0])
+            lons[i] = float(item[1])
+        else:
+            raise ValueError(f"invalid point at index {i}")
+    if not (np.isfinite(lats).all() and np.isfinite(lons).all()):
+        raise ValueError("coordinates must be finite numbers")
+    return lats, lons
 
 
 async def area_handler(request):
@@ -349,6 +1602,8 @@ async def area_handler(request):
     try:
         lat = float(lat_str)
         lon = float(lon_str)
+        if not (math.isfinite(lat) and math.isfinite(lon)):
+            raise ValueError("non-finite coordinates")
     except ValueError:
         return aiohttp.web.json_response(
             {"error": "Missing or invalid lat/lon query parameters"}, status=400
@@ -359,7 +1614,9 @@ async def area_handler(request):
             {"error": "Area data not loaded yet"}, status=503
         )
 
-    result = lookup_area(lat, lon)
+    lookup_start = time.monotonic()
+    result = cached_lookup_area(lat, lon)
+    metric_histograms["area_lookup"].observe(time.monotonic() - lookup_start)
     if result:
         return aiohttp.web.json_response(result, status=200)
 
@@ -368,6 +1625,105 @@ async def area_handler(request):
     )
 
 
+def area_batch_response_text(body: str) -> str:
+    lats, lons = parse_batch_points(body, AREA_BATCH_MAX_POINTS)
+    results = lookup_areas(lats, lons)
+    return json_dumps({
+        "results": [
+            {"lat": lat, "lon": lon, "area": r["area"] if r else None, "migun_time": r["migun_time"] if r else None}
+            for lat, lon, r in zip(lats.tolist(), lons.tolist(), results)
+        ]
+    })
+
+
+async def area_batch_handler(request):
+    if not area_data_loaded:
+        return aiohttp.web.json_response(
+            {"error": "Area data not loaded yet"}, status=503
+        )
+
+    body = await request.text()
+    try:
+        # Parsing, lookup and encoding of a large batch take long enough to stall polling
+        text = await asyncio.to_thread(area_batch_response_text, body)
+    except BatchTooLarge as e:
+        return aiohttp.web.json_response({"error": str(e)}, status=413)
+    except (ValueError, KeyError, TypeError) as e:
+        return aiohttp.web.json_response(
+            {"error": f"Invalid batch body: {e}"}, status=400
+        )
+    return aiohttp.web.Response(text=text, content_type="application/json", status=200)
+
+
+async def recent_alerts_handler(request):
+    try:
+        since = float(request.query.get("since", 0))
+    except ValueError:
+        return aiohttp.web.json_response({"error": "Invalid since parameter"}, status=400)
+    area = request.query.get("area") or None
+    entries = alert_history.recent(since, area)
+    return aiohttp.web.json_response({
+        "alerts": [
+            {"id": a.id, "cat": a.cat, "title": a.title, "data": a.data, "desc": a.desc, "delta": a.delta, "published_at": round(ts, 3)}
+            for ts, a in entries
+        ],
+    }, status=200)
+
+
+def render_metrics() -> str:
+    lines = []
+
+    def metric(name: str, kind: str, help_text: str, samples: list):
+        lines.append(f"# HELP {name} {help_text}")
+        lines.append(f"# TYPE {name} {kind}")
+        for labels, value in samples:
+            lines.append(f"{name}{{{labels}}} {value}" if labels else f"{name} {value}")
+
+    def histogram(name: str, help_text: str, histograms: dict):
+        lines.append(f"# HELP {name} {help_text}")
+        lines.append(f"# TYPE {name} histogram")
+        for labels, hist in histograms.items():
+            lines.extend(hist.render(name, labels))
+
+    histogram("redalert_oref_fetch_seconds", "Oref alerts.json poll latency.", {"": metric_histograms["oref_fetch"]})
+    histogram("redalert_alert_parse_seconds", "Decode and parse time of changed alerts.json bodies.", {"": metric_histograms["alert_parse"]})
+    histogram("redalert_mqtt_publish_seconds", "MQTT publish latency per topic kind.",
+              {f'topic="{kind}"': hist for kind, hist in publish_histograms.items()})
+    histogram("redalert_area_lookup_seconds", "GET /area lookup latency.", {"": metric_histograms["area_lookup"]})
+
+    metric("redalert_polls_total", "counter", "Oref polls answered.", [("", poll_counters["polls"])])
+    metric("redalert_poll_fast_path_total", "counter", "Polls answered without parsing the body.",
+           [(f'path="{path}"', poll_counters[path]) for path in ("not_modified", "empty", "unchanged")])
+    metric("redalert_fetch_errors_total", "counter", "Polls where every alert source failed.", [("", poll_counters["errors"])])
+    metric("redalert_fetch_timeouts_total", "counter", "Polls abandoned after FETCH_TIMEOUT.", [("", poll_counters["timeouts"])])
+    metric("redalert_new_alerts_total", "counter", "Alerts seen for the first time.", [("", dedupe_counters["new"])])
+    metric("redalert_alert_deltas_total", "counter", "Known alerts that gained areas.", [("", dedupe_counters["deltas"])])
+    metric("redalert_dedupe_hit_polls_total", "counter", "Polls that returned an already published alert (counted per poll, not per alert).", [("", dedupe_counters["hits"])])
+    metric("redalert_test_alerts_filtered_total", "counter", "Distinct test alert IDs dropped (INCLUDE_TEST_ALERTS=False).", [("", dedupe_counters["test_filtered"])])
+    metric("redalert_alerts_published_total", "counter", "Alerts accepted by the MQTT broker.", [("", pipeline_counters["published"])])
+    metric("redalert_alerts_dropped_total", "counter", "Alerts dropped because the pipeline queue was full.", [("", pipeline_counters["dropped"])])
+    metric("redalert_outbox_depth", "gauge", "Alerts waiting in the MQTT outbox.", [("", len(alert_outbox) if alert_outbox is not None else 0)])
+    metric("redalert_last_successful_fetch_timestamp_seconds", "gauge", "Unix time of the last successful Oref poll.", [("", round(last_successful_fetch, 3))])
+    metric("redalert_last_mqtt_success_timestamp_seconds", "gauge", "Unix time of the last successful MQTT publish.", [("", round(last_mqtt_success, 3))])
+    return "\n".join(lines) + "\n"
+
+
+async def metrics_handler(request):
+    return aiohttp.web.Response(body=render_metrics().encode('utf-8'),
+                                headers={"Content-Type": "text/plain; version=0.0.4; charset=utf-8"})
+
+
+async def stats_handler(request):
+    return aiohttp.web.json_response({
+        "startup": startup_timings,
+        "pipeline": pipeline_info(),
+        "polling": polling_info(),
+        "dedupe": dedupe_info(),
+        "trace": {name: stats.summary() for name, stats in trace_stats.items()},
+        "area_cache": area_lookup_cache.info(),
+    }, status=200)
+
+
 async def health_handler(request):
     now = time.time()
     age = now - last_heartbeat
@@ -391,11 +1747,20 @@ async def health_handler(request):
     )
 
 
-async def run_health_server():
-    app = aiohttp.web.Application()
+def make_health_app() -> aiohttp.web.Application:
+    # The default 1 MiB body limit would reject batches well below AREA_BATCH_MAX_POINTS
+    app = aiohttp.web.Application(client_max_size=max(1024 ** 2, AREA_BATCH_MAX_POINTS * AREA_BATCH_BYTES_PER_POINT))
     app.router.add_get("/health", health_handler)
     app.router.add_get("/area", area_handler)
-    runner = aiohttp.web.AppRunner(app, access_log=None)
+    app.router.add_post("/area/batch", area_batch_handler)
+    app.router.add_get("/alerts/recent", recent_alerts_handler)
+    app.router.add_get("/stats", stats_handler)
+    app.router.add_get("/metrics", metrics_handler)
+    return app
+
+
+async def run_health_server():
+    runner = aiohttp.web.AppRunner(make_health_app(), access_log=None)
     await runner.setup()
     site = aiohttp.web.TCPSite(runner, "0.0.0.0", HEALTH_PORT)
     await site.start()
@@ -404,79 +1769,235 @@ async def run_health_server():
         await asyncio.sleep(3600)
 
 
+def enqueue_alert(queue: asyncio.Queue, alert: AlertObject):
+    if queue.full():
+        # The publish stage is stuck; drop the oldest alert rather than stall polling
+        dropped, _ = queue.get_nowait()
+        pipeline_counters["dropped"] += 1
+        logger.error(f"Alert queue full, dropped alert {dropped.id}")
+    queue.put_nowait((alert, time.monotonic()))
+    pipeline_counters["enqueued"] += 1
+
+
+async def poll_once(session: aiohttp.ClientSession, queue: asyncio.Queue, scheduler: PollScheduler, seq: int):
+    try:
+        sent_at = time.monotonic()
+        failed = False
+        try:
+            alert = await asyncio.wait_for(fetch_alert(session), timeout=FETCH_TIMEOUT)
+        except asyncio.TimeoutError:
+            logger.warning(f"fetch_alert timed out after {FETCH_TIMEOUT}s")
+            poll_counters["timeouts"] += 1
+            alert = None
+            failed = True
+        except FetchError:
+            alert = None
+            failed = True
+        received_at = time.monotonic()
+        pipeline_stats["fetch"].observe(received_at - sent_at)
+        metric_histograms["oref_fetch"].observe(received_at - sent_at)
+        scheduler.observe(received_at - sent_at, failed)
+        if failed:
+            return
+        previous_sent_at = scheduler.applied_sent_at
+        if not scheduler.accept(seq, sent_at):
+            # A newer poll already answered; this response describes an older state
+            return
+        if not alert:
+            return
+        if is_test_alert(alert):
+            if alert.id not in filtered_test_ids:
+                filtered_test_ids[alert.id] = None
+                if len(filtered_test_ids) > FILTERED_TEST_IDS_MAX:
+                    filtered_test_ids.popitem(last=False)
+                dedupe_counters["test_filtered"] += 1
+            return
+        # Stamps from fetch_alert only apply if this request parsed the body; a cached result keeps older ones
+        trace = alert.trace if alert.trace.get("received", 0) >= sent_at else {"received": received_at}
+        if is_new_alert(alert.id):
+            dedupe_counters["new"] += 1
+            remember_alert(alert.id, alert.data)
+            if previous_sent_at is not None:
+                pipeline_stats["detection"].observe(received_at - previous_sent_at)
+            logger.info(f"New alert: {alert.raw_data.replace(chr(10), '').replace(chr(13), '').replace('  ', ' ')}")
+            enqueue_alert(queue, replace(alert, trace={**trace, "deduped": time.monotonic()}))
+        else:
+            added = added_alert_areas(alert)
+            if added:
+                dedupe_counters["deltas"] += 1
+                logger.info(f"Alert {alert.id} added {len(added)} areas: {', '.join(added)}")
+                enqueue_alert(queue, replace(alert, data=added, delta=True, trace={**trace, "deduped": time.monotonic()}))
+    except Exception as ex:
+        logger.error(f"Unexpected error in poll cycle: {ex}")
+
+
+async def fetch_stage(session: aiohttp.ClientSession, queue: asyncio.Queue):
+    global last_heartbeat, poll_scheduler
+    poll_scheduler = scheduler = PollScheduler(POLL_INTERVAL, POLL_INTERVAL_MAX, POLL_MAX_IN_FLIGHT)
+    in_flight: set = set()
+    last_cleanup = time.time()
+    try:
+        while True:
+            tick_start = time.monotonic()
+            try:
+                if len(in_flight) >= scheduler.max_in_flight:
+                    await asyncio.wait(in_flight, return_when=asyncio.FIRST_COMPLETED)
+                task = asyncio.create_task(poll_once(session, queue, scheduler, scheduler.next_seq()))
+                in_flight.add(task)
+                task.add_done_callback(in_flight.discard)
+                # Cleanup every 60 seconds
+                if time.time() - last_cleanup > 60:
+                    cleanup_alerts()
+                    last_cleanup = time.time()
+            except Exception as ex:
+                logger.error(f"Unexpected error in poll cycle: {ex}")
+            # Fixed-rate polling at the scheduler's current interval
+            remaining = scheduler.interval - (time.monotonic() - tick_start)
+            if remaining > 0:
+                await asyncio.sleep(remaining)
+            last_heartbeat = time.time()
+    finally:
+        for task in in_flight:
+            task.cancel()
+
+
+async def flush_outbox(mqtt_client: aiomqtt.Client, outbox: AlertOutbox):
+    if not len(outbox):
+        return
+    flush_start = time.monotonic()
+    while len(outbox):
+        if outbox.expire_head():
+            continue
+        alert, enqueued_at = outbox.peek()
+        publish_start = time.monotonic()
+        pipeline_stats["queue_wait"].observe(publish_start - enqueued_at)
+        done = outbox.head_done()
+        sent_before = len(done)
+        errors = await send_alert(mqtt_client, alert, done)
+        if errors:
+            if len(done) > sent_before:
+                outbox.record_done()
+            outbox.head_attempts += 1
+            if all(isinstance(e, aiomqtt.MqttError) for e in errors) and outbox.head_attempts < OUTBOX_MAX_ATTEMPTS:
+                # Connection problem: leave it at the head of the outbox and reconnect
+                raise aiomqtt.MqttError(f"Failed to publish alert {alert.id}, {len(outbox)} alerts kept in outbox")
+            # Rejected (bad topic, payload) or failing every time: don't let it block the alerts behind it
+            logger.error(f"Dropping alert {alert.id} after {outbox.head_attempts} failed publish attempts: {errors[0]}")
+            outbox.drop_head()
+            continue
+        outbox.pop()
+        alert_history.add(alert, time.time())
+        pipeline_stats["publish"].observe(time.monotonic() - publish_start)
+        pipeline_counters["published"] += 1
+    outbox.flush_stats.observe(time.monotonic() - flush_start)
+
+
+async def collect_into_outbox(queue: asyncio.Queue, outbox: AlertOutbox, seconds: float):
+    # Used instead of a plain sleep while reconnecting, so new alerts are retained
+    deadline = time.monotonic() + seconds
+    while True:
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            return
+        try:
+            alert, enqueued_at = await asyncio.wait_for(queue.get(), timeout=remaining)
+        except asyncio.TimeoutError:
+            return
+        outbox.add(alert, enqueued_at)
+
+
+async def publish_stage(queue: asyncio.Queue, outbox: AlertOutbox):
+    global last_mqtt_success
+    reconnect_interval = MQTT_RECONNECT_INTERVAL
+    while True:
+        try:
+            async with aiomqtt.Client(
+                hostname=server,
+                port=port,
+                username=user,
+                password=passw,
+                timeout=10,
+            ) as mqtt_client:
+                logger.info("Connected to MQTT broker.")
+                mark_startup("mqtt_connected")
+                start_time = time.time()
+                last_keepalive = start_time
+                if len(outbox):
+                    logger.info(f"Flushing {len(outbox)} alerts from outbox")
+                await flush_outbox(mqtt_client, outbox)
+                while True:
+                    # Wait for the next alert, but no longer than the next keep-alive is due
+                    wait = max(last_keepalive + KEEPALIVE_INTERVAL - time.time(), 0)
+                    try:
+                        alert, enqueued_at = await asyncio.wait_for(queue.get(), timeout=wait)
+                        outbox.add(alert, enqueued_at)
+                    except asyncio.TimeoutError:
+                        pass
+                    await flush_outbox(mqtt_client, outbox)
+                    # Keep-alive publish
+                    if time.time() - last_keepalive >= KEEPALIVE_INTERVAL:
+                        await publish_message(mqtt_client, OutgoingMessage(
+                            "keepalive",
+                            f"{MQTT_TOPIC}/keepalive",
+                            json_dumps({
+                                "status": "online",
+                                "mqtt": "connected",
+                                "oref": "ok" if (time.time() - last_successful_fetch) < 30 else "failing",
+                                "uptime": round(time.time() - start_time),
+                                "timestamp": round(time.time()),
+                            }),
+                            topic_qos.get("keepalive", 0),
+                        ))
+                        last_mqtt_success = time.time()
+                        last_keepalive = time.time()
+                        logger.info("Keep-alive published to MQTT")
+        except aiomqtt.MqttError as me:
+            logger.error(f"MQTT error: {me}. Reconnecting in {reconnect_interval} seconds...")
+            await collect_into_outbox(queue, outbox, reconnect_interval)
+        except Exception as ex:
+            logger.error(f"Unexpected error: {ex}. Reconnecting in {reconnect_interval} seconds...")
+            await collect_into_outbox(queue, outbox, reconnect_interval)
+
+
+def pipeline_info() -> dict:
+    return {
+        "queue_depth": alert_queue.qsize() if alert_queue is not None else 0,
+        "queue_size": ALERT_QUEUE_SIZE,
+        **pipeline_counters,
+        **{f"{stage}_latency": stats.summary() for stage, stats in pipeline_stats.items()},
+        "outbox": alert_outbox.info() if alert_outbox is not None else None,
+        "topics": {kind: stats.summary() for kind, stats in topic_stats.items()},
+    }
+
+
 async def monitor():
-    global last_heartbeat
-    poll_interval = 1  # seconds between poll cycles
-    fetch_timeout = 4  # max seconds for a single fetch attempt
+    global alert_queue, alert_outbox
     timeout = aiohttp.ClientTimeout(sock_connect=3, sock_read=3)
     connector = aiohttp.TCPConnector(
-        limit=5,
+        # Every overlapping poll hedges across all sources; none of them should wait for a pooled connection
+        limit=max(len(alert_sources) * POLL_MAX_IN_FLIGHT, 5),
         ttl_dns_cache=60,
         enable_cleanup_closed=True,
     )
+    # Polling and publishing run independently, so a slow or reconnecting
+    # broker never delays the next Oref fetch.
+    alert_queue = asyncio.Queue(maxsize=ALERT_QUEUE_SIZE)
+    alert_outbox = AlertOutbox(OUTBOX_SIZE, OUTBOX_FILE, OUTBOX_MAX_AGE)
+    if dedupe_log is not None:
+        # Alerts still active upstream were already published before the restart
+        for alert_id, ts in dedupe_log.load(ALERT_TTL).items():
+            alerts[alert_id] = ts
+        while len(alerts) > ALERT_MAX_ENTRIES:
+            alerts.popitem(last=False)
     async with aiohttp.ClientSession(timeout=timeout, connector=connector) as session:
-        reconnect_interval = 5
-        last_cleanup = time.time()
-        while True:
-            try:
-                async with aiomqtt.Client(
-                    hostname=server,
-                    port=port,
-                    username=user,
-                    password=passw,
-                    timeout=10,
-                ) as mqtt_client:
-                    logger.info("Connected to MQTT broker.")
-                    start_time = time.time()
-                    last_keepalive = start_time
-                    while True:
-                        cycle_start = time.monotonic()
-                        try:
-                            alert = await asyncio.wait_for(
-                                fetch_alert(session), timeout=fetch_timeout
-                            )
-                        except asyncio.TimeoutError:
-                            logger.warning(f"fetch_alert timed out after {fetch_timeout}s")
-                            alert = None
-                        if alert and alert.id not in alerts and not is_test_alert(alert):
-                            alerts[alert.id] = time.time()
-                            logger.info(f"New alert: {alert.raw_data.replace(chr(10), '').replace(chr(13), '').replace('  ', ' ')}")
-                            await publish_alert(mqtt_client, alert)
-                        # Cleanup every 60 seconds
-                        if time.time() - last_cleanup > 60:
-                            cleanup_alerts()
-                            last_cleanup = time.time()
-                        # Fixed-rate polling: sleep only the remaining time
-                        elapsed = time.monotonic() - cycle_start
-                        remaining = poll_interval - elapsed
-                        if remaining > 0:
-                            await asyncio.sleep(remaining)
-                        last_heartbeat = time.time()
-                        # Keep-alive publish
-                        if time.time() - last_keepalive >= KEEPALIVE_INTERVAL:
-                            await mqtt_client.publish(
-                                f"{MQTT_TOPIC}/keepalive",
-                                json.dumps({
-                                    "status": "online",
-                                    "mqtt": "connected",
-                                    "oref": "ok" if (time.time() - last_successful_fetch) < 30 else "failing",
-                                    "uptime": round(time.time() - start_time),
-                                    "timestamp": round(time.time()),
-                                }),
-                                qos=0,
-                            )
-                            last_mqtt_success = time.time()
-                            last_keepalive = time.time()
-                            logger.info("Keep-alive published to MQTT")
-            except aiomqtt.MqttError as me:
-                logger.error(f"MQTT error: {me}. Reconnecting in {reconnect_interval} seconds...")
-                await asyncio.sleep(reconnect_interval)
-            except Exception as ex:
-                logger.error(f"Unexpected error: {ex}. Reconnecting in {reconnect_interval} seconds...")
-                await asyncio.sleep(reconnect_interval)
+        publisher = asyncio.create_task(publish_stage(alert_queue, alert_outbox))
+        try:
+            await fetch_stage(session, alert_queue)
+        finally:
+            publisher.cancel()
 
 if __name__ == '__main__':
     async def main():
-        await load_area_data()
-        await asyncio.gather(monitor(), run_health_server(), area_refresh_loop())
+        # Area data loads in the background; /area returns 503 until it is ready
+        await asyncio.gather(monitor(), run_health_server(), load_area_data(), area_refresh_loop())
     asyncio.run(main())
@@ -3,6 +3,8 @@ import pytest
 import asyncio
 import json
 import time
+import aiohttp
+import aiohttp.web
 from unittest.mock import AsyncMock, patch, MagicMock
 
 import sys
@@ -10,21 +12,40 @@ sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')
 import redalert
 
 class AsyncContextResponse:
-    def __init__(self, status, text_value):
+    def __init__(self, status, text_value, headers=None):
         self.status = status
         self._text_value = text_value
+        self.headers = headers or {}
     async def __aenter__(self):
         return self
     async def __aexit__(self, exc_type, exc, tb):
         pass
     async def text(self, *args, **kwargs):
         return self._text_value
+    async def read(self):
+        return self._text_value.encode('utf-8')
 
 def make_awaitable_response(status, text_value):
     async def _inner(*args, **kwargs):
         return AsyncContextResponse(status, text_value)
     return _inner
 
+@pytest.fixture(autouse=True)
+def fresh_area_lookup_cache(monkeypatch):
+    # /area results are cached across calls; keep tests independent
+    cache = redalert.AreaLookupCache(redalert.AREA_CACHE_SIZE, redalert.AREA_CACHE_PRECISION)
+    cache.invalidate(redalert.area_dataset_version)
+    monkeypatch.setattr(redalert, 'area_lookup_cache', cache)
+
+
+@pytest.fixture(autouse=True)
+def fresh_poll_cache(monkeypatch):
+    monkeypatch.setattr(redalert, 'poll_cache', {"digest": None, "alert": None})
+    monkeypatch.setattr(redalert, 'alert_sources', [redalert.AlertSource(redalert.url)])
+    monkeypatch.setattr(redalert, 'poll_counters', dict.fromkeys(redalert.poll_counters, 0))
+    monkeypatch.setattr(redalert, 'poll_scheduler', None)
+    monkeypatch.setattr(redalert, 'alert_areas', {})
+
 # Test AlertObject dataclass
 
 
@@ -128,12 +149,12 @@ def test_cleanup_alerts():
     # Clear alerts dict first
     redalert.alerts.clear()
 
-    # Add some alerts with different timestamps
+    # Add some alerts with different timestamps, in the order they were seen
     current_time = time.time()
-    redalert.alerts["old_alert"] = current_time - 3700  # Older than TTL
-    redalert.alerts["recent_alert"] = current_time - 100  # Within TTL
     redalert.alerts["very_old_alert"] = current_time - \
         7200  # Much older than TTL
+    redalert.alerts["old_alert"] = current_time - 3700  # Older than TTL
+    redalert.alerts["recent_alert"] = current_time - 100  # Within TTL
 
     # Run cleanup
     redalert.cleanup_alerts()
@@ -150,6 +171,196 @@ def test_cleanup_alerts_empty():
     redalert.cleanup_alerts()
     assert len(redalert.alerts) == 0
 
+
+def test_cleanup_alerts_stops_at_first_live_entry(monkeypatch):
+    redalert.alerts.clear()
+    monkeypatch.setattr(redalert, 'dedupe_counters', {"hits": 0, "expired": 0, "evicted": 0})
+    now = time.time()
+    for i in range(5):
+        redalert.alerts[f"old-{i}"] = now - 4000
+    for i in range(1000):
+        redalert.alerts[f"live-{i}"] = now
+
+    items = MagicMock(wraps=redalert.alerts.items)
+    monkeypatch.setattr(redalert.alerts, 'items', items, raising=False)
+    redalert.cleanup_alerts()
+    assert len(redalert.alerts) == 1000
+    assert items.call_count == 6  # one peek per expired entry, plus the first live one
+    assert redalert.dedupe_info()["expired"] == 5
+
+
+def test_remember_alert_evicts_oldest_beyond_max(monkeypatch):
+    redalert.alerts.clear()
+    monkeypatch.setattr(redalert, 'ALERT_MAX_ENTRIES', 3)
+    monkeypatch.setattr(redalert, 'dedupe_counters', {"hits": 0, "expired": 0, "evicted": 0})
+    for alert_id in ["a", "b", "c", "d", "e"]:
+        redalert.remember_alert(alert_id)
+    assert list(redalert.alerts) == ["c", "d", "e"]
+    assert redalert.dedupe_counters["evicted"] == 2
+    assert redalert.is_new_alert("a")
+    assert not redalert.is_new_alert("e")
+    assert redalert.dedupe_counters["hits"] == 1
+
+
+def test_repolled_alert_survives_eviction(monkeypatch):
+    """An ID still returned by alerts.json is the most recently seen, so a salvo of new IDs evicts others first."""
+    redalert.alerts.clear()
+    monkeypatch.setattr(redalert, 'ALERT_MAX_ENTRIES', 3)
+    monkeypatch.setattr(redalert, 'dedupe_counters', {"hits": 0, "expired": 0, "evicted": 0})
+    redalert.remember_alert("live")
+    for alert_id in ["b", "c", "d", "e"]:
+        assert not redalert.is_new_alert("live")  # re-polled between each new ID
+        redalert.remember_alert(alert_id)
+    assert "live" in redalert.alerts
+    assert not redalert.is_new_alert("live")
+    assert list(redalert.alerts) == ["d", "e", "live"]
+
+
+def test_repolled_alert_does_not_expire(monkeypatch):
+    redalert.alerts.clear()
+    first_seen = time.time() - redalert.ALERT_TTL + 1
+    redalert.alerts["live"] = first_seen
+    assert not redalert.is_new_alert("live")
+    later = first_seen + redalert.ALERT_TTL + 10  # past the TTL counted from first sight
+    monkeypatch.setattr(redalert.time, 'time', lambda: later)
+    redalert.cleanup_alerts()
+    assert "live" in redalert.alerts
+
+
+def test_added_alert_areas():
+    redalert.remember_alert("1", ["A", "B"])
+    assert redalert.added_alert_areas(make_alert("1", ["A", "B"])) == []
+    assert redalert.added_alert_areas(make_alert("1", ["A"])) == []
+    assert redalert.added_alert_areas(make_alert("1", ["D", "A", "B", "C"])) == ["D", "C"]
+    assert redalert.added_alert_areas(make_alert("1", ["A", "B", "C", "D"])) == []
+
+
+def test_added_alert_areas_unknown_area_set():
+    """IDs restored from the dedupe log have no area set; tracking starts without a delta."""
+    redalert.alerts["2"] = time.time()
+    assert redalert.added_alert_areas(make_alert("2", ["A"])) == []
+    assert redalert.added_alert_areas(make_alert("2", ["A", "B"])) == ["B"]
+
+
+def test_cleanup_alerts_forgets_area_sets():
+    redalert.alerts.clear()
+    redalert.remember_alert("old", ["A"])
+    redalert.alerts["old"] = time.time() - redalert.ALERT_TTL - 1
+    redalert.cleanup_alerts()
+    assert "old" not in redalert.alert_areas
+
+
+@pytest.mark.asyncio
+async def test_fetch_stage_enqueues_delta_for_added_areas(monkeypatch):
+    redalert.alerts.clear()
+    monkeypatch.setattr(redalert, 'POLL_INTERVAL', 0.01)
+    monkeypatch.setattr(redalert, 'POLL_MAX_IN_FLIGHT', 1)
+    responses = [make_alert("9", ["A"]), make_alert("9", ["A", "B"]), make_alert("9", ["A", "B"]), make_alert("9", ["B"])]
+    async def fetch(session):
+        return responses.pop(0) if responses else None
+    monkeypatch.setattr(redalert, 'fetch_alert', fetch)
+
+    queue = await run_fetch_stage(0.15)
+    queued = [queue.get_nowait()[0] for _ in range(queue.qsize())]
+    assert [(a.data, a.delta) for a in queued] == [(["A"], False), (["B"], True)]
+
+
+def test_plan_delta_message():
+    delta = redalert.replace(make_alert("9", ["B"]), delta=True)
+    messages = redalert.plan_alert_messages(delta)
+    assert [(m.kind, m.topic) for m in messages] == [("delta", f"{redalert.MQTT_TOPIC}/delta")]
+    assert json.loads(messages[0].payload) == {"id": "9", "cat": "1", "title": "t", "data": ["B"], "desc": "d"}
+
+
+def test_dedupe_log_roundtrip(tmp_path):
+    path = tmp_path / "seen.log"
+    now = time.time()
+    path.write_text(f"expired\t{now - 4000:.3f}\ngarbage line\n")
+    log = redalert.DedupeLog(str(path))
+    log.append("a", now - 10)
+    log.append("b", now - 5)
+    log.append("a", now - 1)  # re-seen: the latest timestamp wins
+
+    seen = redalert.DedupeLog(str(path)).load(3600)
+    assert seen == {"b": pytest.approx(now - 5, abs=0.01), "a": pytest.approx(now - 1, abs=0.01)}
+    assert list(seen) == ["b", "a"]  # oldest first
+
+
+def test_dedupe_log_compacts_expired_entries(tmp_path, monkeypatch):
+    path = tmp_path / "seen.log"
+    log = redalert.DedupeLog(str(path))
+    now = time.time()
+    for i in range(300):
+        log.append(f"old-{i}", now - 4000)
+    log.append("live", now)
+    monkeypatch.setattr(redalert, 'dedupe_log', log)
+    redalert.alerts.clear()
+    redalert.alerts.update({f"old-{i}": now - 4000 for i in range(300)})
+    redalert.alerts["live"] = now
+
+    redalert.cleanup_alerts()
+    assert path.read_text().splitlines() == [f"live\t{now:.3f}"]
+    log.append("next", now)  # the log is reopened after the rewrite
+    assert len(path.read_text().splitlines()) == 2
+
+
+def test_remember_alert_appends_to_log(tmp_path, monkeypatch):
+    log = redalert.DedupeLog(str(tmp_path / "seen.log"))
+    monkeypatch.setattr(redalert, 'dedupe_log', log)
+    redalert.alerts.clear()
+    redalert.remember_alert("123")
+    assert "123" in redalert.alerts
+    assert list(redalert.DedupeLog(log.path).load(3600)) == ["123"]
+    assert redalert.dedupe_info()["persistent"]["log_lines"] == 1
+
+
+@pytest.mark.asyncio
+async def test_fetch_alert_records_changed_bodies(tmp_path, monkeypatch):
+    recorder = redalert.TrafficRecorder(str(tmp_path / "traffic.jsonl"))
+    monkeypatch.setattr(redalert, 'traffic_recorder', recorder)
+    body = json.dumps({"id": "1", "cat": "1", "title": "ירי רקטות", "data": ["Area 1"], "desc": "d"}, ensure_ascii=False)
+    session = AsyncMock()
+    for text in (body, body, '', '', body):
+        session.get = make_awaitable_response(200, text)
+        await redalert.fetch_alert(session)
+
+    entries = redalert.load_recording(recorder.path)
+    assert [entry_body.decode('utf-8') for _, entry_body in entries] == [body, '', body]
+    assert entries[0][0] == pytest.approx(time.time(), abs=5)
+    assert redalert.polling_info()["recording"]["records"] == 3
+
+
+@pytest.mark.asyncio
+async def test_monitor_does_not_republish_after_restart(tmp_path, monkeypatch):
+    """An alert seen before the restart and still in alerts.json is not published again."""
+    path = tmp_path / "seen.log"
+    path.write_text(f"123\t{time.time() - 60:.3f}\n")
+    monkeypatch.setattr(redalert, 'dedupe_log', redalert.DedupeLog(str(path)))
+    redalert.alerts.clear()
+    monkeypatch.setattr(redalert, 'POLL_INTERVAL', 0.01)
+    monkeypatch.setattr(redalert, 'KEEPALIVE_INTERVAL', 999999)
+    async def mock_fetch_alert(session):
+        return make_alert("123")
+    monkeypatch.setattr(redalert, 'fetch_alert', mock_fetch_alert)
+    mock_mqtt_client = AsyncMock()
+    class MockMqttClient:
+        async def __aenter__(self):
+            return mock_mqtt_client
+        async def __aexit__(self, exc_type, exc, tb):
+            pass
+    monkeypatch.setattr(redalert.aiomqtt, 'Client', lambda *a, **kw: MockMqttClient())
+
+    task = asyncio.create_task(redalert.monitor())
+    await asyncio.sleep(0.1)
+    task.cancel()
+    try:
+        await task
+    except asyncio.CancelledError:
+        pass
+
+    assert mock_mqtt_client.publish.call_count == 0
+    assert "123" in redalert.alerts
+
 @pytest.mark.asyncio
 async def test_fetch_alert_success():
     json_data = {
@@ -237,16 +448,162 @@ async def test_fetch_alert_whitespace_only():
 async def test_fetch_alert_http_error():
     session = AsyncMock()
     session.get = make_awaitable_response(500, '')
-    alert = await redalert.fetch_alert(session)
-    assert alert is None
+    with pytest.raises(redalert.FetchError):
+        await redalert.fetch_alert(session)
 
 
 @pytest.mark.asyncio
 async def test_fetch_alert_json_decode_error():
     session = AsyncMock()
     session.get = make_awaitable_response(200, 'invalid json{')
+    with pytest.raises(redalert.FetchError):
+        await redalert.fetch_alert(session)
+
+
+@pytest.mark.asyncio
+async def test_fetch_alert_unchanged_body_skips_parse(monkeypatch):
+    body = json.dumps({"id": "1", "cat": "1", "title": "t", "data": ["Area 1"], "desc": "d"})
+    session = AsyncMock()
+    session.get = make_awaitable_response(200, body)
+    parse = MagicMock(wraps=redalert.parse_alert)
+    monkeypatch.setattr(redalert, 'parse_alert', parse)
+
+    first = await redalert.fetch_alert(session)
+    second = await redalert.fetch_alert(session)
+    assert second is first
+    assert parse.call_count == 1
+
+    session.get = make_awaitable_response(200, body.replace('"1"', '"2"', 1))
+    third = await redalert.fetch_alert(session)
+    assert third.id == "2"
+    assert parse.call_count == 2
+    info = redalert.polling_info()
+    assert {k: info[k] for k in ("polls", "not_modified", "empty", "unchanged", "parsed", "fast_path")} == {
+        "polls": 3, "not_modified": 0, "empty": 0, "unchanged": 1, "parsed": 2, "fast_path": 1}
+
+
+@pytest.mark.asyncio
+async def test_fetch_alert_conditional_request():
+    body = json.dumps({"id": "1", "cat": "1", "title": "t", "data": ["Area 1"], "desc": "d"})
+    sent_headers = []
+    responses = [
+        AsyncContextResponse(200, body, {"ETag": '"abc"', "Last-Modified": "Sat, 17 Oct 2026 10:00:00 GMT"}),
+        AsyncContextResponse(304, ""),
+    ]
+    async def get(url, headers=None, **kwargs):
+        sent_headers.append(headers)
+        return responses.pop(0)
+    session = AsyncMock()
+    session.get = get
+
+    first = await redalert.fetch_alert(session)
+    second = await redalert.fetch_alert(session)
+    assert "If-None-Match" not in sent_headers[0]
+    assert sent_headers[1]["If-None-Match"] == '"abc"'
+    assert sent_headers[1]["If-Modified-Since"] == "Sat, 17 Oct 2026 10:00:00 GMT"
+    assert second is first
+    assert redalert.poll_counters["not_modified"] == 1
+
+
+@pytest.mark.asyncio
+async def test_fetch_alert_zero_content_length_skips_body():
+    response = AsyncContextResponse(200, "", {"Content-Length": "0"})
+    response.read = AsyncMock(side_effect=AssertionError("body should not be read"))
+    async def get(*args, **kwargs):
+        return response
+    session = AsyncMock()
+    session.get = get
+    assert await redalert.fetch_alert(session) is None
+    assert redalert.poll_counters["empty"] == 1
+
+def test_parse_topic_qos():
+    assert redalert.parse_topic_qos("") == {}
+    assert redalert.parse_topic_qos("cat=1, raw_data=2,keepalive=0") == {"cat": 1, "raw_data": 2, "keepalive": 0}
+    assert redalert.parse_topic_qos("cat=3,raw_data=x,delta=1") == {"delta": 1}
+
+
+def test_plan_alert_messages_uses_topic_qos(monkeypatch):
+    monkeypatch.setattr(redalert, 'topic_qos', {"cat": 1})
+    alert = make_alert("1", ["תל אביב"])
+    messages = redalert.plan_alert_messages(alert)
+    assert [(m.kind, m.topic, m.qos) for m in messages] == [
+        ("cat", f"{redalert.MQTT_TOPIC}/cat/1", 1),
+        ("raw_data", f"{redalert.MQTT_TOPIC}/raw_data", 0),
+    ]
+    assert json.loads(messages[0].payload) == {"title": "t", "data": ["תל אביב"], "desc": "d"}
+    assert messages[1].payload == alert.raw_data
+
+
+@pytest.mark.asyncio
+async def test_publish_alert_sends_topics_concurrently(monkeypatch):
+    monkeypatch.setattr(redalert, 'topic_stats', {})
+    in_flight = peak = 0
+    async def slow_publish(topic, payload, qos=0):
+        nonlocal in_flight, peak
+        in_flight += 1
+        peak = max(peak, in_flight)
+        await asyncio.sleep(0.05)
+        in_flight -= 1
+    mqtt_client = AsyncMock()
+    mqtt_client.publish.side_effect = slow_publish
+
+    assert await redalert.publish_alert(mqtt_client, make_alert("1"))
+    assert peak == 2
+    topics = redalert.pipeline_info()["topics"]
+    assert set(topics) == {"cat", "raw_data"}
+    assert topics["cat"]["count"] == 1 and topics["cat"]["p50_ms"] >= 40
+
+
+@pytest.mark.asyncio
+async def test_publish_alert_fails_if_any_topic_fails():
+    async def publish(topic, payload, qos=0):
+        if topic.endswith("/raw_data"):
+            raise Exception("broker rejected")
+    mqtt_client = AsyncMock()
+    mqtt_client.publish.side_effect = publish
+    assert await redalert.publish_alert(mqtt_client, make_alert("1")) is False
+
+
+JSON_BACKENDS = ["json"] + (["orjson"] if redalert.orjson is not None else [])
+
+
+@pytest.mark.parametrize("backend", JSON_BACKENDS)
+def test_json_backend_roundtrip(monkeypatch, backend):
+    monkeypatch.setattr(redalert, 'json_backend', backend)
+    payload = {"title": "ירי רקטות וטילים", "data": ["תל אביב - מרכז העיר"], "desc": "היכנסו למרחב המוגן"}
+    encoded = redalert.json_dumps(payload)
+    assert isinstance(encoded, str)
+    assert "ירי" in encoded  # non-ASCII is kept as-is, like ensure_ascii=False
+    assert redalert.json_loads(encoded) == payload
+    assert redalert.json_loads(encoded.encode('utf-8')) == payload
+    with pytest.raises(json.JSONDecodeError):
+        redalert.json_loads("invalid json{")
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("backend", JSON_BACKENDS)
+async def test_fetch_and_publish_with_json_backend(monkeypatch, backend):
+    monkeypatch.setattr(redalert, 'json_backend', backend)
+    body = json.dumps({"id": "7", "cat": "1", "title": "ירי", "data": ["אשדוד - א,ב,ד,ה"], "desc": "d"}, ensure_ascii=False)
+    session = AsyncMock()
+    session.get = make_awaitable_response(200, '\ufeff' + body)
     alert = await redalert.fetch_alert(session)
-    assert alert is None
+    assert alert.id == "7" and alert.data == ["אשדוד - א,ב,ד,ה"]
+
+    mqtt_client = AsyncMock()
+    assert await redalert.publish_alert(mqtt_client, alert)
+    assert json.loads(mqtt_client.publish.call_args_list[0][0][1]) == {"title": "ירי", "data": ["אשדוד - א,ב,ד,ה"], "desc": "d"}
+
+
+@pytest.mark.parametrize("backend", JSON_BACKENDS)
+def test_area_file_roundtrip_with_json_backend(monkeypatch, tmp_path, backend):
+    monkeypatch.setattr(redalert, 'json_backend', backend)
+    monkeypatch.setattr(redalert, 'AREA_POLYGONS_FILE', str(tmp_path / "area_polygons.json"))
+    data = {"תל אביב": {"migun_time": 90, "polygon": [[32.0, 34.7], [32.1, 34.7], [32.1, 34.8]]}}
+    redalert.save_and_build_area_index(data)
+    assert json.loads((tmp_path / "area_polygons.json").read_text(encoding='utf-8')) == data
+    assert redalert.load_previous_area_data() == data
+
 
 @pytest.mark.asyncio
 async def test_publish_alert_success():
@@ -419,107 +776,306 @@ async def test_monitor_alert_deduplication(monkeypatch):
     assert mock_mqtt_client.publish.call_count == 2  # cat topic + raw_data topic
     assert "test_alert_123" in redalert.alerts
 
-@pytest.mark.asyncio
-async def test_fetch_alert_realistic_json():
-    # This is the realistic JSON returned by the Oref API
-    json_data = {
-        "id": "133908130700000000",
-        "cat": "10",
-        "title": "בדקות הקרובות צפויות להתקבל התרעות באזורך",
-        "data": ["ירושלים - מערב", "ירושלים - צפון"],
-        "desc": "עליך לשפר את מיקומך למיגון המיטבי בקרבתך. במקרה של קבלת התרעה, יש להיכנס למרחב המוגן ולשהות בו 10 דקות."
-    }
-    session = AsyncMock()
-    session.get = make_awaitable_response(200, json.dumps(json_data))
-
-    alert = await redalert.fetch_alert(session)
-    assert isinstance(alert, redalert.AlertObject)
-    assert alert.id == "133908130700000000"
-    assert alert.cat == "10"
-    assert alert.title == "בדקות הקרובות צפויות להתקבל התרעות באזורך"
-    assert alert.data == ["ירושלים - מערב", "ירושלים - צפון"]
-    assert "מרחב המוגן" in alert.desc
+def test_latency_stats_summary():
+    stats = redalert.LatencyStats(window=100)
+    assert stats.summary() == {"count": 0}
+    for ms in range(1, 101):
+        stats.observe(ms / 1000)
+    summary = stats.summary()
+    assert summary["count"] == 100
+    assert summary["p50_ms"] == 51.0
+    assert summary["p95_ms"] == 96.0
+    assert summary["p99_ms"] == 100.0
+    assert summary["max_ms"] == 100.0
+
+
+def test_enqueue_alert_drops_oldest_when_full(monkeypatch):
+    monkeypatch.setattr(redalert, 'pipeline_counters', {"enqueued": 0, "dropped": 0, "published": 0})
+    queue = asyncio.Queue(maxsize=2)
+    for i in range(3):
+        redalert.enqueue_alert(queue, redalert.AlertObject(
+            id=str(i), cat="1", title="t", data=[], desc="d", raw_data=""))
+    ids = [queue.get_nowait()[0].id for _ in range(queue.qsize())]
+    assert ids == ["1", "2"]
+    assert redalert.pipeline_counters == {"enqueued": 3, "dropped": 1, "published": 0}
 
 
 @pytest.mark.asyncio
-async def test_monitor_basic_functionality(monkeypatch):
-    """Test basic monitor functionality without complex timing"""
-    # Clear alerts dict
+async def test_monitor_polling_cadence_with_stalled_broker(monkeypatch):
+    """A publish that never completes must not slow down the fetch stage."""
     redalert.alerts.clear()
+    monkeypatch.setattr(redalert, 'POLL_INTERVAL', 0.02)
+    monkeypatch.setattr(redalert, 'KEEPALIVE_INTERVAL', 999999)
+    monkeypatch.setattr(redalert, 'pipeline_counters', {"enqueued": 0, "dropped": 0, "published": 0})
 
-    # Mock fetch_alert to return None (no alerts)
+    fetch_count = 0
     async def mock_fetch_alert(session):
-        return None
-
+        nonlocal fetch_count
+        fetch_count += 1
+        return redalert.AlertObject(id=str(fetch_count), cat="1", title="t", data=["Area 1"], desc="d", raw_data="{}")
     monkeypatch.setattr(redalert, 'fetch_alert', mock_fetch_alert)
 
-    # Mock MQTT client
+    stalled = asyncio.Event()
     mock_mqtt_client = AsyncMock()
+    async def stalled_publish(*args, **kwargs):
+        await stalled.wait()
+    mock_mqtt_client.publish.side_effect = stalled_publish
 
     class MockMqttClient:
         async def __aenter__(self):
             return mock_mqtt_client
-
         async def __aexit__(self, exc_type, exc, tb):
             pass
+    monkeypatch.setattr(redalert.aiomqtt, 'Client', lambda *a, **kw: MockMqttClient())
 
-    monkeypatch.setattr(redalert.aiomqtt, 'Client',
-                        lambda *a, **kw: MockMqttClient())
-
-    # Mock aiohttp.ClientSession
     class DummySession:
         def __init__(self, *args, **kwargs): pass
         async def __aenter__(self):
             return self
-
         async def __aexit__(self, exc_type, exc, tb):
             pass
-
     monkeypatch.setattr(redalert.aiohttp, 'ClientSession', DummySession)
 
-    # Counter to control iterations
-    iteration_count = 0
-
-    async def counting_sleep(*args, **kwargs):
-        nonlocal iteration_count
-        iteration_count += 1
-        if iteration_count >= 2:  # Stop after 2 iterations
-            raise asyncio.CancelledError()
-        await asyncio.sleep(0.001)  # Very short actual sleep
-
-    monkeypatch.setattr(asyncio, 'sleep', counting_sleep)
-
+    task = asyncio.create_task(redalert.monitor())
+    await asyncio.sleep(0.3)
+    info = redalert.pipeline_info()
+    task.cancel()
     try:
-        await redalert.monitor()
+        await task
     except asyncio.CancelledError:
         pass
 
-    # Test passed if we got here without exceptions
-    assert iteration_count >= 2
+    assert fetch_count >= 10
+    assert mock_mqtt_client.publish.call_count == 2  # both topics of the first alert in flight, stuck
+    assert info["queue_depth"] >= 8
+    assert info["published"] == 0
+    assert info["fetch_latency"]["count"] >= 10
 
-# --- 100% coverage additions ---
-import importlib
 
-def test_fetch_alert_json_decode_error_branch():
-    session = AsyncMock()
-    # This will cause json.loads to raise JSONDecodeError
-    session.get = make_awaitable_response(200, 'not a json')
-    # Patch response.text to return the same string
-    with patch('redalert.logger') as mock_logger:
-        alert = asyncio.run(redalert.fetch_alert(session))
-        assert alert is None
-        assert mock_logger.error.called
+def make_alert(alert_id, data=None):
+    return redalert.AlertObject(id=str(alert_id), cat="1", title="t", data=data or ["Area 1"], desc="d", raw_data="{}")
 
-def test_monitor_mqtt_error_branch(monkeypatch):
-    class DummyMqttError(Exception):
-        pass
-    class FailingMqttClient:
+
+def test_alert_outbox_bounded():
+    outbox = redalert.AlertOutbox(2)
+    for i in range(3):
+        outbox.add(make_alert(i), 0.0)
+    assert [e.alert.id for e in outbox.entries] == ["1", "2"]
+    assert outbox.info()["dropped"] == 1
+    assert outbox.info()["depth"] == 2
+
+
+def test_alert_outbox_persists_to_disk(tmp_path):
+    path = str(tmp_path / "outbox.jsonl")
+    outbox = redalert.AlertOutbox(10, path)
+    outbox.add(make_alert("a", ["תל אביב"]), 0.0)
+    outbox.add(make_alert("b"), 0.0)
+    outbox.pop()
+
+    restored = redalert.AlertOutbox(10, path)
+    assert [e.alert for e in restored.entries] == [make_alert("b")]
+    restored.pop()
+    assert redalert.AlertOutbox(10, path).info()["depth"] == 0
+
+
+def test_alert_outbox_ignores_corrupt_file(tmp_path):
+    path = tmp_path / "outbox.jsonl"
+    path.write_text("not json\n")
+    assert len(redalert.AlertOutbox(10, str(path))) == 0
+
+
+def test_alert_outbox_discards_expired_alerts_on_load(tmp_path, monkeypatch):
+    path = tmp_path / "outbox.jsonl"
+    outbox = redalert.AlertOutbox(10, str(path))
+    monkeypatch.setattr(redalert.time, 'time', lambda: 1000.0)
+    outbox.add(make_alert("stale"), 0.0)
+    monkeypatch.undo()
+    outbox.add(make_alert("fresh"), 0.0)
+
+    restored = redalert.AlertOutbox(10, str(path), max_age=3600)
+    assert [e.alert.id for e in restored.entries] == ["fresh"]
+    assert restored.info()["dropped"] == 1
+    assert [e.alert.id for e in redalert.AlertOutbox(10, str(path)).entries] == ["fresh"]
+
+
+def test_append_log_appends_and_compacts(tmp_path):
+    path = tmp_path / "log.txt"
+    log = redalert.AppendLog(str(path), "test log")
+    for i in range(5):
+        assert log.append(str(i))
+    assert path.read_text() == "0\n1\n2\n3\n4\n"
+    assert log.needs_compaction(0) is False
+    log.lines = 101
+    assert log.needs_compaction(0) is True
+
+    log.rewrite(iter(["3", "4"]))
+    assert path.read_text() == "3\n4\n"
+    assert log.lines == 2
+    assert not (tmp_path / "log.txt.tmp").exists()
+    log.append("5")
+    assert path.read_text() == "3\n4\n5\n"
+
+
+def test_append_log_reports_write_errors(tmp_path):
+    log = redalert.AppendLog(str(tmp_path / "missing" / "log.txt"), "test log")
+    assert log.append("x") is False
+    assert log.lines == 0
+
+
+def test_alert_outbox_appends_instead_of_rewriting(tmp_path):
+    path = tmp_path / "outbox.jsonl"
+    outbox = redalert.AlertOutbox(10, str(path))
+    for i in range(3):
+        outbox.add(make_alert(i), 0.0)
+    outbox.pop()
+    ops = [json.loads(line)["op"] for line in path.read_text().splitlines()]
+    assert ops == ["add", "add", "add", "ack"]
+    assert [e.alert.id for e in redalert.AlertOutbox(10, str(path)).entries] == ["1", "2"]
+
+    outbox.pop()
+    outbox.pop()
+    assert path.read_text() == ""  # compacted once everything is published
+    outbox.add(make_alert("next"), 0.0)
+    assert [e.alert.id for e in redalert.AlertOutbox(10, str(path)).entries] == ["next"]
+
+
+@pytest.mark.asyncio
+async def test_flush_outbox_keeps_alert_on_failure(monkeypatch):
+    outbox = redalert.AlertOutbox(10)
+    outbox.add(make_alert("a"), time.monotonic())
+    outbox.add(make_alert("b"), time.monotonic())
+    mqtt_client = AsyncMock()
+    mqtt_client.publish.side_effect = redalert.aiomqtt.MqttError("broker gone")
+
+    with pytest.raises(redalert.aiomqtt.MqttError):
+        await redalert.flush_outbox(mqtt_client, outbox)
+    assert [e.alert.id for e in outbox.entries] == ["a", "b"]
+
+    mqtt_client.publish.side_effect = None
+    await redalert.flush_outbox(mqtt_client, outbox)
+    assert len(outbox) == 0
+    assert outbox.info()["flush_latency"]["count"] == 1
+    topics = [c[0][0] for c in mqtt_client.publish.call_args_list[-4:]]
+    assert topics == [f"{redalert.MQTT_TOPIC}/cat/1", f"{redalert.MQTT_TOPIC}/raw_data"] * 2
+
+
+@pytest.mark.asyncio
+async def test_flush_outbox_retries_only_failed_topics(tmp_path):
+    """If raw_data fails after cat went out, the retry must not send a second siren on cat/."""
+    path = str(tmp_path / "outbox.jsonl")
+    outbox = redalert.AlertOutbox(10, path)
+    outbox.add(make_alert("a"), time.monotonic())
+    mqtt_client = AsyncMock()
+
+    async def publish(topic, payload, qos=0):
+        if topic.endswith("/raw_data"):
+            raise redalert.aiomqtt.MqttError("connection lost")
+    mqtt_client.publish.side_effect = publish
+    with pytest.raises(redalert.aiomqtt.MqttError):
+        await redalert.flush_outbox(mqtt_client, outbox)
+    assert outbox.head_done() == {"cat"}
+    assert redalert.AlertOutbox(10, path).head_done() == {"cat"}  # survives a restart
+
+    mqtt_client.publish.reset_mock(side_effect=True)
+    await redalert.flush_outbox(mqtt_client, outbox)
+    assert [c[0][0] for c in mqtt_client.publish.call_args_list] == [f"{redalert.MQTT_TOPIC}/raw_data"]
+    assert len(outbox) == 0
+
+
+@pytest.mark.asyncio
+async def test_flush_outbox_skips_rejected_alert():
+    """An alert the client rejects outright must not block the alerts queued behind it."""
+    outbox = redalert.AlertOutbox(10)
+    outbox.add(redalert.replace(make_alert("bad"), cat="#"), time.monotonic())
+    outbox.add(make_alert("good"), time.monotonic())
+    mqtt_client = AsyncMock()
+
+    async def publish(topic, payload, qos=0):
+        if "#" in topic:
+            raise ValueError("Publish topic cannot contain wildcards")
+    mqtt_client.publish.side_effect = publish
+
+    await redalert.flush_outbox(mqtt_client, outbox)
+    assert len(outbox) == 0
+    assert outbox.info()["dropped"] == 1
+    assert f"{redalert.MQTT_TOPIC}/cat/1" in [c[0][0] for c in mqtt_client.publish.call_args_list]
+
+
+@pytest.mark.asyncio
+async def test_flush_outbox_drops_expired_alerts():
+    outbox = redalert.AlertOutbox(10, max_age=60)
+    outbox.add(make_alert("old", ["Old"]), time.monotonic())
+    outbox.add(make_alert("new", ["New"]), time.monotonic())
+    outbox.entries[0].created -= 61
+    mqtt_client = AsyncMock()
+
+    await redalert.flush_outbox(mqtt_client, outbox)
+    assert len(outbox) == 0
+    assert outbox.info()["expired"] == 1
+    assert outbox.info()["dropped"] == 1
+    payloads = [c[0][1] for c in mqtt_client.publish.call_args_list]
+    assert any('"New"' in p for p in payloads)
+    assert not any('"Old"' in p for p in payloads)
+
+
+@pytest.mark.asyncio
+async def test_flush_outbox_drops_alert_after_max_attempts(monkeypatch):
+    monkeypatch.setattr(redalert, 'OUTBOX_MAX_ATTEMPTS', 3)
+    outbox = redalert.AlertOutbox(10)
+    outbox.add(make_alert("a", ["A"]), time.monotonic())
+    outbox.add(make_alert("b", ["B"]), time.monotonic())
+    mqtt_client = AsyncMock()
+
+    async def publish(topic, payload, qos=0):
+        if '"A"' in payload:
+            raise redalert.aiomqtt.MqttError("rejected")
+    mqtt_client.publish.side_effect = publish
+
+    for _ in range(2):
+        with pytest.raises(redalert.aiomqtt.MqttError):
+            await redalert.flush_outbox(mqtt_client, outbox)
+        assert len(outbox) == 2
+    await redalert.flush_outbox(mqtt_client, outbox)
+    assert len(outbox) == 0
+    assert outbox.info()["dropped"] == 1
+
+
+@pytest.mark.asyncio
+async def test_monitor_flushes_outbox_after_reconnect(monkeypatch):
+    """Alerts seen while the broker is down are published in order after reconnecting."""
+    redalert.alerts.clear()
+    monkeypatch.setattr(redalert, 'POLL_INTERVAL', 0.01)
+    monkeypatch.setattr(redalert, 'MQTT_RECONNECT_INTERVAL', 0.05)
+    monkeypatch.setattr(redalert, 'KEEPALIVE_INTERVAL', 999999)
+
+    fetch_count = 0
+    async def mock_fetch_alert(session):
+        nonlocal fetch_count
+        fetch_count += 1
+        return make_alert(fetch_count) if fetch_count <= 5 else None
+    monkeypatch.setattr(redalert, 'fetch_alert', mock_fetch_alert)
+
+    published = []
+    connections = 0
+    class FlakyMqttClient:
+        def __init__(self):
+            nonlocal connections
+            connections += 1
+            self.healthy = connections > 1
         async def __aenter__(self):
-            raise DummyMqttError('MQTT error')
+            return self
         async def __aexit__(self, exc_type, exc, tb):
             pass
+        async def publish(self, topic, payload, qos=0):
+            if not self.healthy:
+                raise redalert.aiomqtt.MqttError("connection lost")
+            published.append(topic)
+
+    class DummyMqttError(Exception):
+        pass
     monkeypatch.setattr(redalert.aiomqtt, 'MqttError', DummyMqttError)
-    monkeypatch.setattr(redalert.aiomqtt, 'Client', lambda *a, **kw: FailingMqttClient())
+    monkeypatch.setattr(redalert.aiomqtt, 'Client', lambda *a, **kw: FlakyMqttClient())
+
     class DummySession:
         def __init__(self, *args, **kwargs): pass
         async def __aenter__(self):
@@ -527,29 +1083,421 @@ def test_monitor_mqtt_error_branch(monkeypatch):
         async def __aexit__(self, exc_type, exc, tb):
             pass
     monkeypatch.setattr(redalert.aiohttp, 'ClientSession', DummySession)
-    async def fake_sleep(*args, **kwargs):
-        raise asyncio.CancelledError()
-    monkeypatch.setattr(asyncio, 'sleep', fake_sleep)
+
+    task = asyncio.create_task(redalert.monitor())
+    await asyncio.sleep(0.3)
+    task.cancel()
     try:
-        asyncio.run(redalert.monitor())
+        await task
     except asyncio.CancelledError:
         pass
-    except Exception:
-        pass
 
-def test_monitor_generic_exception_branch(monkeypatch):
-    class FailingMqttClient:
-        async def __aenter__(self):
-            raise Exception('Generic error')
-        async def __aexit__(self, exc_type, exc, tb):
-            pass
-    monkeypatch.setattr(redalert.aiomqtt, 'Client', lambda *a, **kw: FailingMqttClient())
-    class DummySession:
-        def __init__(self, *args, **kwargs): pass
-        async def __aenter__(self):
-            return self
-        async def __aexit__(self, exc_type, exc, tb):
-            pass
+    assert connections >= 2
+    cat_topics = [t for t in published if "/cat/" in t]
+    assert len(cat_topics) == 5
+    assert len(redalert.alert_outbox) == 0
+
+
+async def start_alert_server(body: str, status: int = 200, delay: float = 0.0, hits: list = None):
+    from aiohttp.test_utils import TestServer
+
+    async def handler(request):
+        if hits is not None:
+            hits.append(request.headers.get("If-None-Match"))
+        await asyncio.sleep(delay)
+        return aiohttp.web.Response(body=body.encode('utf-8'), status=status, headers={"ETag": '"v1"'})
+
+    app = aiohttp.web.Application()
+    app.router.add_get("/alerts.json", handler)
+    server = TestServer(app)
+    await server.start_server()
+    return server
+
+
+@pytest.mark.asyncio
+async def test_fetch_alert_hedges_across_sources(monkeypatch):
+    """The fast local source answers while the slow one is still pending, and is cancelled."""
+    body = json.dumps({"id": "1", "cat": "1", "title": "t", "data": ["Area 1"], "desc": "d"})
+    slow = await start_alert_server(body, delay=1.0)
+    fast = await start_alert_server(body)
+    sources = [redalert.AlertSource(str(slow.make_url("/alerts.json"))), redalert.AlertSource(str(fast.make_url("/alerts.json")))]
+    monkeypatch.setattr(redalert, 'alert_sources', sources)
+    try:
+        async with aiohttp.ClientSession() as session:
+            start = time.monotonic()
+            alert = await redalert.fetch_alert(session)
+            elapsed = time.monotonic() - start
+    finally:
+        await slow.close()
+        await fast.close()
+
+    assert alert.id == "1"
+    assert elapsed < 0.5
+    assert sources[1].wins == 1 and sources[1].latency.count == 1
+    assert sources[0].cancelled == 1 and sources[0].wins == 0
+    assert [s["url"] for s in redalert.polling_info()["sources"]] == [s.url for s in sources]
+
+
+@pytest.mark.asyncio
+async def test_fetch_alert_counts_one_poll_when_several_sources_answer(monkeypatch):
+    body = json.dumps({"id": "1", "cat": "1", "title": "t", "data": ["Area 1"], "desc": "d"})
+    sources = [redalert.AlertSource("http://a/alerts.json"), redalert.AlertSource("http://b/alerts.json")]
+    monkeypatch.setattr(redalert, 'alert_sources', sources)
+    session = AsyncMock()
+    session.get = make_awaitable_response(200, body)
+
+    for _ in range(2):
+        await redalert.fetch_alert(session)
+        await asyncio.sleep(0)
+    assert redalert.poll_counters["polls"] == 2
+    assert redalert.poll_counters["parsed"] + redalert.poll_counters["unchanged"] == 2
+    assert sum(sum(s.answers.values()) for s in sources) >= 2
+    assert sum(s.first for s in sources) == 2
+
+
+@pytest.mark.asyncio
+async def test_fetch_alert_empty_answer_is_not_a_win(monkeypatch):
+    server = await start_alert_server("")
+    source = redalert.AlertSource(str(server.make_url("/alerts.json")))
+    monkeypatch.setattr(redalert, 'alert_sources', [source])
+    try:
+        async with aiohttp.ClientSession() as session:
+            assert await redalert.fetch_alert(session) is None
+    finally:
+        await server.close()
+    assert (source.first, source.wins) == (1, 0)
+
+
+@pytest.mark.asyncio
+async def test_fetch_alert_falls_back_when_a_source_fails(monkeypatch):
+    body = json.dumps({"id": "2", "cat": "1", "title": "t", "data": ["Area 1"], "desc": "d"})
+    broken = await start_alert_server("", status=500)
+    healthy = await start_alert_server(body, delay=0.05)
+    sources = [redalert.AlertSource(str(broken.make_url("/alerts.json"))), redalert.AlertSource(str(healthy.make_url("/alerts.json")))]
+    monkeypatch.setattr(redalert, 'alert_sources', sources)
+    try:
+        async with aiohttp.ClientSession() as session:
+            alert = await redalert.fetch_alert(session)
+    finally:
+        await broken.close()
+        await healthy.close()
+
+    assert alert.id == "2"
+    assert sources[0].errors == 1
+    assert sources[1].wins == 1
+    assert redalert.poll_counters["errors"] == 0  # the poll as a whole succeeded
+
+
+@pytest.mark.asyncio
+async def test_fetch_alert_all_sources_fail(monkeypatch):
+    first = await start_alert_server("", status=503)
+    second = await start_alert_server("invalid json{")
+    sources = [redalert.AlertSource(str(first.make_url("/alerts.json"))), redalert.AlertSource(str(second.make_url("/alerts.json")))]
+    monkeypatch.setattr(redalert, 'alert_sources', sources)
+    try:
+        async with aiohttp.ClientSession() as session:
+            with pytest.raises(redalert.FetchError):
+                await redalert.fetch_alert(session)
+    finally:
+        await first.close()
+        await second.close()
+
+    assert [s.errors for s in sources] == [1, 1]
+    assert redalert.poll_counters["errors"] == 1
+
+
+@pytest.mark.asyncio
+async def test_poll_once_blames_only_its_own_failure():
+    """With overlapping polls, a failure elsewhere must not be charged to a successful response."""
+    scheduler = redalert.PollScheduler(0.25, 2.0, 2)
+    queue = asyncio.Queue()
+    release = asyncio.Event()
+
+    async def slow_ok(session):
+        await release.wait()
+        return None
+
+    async def fast_fail(session):
+        redalert.poll_counters["errors"] += 1
+        raise redalert.FetchError("down")
+
+    with patch.object(redalert, 'fetch_alert', slow_ok):
+        ok = asyncio.create_task(redalert.poll_once(None, queue, scheduler, scheduler.next_seq()))
+        await asyncio.sleep(0)
+    with patch.object(redalert, 'fetch_alert', fast_fail):
+        await redalert.poll_once(None, queue, scheduler, scheduler.next_seq())
+    assert scheduler.interval == 0.375
+    release.set()
+    await ok
+    assert scheduler.interval == 0.25  # the slow poll succeeded
+
+
+@pytest.mark.asyncio
+async def test_fetch_alert_keeps_validators_per_source(monkeypatch):
+    hits = []
+    server = await start_alert_server("", hits=hits)
+    source = redalert.AlertSource(str(server.make_url("/alerts.json")))
+    monkeypatch.setattr(redalert, 'alert_sources', [source])
+    try:
+        async with aiohttp.ClientSession() as session:
+            await redalert.fetch_alert(session)
+            await redalert.fetch_alert(session)
+    finally:
+        await server.close()
+
+    assert hits == [None, '"v1"']
+
+
+def test_poll_scheduler_backs_off_and_recovers():
+    scheduler = redalert.PollScheduler(0.25, 2.0, 2)
+    for _ in range(3):
+        scheduler.observe(0.1, True)
+    assert scheduler.interval == pytest.approx(0.25 * 1.5 ** 3)
+    for _ in range(3):
+        scheduler.observe(0.1, True)
+    assert scheduler.interval == 2.0
+    assert scheduler.error_rate > 0.5
+    scheduler.observe(0.1, False)
+    assert scheduler.interval == 0.25  # first success resets the back-off
+    scheduler.observe(5.0, True)
+    assert scheduler.interval == 0.375
+
+
+def test_poll_scheduler_interval_tracks_upstream_latency():
+    scheduler = redalert.PollScheduler(0.1, 10.0, 2)
+    for _ in range(50):
+        scheduler.observe(1.0, False)
+    # 1s responses with two requests in flight: no faster than every ~0.5s
+    assert scheduler.interval == pytest.approx(0.5, rel=0.05)
+
+
+def test_poll_scheduler_rejects_stale_responses():
+    scheduler = redalert.PollScheduler(0.1, 1.0, 2)
+    first, second = scheduler.next_seq(), scheduler.next_seq()
+    assert scheduler.accept(second, 2.0)
+    assert not scheduler.accept(first, 1.0)
+    assert scheduler.applied_sent_at == 2.0
+    assert scheduler.info()["stale_dropped"] == 1
+
+
+async def run_fetch_stage(seconds: float) -> asyncio.Queue:
+    queue = asyncio.Queue()
+    task = asyncio.create_task(redalert.fetch_stage(AsyncMock(), queue))
+    await asyncio.sleep(seconds)
+    task.cancel()
+    try:
+        await task
+    except asyncio.CancelledError:
+        pass
+    return queue
+
+
+@pytest.mark.asyncio
+async def test_fetch_stage_caps_in_flight_requests(monkeypatch):
+    redalert.alerts.clear()
+    monkeypatch.setattr(redalert, 'POLL_INTERVAL', 0.01)
+    monkeypatch.setattr(redalert, 'POLL_MAX_IN_FLIGHT', 3)
+    in_flight = peak = calls = 0
+    async def slow_fetch(session):
+        nonlocal in_flight, peak, calls
+        calls += 1
+        in_flight += 1
+        peak = max(peak, in_flight)
+        await asyncio.sleep(0.1)
+        in_flight -= 1
+        return None
+    monkeypatch.setattr(redalert, 'fetch_alert', slow_fetch)
+
+    await run_fetch_stage(0.35)
+    assert peak == 3
+    assert calls >= 6  # overlapping, not one 0.1s request at a time
+
+
+@pytest.mark.asyncio
+async def test_fetch_stage_drops_stale_response(monkeypatch):
+    """A slow response that arrives after a newer one must not publish an old state."""
+    redalert.alerts.clear()
+    monkeypatch.setattr(redalert, 'POLL_INTERVAL', 0.02)
+    monkeypatch.setattr(redalert, 'POLL_MAX_IN_FLIGHT', 2)
+    calls = 0
+    async def fetch(session):
+        nonlocal calls
+        calls += 1
+        if calls == 1:
+            await asyncio.sleep(0.1)
+            return make_alert("old")
+        return None
+    monkeypatch.setattr(redalert, 'fetch_alert', fetch)
+
+    queue = await run_fetch_stage(0.2)
+    assert queue.empty()
+    assert "old" not in redalert.alerts
+    assert redalert.poll_scheduler.stale >= 1
+
+
+@pytest.mark.asyncio
+async def test_fetch_stage_records_detection_latency(monkeypatch):
+    redalert.alerts.clear()
+    monkeypatch.setattr(redalert, 'POLL_INTERVAL', 0.02)
+    monkeypatch.setitem(redalert.pipeline_stats, 'detection', redalert.LatencyStats())
+    calls = 0
+    async def fetch(session):
+        nonlocal calls
+        calls += 1
+        return make_alert("a") if calls >= 3 else None
+    monkeypatch.setattr(redalert, 'fetch_alert', fetch)
+
+    queue = await run_fetch_stage(0.15)
+    assert queue.qsize() == 1
+    summary = redalert.pipeline_info()["detection_latency"]
+    assert summary["count"] == 1
+    assert 15 <= summary["p50_ms"] < 100  # roughly one poll interval
+
+
+@pytest.mark.asyncio
+async def test_fetch_stage_backs_off_on_errors(monkeypatch):
+    monkeypatch.setattr(redalert, 'POLL_INTERVAL', 0.01)
+    monkeypatch.setattr(redalert, 'POLL_INTERVAL_MAX', 0.08)
+    async def failing_fetch(session):
+        raise redalert.FetchError("all sources failed")
+    monkeypatch.setattr(redalert, 'fetch_alert', failing_fetch)
+
+    await run_fetch_stage(0.2)
+    assert redalert.poll_scheduler.interval == 0.08
+    assert redalert.polling_info()["scheduler"]["error_rate"] > 0.5
+
+
+@pytest.mark.asyncio
+async def test_fetch_alert_realistic_json():
+    # This is the realistic JSON returned by the Oref API
+    json_data = {
+        "id": "133908130700000000",
+        "cat": "10",
+        "title": "בדקות הקרובות צפויות להתקבל התרעות באזורך",
+        "data": ["ירושלים - מערב", "ירושלים - צפון"],
+        "desc": "עליך לשפר את מיקומך למיגון המיטבי בקרבתך. במקרה של קבלת התרעה, יש להיכנס למרחב המוגן ולשהות בו 10 דקות."
+    }
+    session = AsyncMock()
+    session.get = make_awaitable_response(200, json.dumps(json_data))
+
+    alert = await redalert.fetch_alert(session)
+    assert isinstance(alert, redalert.AlertObject)
+    assert alert.id == "133908130700000000"
+    assert alert.cat == "10"
+    assert alert.title == "בדקות הקרובות צפויות להתקבל התרעות באזורך"
+    assert alert.data == ["ירושלים - מערב", "ירושלים - צפון"]
+    assert "מרחב המוגן" in alert.desc
+
+
+@pytest.mark.asyncio
+async def test_monitor_basic_functionality(monkeypatch):
+    """Test basic monitor functionality without complex timing"""
+    # Clear alerts dict
+    redalert.alerts.clear()
+
+    # Mock fetch_alert to return None (no alerts)
+    async def mock_fetch_alert(session):
+        return None
+
+    monkeypatch.setattr(redalert, 'fetch_alert', mock_fetch_alert)
+
+    # Mock MQTT client
+    mock_mqtt_client = AsyncMock()
+
+    class MockMqttClient:
+        async def __aenter__(self):
+            return mock_mqtt_client
+
+        async def __aexit__(self, exc_type, exc, tb):
+            pass
+
+    monkeypatch.setattr(redalert.aiomqtt, 'Client',
+                        lambda *a, **kw: MockMqttClient())
+
+    # Mock aiohttp.ClientSession
+    class DummySession:
+        def __init__(self, *args, **kwargs): pass
+        async def __aenter__(self):
+            return self
+
+        async def __aexit__(self, exc_type, exc, tb):
+            pass
+
+    monkeypatch.setattr(redalert.aiohttp, 'ClientSession', DummySession)
+
+    # Counter to control iterations
+    iteration_count = 0
+
+    async def counting_sleep(*args, **kwargs):
+        nonlocal iteration_count
+        iteration_count += 1
+        if iteration_count >= 2:  # Stop after 2 iterations
+            raise asyncio.CancelledError()
+        await asyncio.sleep(0.001)  # Very short actual sleep
+
+    monkeypatch.setattr(asyncio, 'sleep', counting_sleep)
+
+    try:
+        await redalert.monitor()
+    except asyncio.CancelledError:
+        pass
+
+    # Test passed if we got here without exceptions
+    assert iteration_count >= 2
+
+# --- 100% coverage additions ---
+import importlib
+
+def test_fetch_alert_json_decode_error_branch():
+    session = AsyncMock()
+    # This will cause json.loads to raise JSONDecodeError
+    session.get = make_awaitable_response(200, 'not a json')
+    # Patch response.text to return the same string
+    with patch('redalert.logger') as mock_logger:
+        with pytest.raises(redalert.FetchError):
+            asyncio.run(redalert.fetch_alert(session))
+        assert mock_logger.error.called
+
+def test_monitor_mqtt_error_branch(monkeypatch):
+    class DummyMqttError(Exception):
+        pass
+    class FailingMqttClient:
+        async def __aenter__(self):
+            raise DummyMqttError('MQTT error')
+        async def __aexit__(self, exc_type, exc, tb):
+            pass
+    monkeypatch.setattr(redalert.aiomqtt, 'MqttError', DummyMqttError)
+    monkeypatch.setattr(redalert.aiomqtt, 'Client', lambda *a, **kw: FailingMqttClient())
+    class DummySession:
+        def __init__(self, *args, **kwargs): pass
+        async def __aenter__(self):
+            return self
+        async def __aexit__(self, exc_type, exc, tb):
+            pass
+    monkeypatch.setattr(redalert.aiohttp, 'ClientSession', DummySession)
+    async def fake_sleep(*args, **kwargs):
+        raise asyncio.CancelledError()
+    monkeypatch.setattr(asyncio, 'sleep', fake_sleep)
+    try:
+        asyncio.run(redalert.monitor())
+    except asyncio.CancelledError:
+        pass
+    except Exception:
+        pass
+
+def test_monitor_generic_exception_branch(monkeypatch):
+    class FailingMqttClient:
+        async def __aenter__(self):
+            raise Exception('Generic error')
+        async def __aexit__(self, exc_type, exc, tb):
+            pass
+    monkeypatch.setattr(redalert.aiomqtt, 'Client', lambda *a, **kw: FailingMqttClient())
+    class DummySession:
+        def __init__(self, *args, **kwargs): pass
+        async def __aenter__(self):
+            return self
+        async def __aexit__(self, exc_type, exc, tb):
+            pass
     monkeypatch.setattr(redalert.aiohttp, 'ClientSession', DummySession)
     async def fake_sleep(*args, **kwargs):
         raise asyncio.CancelledError()
@@ -601,8 +1549,8 @@ async def test_fetch_alert_connection_error():
 
     session = AsyncMock()
     session.get = raise_error
-    alert = await redalert.fetch_alert(session)
-    assert alert is None
+    with pytest.raises(redalert.FetchError):
+        await redalert.fetch_alert(session)
 
 
 @pytest.mark.asyncio
@@ -612,7 +1560,7 @@ async def test_run_health_server(monkeypatch):
     mock_runner = AsyncMock()
     mock_site = AsyncMock()
 
-    monkeypatch.setattr(redalert.aiohttp.web, 'Application', lambda: mock_app)
+    monkeypatch.setattr(redalert.aiohttp.web, 'Application', lambda **kw: mock_app)
     monkeypatch.setattr(redalert.aiohttp.web, 'AppRunner', lambda *a, **kw: mock_runner)
     monkeypatch.setattr(redalert.aiohttp.web, 'TCPSite', lambda runner, host, port: mock_site)
 
@@ -694,6 +1642,52 @@ def test_main_entrypoint(monkeypatch):
     )
 
 
+def test_main_starts_monitor_without_waiting_for_area_data(monkeypatch):
+    gathered = []
+    async def fake_gather(*coros, **kwargs):
+        for coro in coros:
+            gathered.append(coro.__name__)
+            coro.close()
+
+    monkeypatch.setattr(asyncio, 'gather', fake_gather)
+
+    import runpy
+    runpy.run_path(
+        os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'redalert.py')),
+        run_name='__main__'
+    )
+    # load_area_data runs alongside monitor instead of before it
+    assert gathered == ["monitor", "run_health_server", "load_area_data", "area_refresh_loop"]
+
+
+def test_mark_startup_records_first_occurrence(monkeypatch):
+    monkeypatch.setattr(redalert, 'startup_timings', {"imports": 0.1})
+    redalert.mark_startup("mqtt_connected")
+    first = redalert.startup_timings["mqtt_connected"]
+    redalert.mark_startup("mqtt_connected")
+    assert redalert.startup_timings["mqtt_connected"] == first
+    assert first >= 0
+
+
+@pytest.mark.asyncio
+async def test_stats_handler_reports_startup_timings(monkeypatch):
+    monkeypatch.setattr(redalert, 'startup_timings', {"imports": 0.2, "first_fetch": 0.5})
+    response = await redalert.stats_handler(MagicMock())
+    body = json.loads(response.body)
+    assert body["startup"] == {"imports": 0.2, "first_fetch": 0.5}
+    assert body["pipeline"]["queue_size"] == redalert.ALERT_QUEUE_SIZE
+    assert "publish_latency" in body["pipeline"]
+
+
+@pytest.mark.asyncio
+async def test_area_ready_marked_on_install(monkeypatch):
+    monkeypatch.setattr(redalert, 'startup_timings', {})
+    install_area_data(monkeypatch, {})
+    monkeypatch.setattr(redalert, 'area_data_loaded', False)
+    redalert.apply_area_data({})
+    assert "area_ready" in redalert.startup_timings
+
+
 def test_main_block(monkeypatch):
     # Patch monitor to avoid running the infinite loop
     with patch('redalert.monitor', new=AsyncMock()):
@@ -711,6 +1705,15 @@ def test_main_block(monkeypatch):
 # ====== Area endpoint tests ======
 
 
+def install_area_data(monkeypatch, area_data):
+    store = redalert.area_store_from_data(area_data)
+    bbox_index = redalert.build_bbox_index(store)
+    geometries = redalert.build_area_geometries(store)
+    monkeypatch.setattr(redalert, 'area_bbox_index', bbox_index)
+    monkeypatch.setattr(redalert, 'area_geometries', geometries)
+    monkeypatch.setattr(redalert, 'area_spatial_index', redalert.build_spatial_index(bbox_index, geometries))
+
+
 def test_area_file_is_fresh_no_file(monkeypatch):
     monkeypatch.setattr(redalert, 'AREA_POLYGONS_FILE', '/tmp/nonexistent_area_test.json')
     assert redalert._area_file_is_fresh() is False
@@ -740,7 +1743,7 @@ def test_build_bbox_index():
             "polygon": [[32.0, 34.7], [32.1, 34.7], [32.1, 34.8], [32.0, 34.8]]
         }
     }
-    idx = redalert.build_bbox_index(data)
+    idx = redalert.build_bbox_index(redalert.area_store_from_data(data))
     assert "תל אביב" in idx
     assert idx["תל אביב"]["migun_time"] == 90
     bbox = idx["תל אביב"]["bbox"]
@@ -748,12 +1751,12 @@ def test_build_bbox_index():
 
 
 def test_build_bbox_index_empty():
-    assert redalert.build_bbox_index({}) == {}
+    assert redalert.build_bbox_index(redalert.area_store_from_data({})) == {}
 
 
 def test_build_bbox_index_skips_empty_polygon():
     data = {"city": {"migun_time": 0, "polygon": []}}
-    assert redalert.build_bbox_index(data) == {}
+    assert redalert.build_bbox_index(redalert.area_store_from_data(data)) == {}
 
 
 def test_lookup_area_hit(monkeypatch, tmp_path):
@@ -767,7 +1770,7 @@ def test_lookup_area_hit(monkeypatch, tmp_path):
     f = tmp_path / "area_polygons.json"
     f.write_text(json.dumps(area_data, ensure_ascii=False))
     monkeypatch.setattr(redalert, 'AREA_POLYGONS_FILE', str(f))
-    monkeypatch.setattr(redalert, 'area_bbox_index', redalert.build_bbox_index(area_data))
+    install_area_data(monkeypatch, area_data)
 
     result = redalert.lookup_area(32.05, 34.75)
     assert result is not None
@@ -785,7 +1788,7 @@ def test_lookup_area_miss(monkeypatch, tmp_path):
     f = tmp_path / "area_polygons.json"
     f.write_text(json.dumps(area_data, ensure_ascii=False))
     monkeypatch.setattr(redalert, 'AREA_POLYGONS_FILE', str(f))
-    monkeypatch.setattr(redalert, 'area_bbox_index', redalert.build_bbox_index(area_data))
+    install_area_data(monkeypatch, area_data)
 
     result = redalert.lookup_area(33.0, 35.0)
     assert result is None
@@ -802,7 +1805,7 @@ def test_lookup_area_bbox_hit_polygon_miss(monkeypatch, tmp_path):
     f = tmp_path / "area_polygons.json"
     f.write_text(json.dumps(area_data, ensure_ascii=False))
     monkeypatch.setattr(redalert, 'AREA_POLYGONS_FILE', str(f))
-    monkeypatch.setattr(redalert, 'area_bbox_index', redalert.build_bbox_index(area_data))
+    install_area_data(monkeypatch, area_data)
 
     # Point at (32.09, 34.71) is inside bbox but outside the triangle
     result = redalert.lookup_area(32.09, 34.71)
@@ -810,20 +1813,104 @@ def test_lookup_area_bbox_hit_polygon_miss(monkeypatch, tmp_path):
 
 
 def test_lookup_area_no_candidates(monkeypatch):
-    monkeypatch.setattr(redalert, 'area_bbox_index', {})
+    install_area_data(monkeypatch, {})
     result = redalert.lookup_area(32.05, 34.75)
     assert result is None
 
 
-def test_lookup_area_file_read_error(monkeypatch):
-    monkeypatch.setattr(redalert, 'AREA_POLYGONS_FILE', '/tmp/nonexistent.json')
-    monkeypatch.setattr(redalert, 'area_bbox_index', {
-        "city": {"migun_time": 0, "bbox": (30.0, 35.0, 34.0, 36.0)}
-    })
-    result = redalert.lookup_area(32.0, 35.0)
+def test_lookup_area_no_index(monkeypatch):
+    monkeypatch.setattr(redalert, 'area_spatial_index', None)
+    result = redalert.lookup_area(32.05, 34.75)
     assert result is None
 
 
+def test_area_store_roundtrip(tmp_path):
+    area_data = {
+        "תל אביב": {"migun_time": 90, "polygon": [[32.0, 34.7], [32.1, 34.7], [32.1, 34.8], [32.0, 34.8]]},
+        "triangle": {"migun_time": 60, "polygon": [[31.0, 34.7], [31.1, 34.8], [31.0, 34.8]]},
+    }
+    store = redalert.area_store_from_data(area_data)
+    path = str(tmp_path / "area_polygons.bin")
+    redalert.write_area_store(store, path)
+
+    loaded = redalert.read_area_store(path)
+    assert loaded.names == ["תל אביב", "triangle"]
+    assert loaded.offsets.tolist() == [0, 4, 7]
+    assert loaded.migun_times.tolist() == [90, 60]
+    assert not loaded.coords.flags.writeable  # served from the memory map
+    assert loaded.coords[4:].tolist() == [[34.7, 31.0], [34.8, 31.1], [34.8, 31.0]]  # (lon, lat) pairs
+
+
+def test_area_store_from_data_skips_degenerate_rings():
+    area_data = {
+        "empty": {"migun_time": 0, "polygon": []},
+        "line": {"migun_time": 0, "polygon": [[32.0, 34.7], [32.1, 34.8]]},
+        "closed_line": {"migun_time": 0, "polygon": [[32.0, 34.7], [32.1, 34.8], [32.0, 34.7]]},
+        "ok": {"migun_time": 5, "polygon": [[32.0, 34.7], [32.1, 34.8], [32.0, 34.8], [32.0, 34.7]]},
+    }
+    store = redalert.area_store_from_data(area_data)
+    assert store.names == ["ok"]
+    assert store.coords.shape == (4, 2)
+
+
+def test_read_area_store_rejects_other_files(tmp_path):
+    path = tmp_path / "area_polygons.bin"
+    path.write_bytes(b"not an area store at all")
+    with pytest.raises(ValueError):
+        redalert.read_area_store(str(path))
+
+
+def test_build_spatial_index_skips_missing_geometry():
+    bbox_index = {
+        "city": {"migun_time": 0, "bbox": (30.0, 35.0, 34.0, 36.0)},
+        "square": {"migun_time": 90, "bbox": (32.0, 32.1, 34.7, 34.8)},
+    }
+    geometries = redalert.build_area_geometries(redalert.area_store_from_data({
+        "square": {"migun_time": 90, "polygon": [[32.0, 34.7], [32.1, 34.7], [32.1, 34.8], [32.0, 34.8]]}
+    }))
+    spatial_index = redalert.build_spatial_index(bbox_index, geometries)
+    assert spatial_index.names == ["square"]
+    assert spatial_index.migun_times == [90]
+    assert len(spatial_index.tree) == 1
+
+
+def test_lookup_area_overlapping_areas_first_wins(monkeypatch):
+    square = [[32.0, 34.7], [32.1, 34.7], [32.1, 34.8], [32.0, 34.8]]
+    area_data = {
+        "first": {"migun_time": 15, "polygon": square},
+        "second": {"migun_time": 90, "polygon": square},
+    }
+    install_area_data(monkeypatch, area_data)
+    assert redalert.lookup_area(32.05, 34.75) == {"area": "first", "migun_time": 15}
+
+
+def test_lookup_area_does_not_read_file(monkeypatch):
+    area_data = {
+        "תל אביב": {
+            "migun_time": 90,
+            "polygon": [[32.0, 34.7], [32.1, 34.7], [32.1, 34.8], [32.0, 34.8]]
+        }
+    }
+    monkeypatch.setattr(redalert, 'AREA_POLYGONS_FILE', '/tmp/nonexistent.json')
+    install_area_data(monkeypatch, area_data)
+
+    with patch('builtins.open', side_effect=AssertionError("file opened")):
+        result = redalert.lookup_area(32.05, 34.75)
+    assert result == {"area": "תל אביב", "migun_time": 90}
+
+
+def test_build_area_geometries():
+    data = {
+        "square": {"migun_time": 90, "polygon": [[32.0, 34.7], [32.1, 34.7], [32.1, 34.8], [32.0, 34.8]]},
+        "tiny": {"migun_time": 10, "polygon": [[32.0, 34.7], [32.1, 34.8]]},
+    }
+    geoms = redalert.build_area_geometries(redalert.area_store_from_data(data))
+    assert list(geoms) == ["square"]
+    # Stored as (x=lon, y=lat) and prepared for repeated predicates
+    assert geoms["square"].bounds == (34.7, 32.0, 34.8, 32.1)
+    assert redalert.shapely.is_prepared(geoms["square"])
+
+
 @pytest.mark.asyncio
 async def test_area_handler_success(monkeypatch):
     monkeypatch.setattr(redalert, 'area_data_loaded', True)
@@ -876,6 +1963,493 @@ async def test_area_handler_invalid_params():
     assert response.status == 400
 
 
+@pytest.mark.asyncio
+@pytest.mark.parametrize("lat, lon", [("nan", "34.7"), ("32.0", "inf"), ("1e400", "34.7")])
+async def test_area_handler_non_finite_params(monkeypatch, lat, lon):
+    monkeypatch.setattr(redalert, 'area_data_loaded', True)
+    request = MagicMock()
+    request.query = {"lat": lat, "lon": lon}
+    response = await redalert.area_handler(request)
+    assert response.status == 400
+
+
+def test_lookup_areas_matches_single_lookup(monkeypatch):
+    square = [[32.0, 34.7], [32.1, 34.7], [32.1, 34.8], [32.0, 34.8]]
+    area_data = {
+        "first": {"migun_time": 15, "polygon": square},
+        "second": {"migun_time": 90, "polygon": square},
+        "triangle": {"migun_time": 60, "polygon": [[31.0, 34.7], [31.1, 34.8], [31.0, 34.8]]},
+    }
+    install_area_data(monkeypatch, area_data)
+    lats = redalert.np.array([32.05, 31.09, 31.01, 33.0])
+    lons = redalert.np.array([34.75, 34.71, 34.79, 35.0])
+
+    results = redalert.lookup_areas(lats, lons)
+    assert results == [redalert.lookup_area(lat, lon) for lat, lon in zip(lats, lons)]
+    assert results[0] == {"area": "first", "migun_time": 15}
+    assert results[1] is None
+    assert results[2] == {"area": "triangle", "migun_time": 60}
+    assert results[3] is None
+
+
+def test_lookup_areas_no_index(monkeypatch):
+    monkeypatch.setattr(redalert, 'area_spatial_index', None)
+    assert redalert.lookup_areas(redalert.np.array([32.0]), redalert.np.array([34.7])) == [None]
+
+
+def test_build_area_grid_owned_boundary_and_empty_cells():
+    area_data = {
+        "big": {"migun_time": 90, "polygon": [[32.0, 34.0], [33.0, 34.0], [33.0, 35.0], [32.0, 35.0]]},
+        "far": {"migun_time": 30, "polygon": [[35.0, 37.0], [35.5, 37.0], [35.5, 37.5], [35.0, 37.5]]},
+    }
+    store = redalert.area_store_from_data(area_data)
+    spatial_index = redalert.build_spatial_index(redalert.build_bbox_index(store), redalert.build_area_geometries(store))
+    grid = redalert.build_area_grid(spatial_index, 0.1)
+
+    assert grid.owners[grid.cell_of(32.55, 34.55)] == 0
+    assert grid.owners[grid.cell_of(34.0, 36.0)] == redalert.GRID_EMPTY
+    assert grid.cell_of(31.0, 34.5) == -1
+    # Cells crossing the polygon edge keep the candidate list instead of an owner
+    edge_cell = grid.cell_of(32.95, 34.5)
+    assert grid.owners[edge_cell] in (0, redalert.GRID_BOUNDARY)
+
+
+def test_build_area_grid_empty_index():
+    spatial_index = redalert.build_spatial_index({}, {})
+    assert redalert.build_area_grid(spatial_index, 0.1) is None
+
+
+def test_lookup_area_with_grid_matches_tree(monkeypatch):
+    triangle = [[32.0, 34.7], [32.1, 34.8], [32.0, 34.8]]
+    square = [[32.0, 34.7], [32.1, 34.7], [32.1, 34.8], [32.0, 34.8]]
+    area_data = {
+        "triangle": {"migun_time": 60, "polygon": triangle},
+        "square": {"migun_time": 90, "polygon": square},
+        "other": {"migun_time": 15, "polygon": [[32.3, 34.9], [32.4, 34.9], [32.4, 35.0], [32.3, 35.0]]},
+    }
+    install_area_data(monkeypatch, area_data)
+    lats = redalert.np.linspace(31.95, 32.45, 41)
+    lons = redalert.np.linspace(34.65, 35.05, 37)
+    points = [(float(lat), float(lon)) for lat in lats for lon in lons]
+    expected = [redalert.lookup_area(lat, lon) for lat, lon in points]
+
+    redalert.area_spatial_index.grid = redalert.build_area_grid(redalert.area_spatial_index, 0.013)
+    assert [redalert.lookup_area(lat, lon) for lat, lon in points] == expected
+    point_lats = redalert.np.array([p[0] for p in points])
+    point_lons = redalert.np.array([p[1] for p in points])
+    assert redalert.lookup_areas(point_lats, point_lons) == expected
+
+
+def test_area_grid_persisted_and_reused(monkeypatch, tmp_path):
+    install_area_data(monkeypatch, {})
+    monkeypatch.setattr(redalert, 'area_data_loaded', False)
+    area_data = {
+        "square": {"migun_time": 90, "polygon": [[32.0, 34.7], [32.1, 34.7], [32.1, 34.8], [32.0, 34.8]]}
+    }
+    f = tmp_path / "area_polygons.json"
+    f.write_text(json.dumps(area_data))
+    monkeypatch.setattr(redalert, 'AREA_POLYGONS_FILE', str(f))
+    grid_file = redalert.area_grid_path()
+    assert grid_file == str(tmp_path / "area_grid.npz")
+
+    redalert.apply_area_data(area_data, grid_file)
+    built = redalert.area_spatial_index.grid
+    assert os.path.exists(grid_file)
+
+    with patch.object(redalert, 'build_area_grid', side_effect=AssertionError("grid rebuilt")):
+        redalert.apply_area_data(area_data, grid_file)
+    loaded = redalert.area_spatial_index.grid
+    assert (loaded.owners == built.owners).all()
+    assert (loaded.cell_size, loaded.rows, loaded.cols) == (built.cell_size, built.rows, built.cols)
+    assert redalert.lookup_area(32.05, 34.75) == {"area": "square", "migun_time": 90}
+
+
+def test_area_grid_rebuilt_when_dataset_changes(monkeypatch, tmp_path):
+    install_area_data(monkeypatch, {})
+    monkeypatch.setattr(redalert, 'area_data_loaded', False)
+    square = [[32.0, 34.7], [32.1, 34.7], [32.1, 34.8], [32.0, 34.8]]
+    f = tmp_path / "area_polygons.json"
+    f.write_text("{}")
+    monkeypatch.setattr(redalert, 'AREA_POLYGONS_FILE', str(f))
+    grid_file = redalert.area_grid_path()
+    redalert.apply_area_data({"old": {"migun_time": 10, "polygon": square}}, grid_file)
+
+    assert redalert.load_area_grid(["new"], grid_file) is None
+    monkeypatch.setattr(redalert, 'AREA_GRID_CELL_SIZE', 0.5)
+    assert redalert.load_area_grid(["old"], grid_file) is None
+
+
+def test_apply_area_data_grid_disabled(monkeypatch):
+    install_area_data(monkeypatch, {})
+    monkeypatch.setattr(redalert, 'area_data_loaded', False)
+    monkeypatch.setattr(redalert, 'AREA_GRID_CELL_SIZE', 0)
+    area_data = {
+        "square": {"migun_time": 90, "polygon": [[32.0, 34.7], [32.1, 34.7], [32.1, 34.8], [32.0, 34.8]]}
+    }
+    redalert.apply_area_data(area_data)
+    assert redalert.area_spatial_index.grid is None
+    assert redalert.lookup_area(32.05, 34.75) == {"area": "square", "migun_time": 90}
+
+
+def test_parse_batch_points_formats():
+    lats, lons = redalert.parse_batch_points('[[32.0, 34.7], {"lat": 31.5, "lon": 35.1}]')
+    assert lats.tolist() == [32.0, 31.5]
+    assert lons.tolist() == [34.7, 35.1]
+
+    lats, lons = redalert.parse_batch_points('{"lat": 32.0, "lon": 34.7}\n\n[31.5, 35.1]\n')
+    assert lats.tolist() == [32.0, 31.5]
+    assert lons.tolist() == [34.7, 35.1]
+
+
+def test_parse_batch_points_ndjson_pairs():
+    lats, lons = redalert.parse_batch_points('[32.0, 34.8]\n[31.0, 35.0]\n')
+    assert lats.tolist() == [32.0, 31.0]
+    assert lons.tolist() == [34.8, 35.0]
+
+    lats, lons = redalert.parse_batch_points('[32.0, 34.8]')
+    assert lats.tolist() == [32.0]
+    assert lons.tolist() == [34.8]
+
+
+@pytest.mark.parametrize("body", ["", "[1, 2, 3]", '[[NaN, 34.8]]', '[[32.0, 1e400]]', '[{"lat": 1}]', "not json", '[["a", "b"]]', '[32.0, 34.8]\n[1]'])
+def test_parse_batch_points_invalid(body):
+    with pytest.raises((ValueError, KeyError, TypeError)):
+        redalert.parse_batch_points(body)
+
+
+@pytest.mark.asyncio
+async def test_area_batch_handler_success(monkeypatch):
+    area_data = {
+        "תל אביב": {
+            "migun_time": 90,
+            "polygon": [[32.0, 34.7], [32.1, 34.7], [32.1, 34.8], [32.0, 34.8]]
+        }
+    }
+    install_area_data(monkeypatch, area_data)
+    monkeypatch.setattr(redalert, 'area_data_loaded', True)
+    request = MagicMock()
+    request.text = AsyncMock(return_value='[[32.05, 34.75], [33.0, 35.0]]')
+
+    response = await redalert.area_batch_handler(request)
+    assert response.status == 200
+    body = json.loads(response.body)
+    assert body["results"] == [
+        {"lat": 32.05, "lon": 34.75, "area": "תל אביב", "migun_time": 90},
+        {"lat": 33.0, "lon": 35.0, "area": None, "migun_time": None},
+    ]
+
+
+@pytest.mark.asyncio
+async def test_area_batch_handler_not_loaded(monkeypatch):
+    monkeypatch.setattr(redalert, 'area_data_loaded', False)
+    request = MagicMock()
+    response = await redalert.area_batch_handler(request)
+    assert response.status == 503
+
+
+@pytest.mark.asyncio
+async def test_area_batch_handler_invalid_body(monkeypatch):
+    monkeypatch.setattr(redalert, 'area_data_loaded', True)
+    request = MagicMock()
+    request.text = AsyncMock(return_value='{"lat": "abc", "lon": 1}')
+    response = await redalert.area_batch_handler(request)
+    assert response.status == 400
+
+
+@pytest.mark.asyncio
+async def test_area_batch_handler_too_many_points(monkeypatch):
+    monkeypatch.setattr(redalert, 'area_data_loaded', True)
+    monkeypatch.setattr(redalert, 'AREA_BATCH_MAX_POINTS', 1)
+    request = MagicMock()
+    request.text = AsyncMock(return_value='[[32.0, 34.7], [32.1, 34.8]]')
+    response = await redalert.area_batch_handler(request)
+    assert response.status == 413
+
+
+def test_parse_batch_points_rejects_over_cap_before_parsing_points():
+    with pytest.raises(redalert.BatchTooLarge):
+        redalert.parse_batch_points('{"lat": 32.0, "lon": 34.7}\nnot json\n{"lat": 31.5, "lon": 35.1}\n', max_points=2)
+
+
+@pytest.mark.asyncio
+async def test_area_batch_accepts_default_max_points_over_http(monkeypatch):
+    """A batch of AREA_BATCH_MAX_POINTS points must fit in the server's request body limit."""
+    from aiohttp.test_utils import TestServer
+    install_area_data(monkeypatch, {"תל אביב": {"migun_time": 90, "polygon": [[32.0, 34.7], [32.1, 34.7], [32.1, 34.8], [32.0, 34.8]]}})
+    monkeypatch.setattr(redalert, 'area_data_loaded', True)
+    points = [{"lat": 32.05 + i * 1e-7, "lon": 34.75 + i * 1e-7} for i in range(redalert.AREA_BATCH_MAX_POINTS)]
+    body = json.dumps(points)
+    assert len(body) > 1024 ** 2
+
+    server = TestServer(redalert.make_health_app())
+    await server.start_server()
+    try:
+        async with aiohttp.ClientSession() as session:
+            async with session.post(server.make_url("/area/batch"), data=body) as response:
+                assert response.status == 200
+                assert len((await response.json())["results"]) == redalert.AREA_BATCH_MAX_POINTS
+    finally:
+        await server.close()
+
+
+def test_area_lookup_cache_lru_eviction():
+    cache = redalert.AreaLookupCache(2, 4)
+    cache.put(("a",), 1, 0)
+    cache.put(("b",), 2, 0)
+    assert cache.get(("a",)) == 1  # "a" becomes most recent
+    cache.put(("c",), 3, 0)
+    with pytest.raises(KeyError):
+        cache.get(("b",))
+    assert cache.get(("c",)) == 3
+    assert cache.info()["size"] == 2
+    assert (cache.hits, cache.misses) == (2, 1)
+
+
+def test_area_lookup_cache_rejects_stale_version():
+    cache = redalert.AreaLookupCache(10, 4)
+    cache.put(("a",), 1, 0)
+    cache.invalidate(1)
+    with pytest.raises(KeyError):
+        cache.get(("a",))
+    cache.put(("b",), 2, 0)  # computed against the previous dataset
+    assert cache.info()["size"] == 0
+
+
+def test_area_lookup_cache_quantizes_key():
+    cache = redalert.AreaLookupCache(10, 3)
+    assert cache.key(32.08531, 34.78179) == cache.key(32.08528, 34.78181) == (32.085, 34.782)
+
+
+def test_cached_lookup_area_hits_and_misses(monkeypatch):
+    calls = []
+    def fake_lookup(lat, lon):
+        calls.append((lat, lon))
+        return {"area": "תל אביב", "migun_time": 90}
+    monkeypatch.setattr(redalert, 'lookup_area', fake_lookup)
+
+    assert redalert.cached_lookup_area(32.08531, 34.78179)["area"] == "תל אביב"
+    assert redalert.cached_lookup_area(32.08532, 34.78178)["area"] == "תל אביב"
+    assert calls == [(32.0853, 34.7818)]
+    info = redalert.area_lookup_cache.info()
+    assert (info["hits"], info["misses"]) == (1, 1)
+
+
+def test_cached_lookup_area_disabled(monkeypatch):
+    cache = redalert.AreaLookupCache(0, 4)
+    cache.invalidate(redalert.area_dataset_version)
+    monkeypatch.setattr(redalert, 'area_lookup_cache', cache)
+    calls = []
+    monkeypatch.setattr(redalert, 'lookup_area', lambda lat, lon: calls.append((lat, lon)))
+    redalert.cached_lookup_area(32.0, 34.0)
+    redalert.cached_lookup_area(32.0, 34.0)
+    assert len(calls) == 2
+    redalert.cached_lookup_area(32.123456789, 34.987654321)
+    assert calls[-1] == (32.123456789, 34.987654321)  # not rounded to the cache precision
+
+
+def test_apply_area_data_invalidates_cache(monkeypatch):
+    install_area_data(monkeypatch, {})
+    monkeypatch.setattr(redalert, 'area_data_loaded', False)
+    monkeypatch.setattr(redalert, 'AREA_GRID_CELL_SIZE', 0)
+    square = [[32.0, 34.7], [32.1, 34.7], [32.1, 34.8], [32.0, 34.8]]
+
+    redalert.apply_area_data({"old": {"migun_time": 10, "polygon": square}})
+    assert redalert.cached_lookup_area(32.05, 34.75)["area"] == "old"
+    redalert.apply_area_data({"new": {"migun_time": 20, "polygon": square}})
+    assert redalert.area_lookup_cache.version == redalert.area_dataset_version
+    assert redalert.area_lookup_cache.info()["size"] == 0
+    assert redalert.cached_lookup_area(32.05, 34.75)["area"] == "new"
+
+
+@pytest.mark.asyncio
+async def test_stats_handler_reports_area_cache(monkeypatch):
+    monkeypatch.setattr(redalert, 'lookup_area', lambda lat, lon: None)
+    redalert.cached_lookup_area(32.0, 34.0)
+    redalert.cached_lookup_area(32.0, 34.0)
+    response = await redalert.stats_handler(MagicMock())
+    assert response.status == 200
+    body = json.loads(response.body)
+    assert body["area_cache"]["hits"] == 1
+    assert body["area_cache"]["misses"] == 1
+
+
+def test_alert_history_ring_and_area_index():
+    history = redalert.AlertHistory(3)
+    for i, areas in enumerate([["A"], ["A", "B"], ["B"], ["C"]]):
+        history.add(make_alert(i, areas), 100.0 + i)
+
+    assert len(history) == 3
+    assert [a.id for _, a in history.recent()] == ["1", "2", "3"]  # "0" was overwritten
+    assert [a.id for _, a in history.recent(area="A")] == ["1"]
+    assert [a.id for _, a in history.recent(area="B")] == ["1", "2"]
+    assert [a.id for _, a in history.recent(since=102.0)] == ["2", "3"]
+    assert [a.id for _, a in history.recent(since=102.0, area="B")] == ["2"]
+    assert history.recent(area="missing") == []
+
+    history.add(make_alert(4, ["C"]), 104.0)
+    history.add(make_alert(5, ["C"]), 105.0)
+    assert "A" not in history.by_area and "B" not in history.by_area
+    assert list(history.by_area["C"]) == [3, 4, 5]
+
+
+def test_alert_history_keeps_timestamps_ordered():
+    history = redalert.AlertHistory(10)
+    history.add(make_alert(1), 200.0)
+    history.add(make_alert(2), 199.0)  # wall clock stepped back
+    assert [ts for ts, _ in history.recent()] == [200.0, 200.0]
+    assert [a.id for _, a in history.recent(since=200.0)] == ["1", "2"]
+
+
+@pytest.mark.asyncio
+async def test_recent_alerts_handler(monkeypatch):
+    history = redalert.AlertHistory(10)
+    history.add(make_alert(1, ["A"]), 100.0)
+    history.add(redalert.replace(make_alert(1, ["B"]), delta=True), 150.0)
+    monkeypatch.setattr(redalert, 'alert_history', history)
+
+    request = MagicMock()
+    request.query = {"since": "120", "area": "B"}
+    response = await redalert.recent_alerts_handler(request)
+    assert response.status == 200
+    assert json.loads(response.body) == {"alerts": [
+        {"id": "1", "cat": "1", "title": "t", "data": ["B"], "desc": "d", "delta": True, "published_at": 150.0}]}
+
+    request.query = {}
+    assert len(json.loads((await redalert.recent_alerts_handler(request)).body)["alerts"]) == 2
+
+    request.query = {"since": "ten minutes ago"}
+    assert (await redalert.recent_alerts_handler(request)).status == 400
+
+
+@pytest.mark.asyncio
+async def test_flush_outbox_records_history(monkeypatch):
+    monkeypatch.setattr(redalert, 'alert_history', redalert.AlertHistory(10))
+    outbox = redalert.AlertOutbox(10)
+    outbox.add(make_alert("a", ["A"]), time.monotonic())
+    await redalert.flush_outbox(AsyncMock(), outbox)
+    assert [a.id for _, a in redalert.alert_history.recent(area="A")] == ["a"]
+
+
+@pytest.mark.asyncio
+async def test_alert_trace_end_to_end(monkeypatch):
+    redalert.alerts.clear()
+    monkeypatch.setattr(redalert, 'trace_stats', {})
+    body = json.dumps({"id": "1", "cat": "1", "title": "t", "data": ["Area 1"], "desc": "d"})
+    session = AsyncMock()
+    session.get = make_awaitable_response(200, body)
+    scheduler = redalert.PollScheduler(1, 1, 1)
+    queue = asyncio.Queue()
+
+    await redalert.poll_once(session, queue, scheduler, scheduler.next_seq())
+    alert, _ = queue.get_nowait()
+    assert alert.trace["received"] <= alert.trace["parsed"] <= alert.trace["deduped"]
+    assert await redalert.publish_alert(AsyncMock(), alert)
+
+    trace = json.loads((await redalert.stats_handler(MagicMock())).body)["trace"]
+    assert set(trace) == {"parse", "dedupe", "queue", "publish:cat", "publish:raw_data", "end_to_end:cat", "end_to_end:raw_data"}
+    assert all(summary["count"] == 1 for summary in trace.values())
+
+
+@pytest.mark.asyncio
+async def test_alert_trace_restamps_cached_result(monkeypatch):
+    """An unchanged body reuses the parsed alert; its old stamps must not be reported again."""
+    redalert.alerts.clear()
+    body = json.dumps({"id": "1", "cat": "1", "title": "t", "data": ["Area 1"], "desc": "d"})
+    session = AsyncMock()
+    session.get = make_awaitable_response(200, body)
+    scheduler = redalert.PollScheduler(1, 1, 1)
+    queue = asyncio.Queue()
+    await redalert.poll_once(session, queue, scheduler, scheduler.next_seq())
+    first, _ = queue.get_nowait()
+
+    redalert.alerts.clear()
+    before = time.monotonic()
+    await redalert.poll_once(session, queue, scheduler, scheduler.next_seq())
+    second, _ = queue.get_nowait()
+    assert second.trace["received"] >= before
+    assert "parsed" not in second.trace
+    assert first.trace["received"] < before
+
+
+def test_cat_payload_receive_time(monkeypatch):
+    monkeypatch.setattr(redalert, 'TRACE_RECEIVE_TIME', 'True')
+    alert = make_alert("1")
+    alert.trace["received"] = time.monotonic() - 0.5
+    payload = json.loads(redalert.plan_alert_messages(alert)[0].payload)
+    assert payload["received_at"] == pytest.approx(time.time() - 0.5, abs=0.05)
+
+    assert "received_at" not in json.loads(redalert.plan_alert_messages(make_alert("2"))[0].payload)
+    monkeypatch.setattr(redalert, 'TRACE_RECEIVE_TIME', 'False')
+    assert "received_at" not in json.loads(redalert.plan_alert_messages(alert)[0].payload)
+
+
+def test_alert_outbox_does_not_persist_trace(tmp_path):
+    path = tmp_path / "outbox.jsonl"
+    alert = make_alert("a")
+    alert.trace["received"] = 1.0
+    redalert.AlertOutbox(10, str(path)).add(alert, 0.0)
+    assert "trace" not in json.loads(path.read_text())["alert"]
+    restored, _ = redalert.AlertOutbox(10, str(path)).peek()
+    assert restored == alert and restored.trace == {}
+
+
+def test_histogram_render():
+    hist = redalert.Histogram((0.1, 1))
+    for value in (0.05, 0.1, 0.5, 3):
+        hist.observe(value)
+    assert hist.render("x_seconds", 'topic="cat"') == [
+        'x_seconds_bucket{topic="cat",le="0.1"} 2',
+        'x_seconds_bucket{topic="cat",le="1"} 3',
+        'x_seconds_bucket{topic="cat",le="+Inf"} 4',
+        'x_seconds_sum{topic="cat"} 3.650000',
+        'x_seconds_count{topic="cat"} 4',
+    ]
+    assert hist.render("y")[-1] == "y_count 4"
+
+
+@pytest.mark.asyncio
+async def test_poll_once_counts_for_metrics(monkeypatch):
+    redalert.alerts.clear()
+    monkeypatch.setattr(redalert, 'dedupe_counters', dict.fromkeys(redalert.dedupe_counters, 0))
+    monkeypatch.setattr(redalert, 'FETCH_TIMEOUT', 0.01)
+    scheduler = redalert.PollScheduler(1, 1, 1)
+    queue = asyncio.Queue()
+    monkeypatch.setattr(redalert, 'filtered_test_ids', redalert.OrderedDict())
+    responses = [make_alert("1"), make_alert("1"), make_alert("2", ["בדיקה"]), make_alert("2", ["בדיקה"])]
+    async def fetch(session):
+        if not responses:
+            await asyncio.sleep(1)
+        return responses.pop(0)
+    monkeypatch.setattr(redalert, 'fetch_alert', fetch)
+    monkeypatch.setattr(redalert, 'INCLUDE_TEST_ALERTS', 'False')
+
+    for _ in range(5):
+        await redalert.poll_once(None, queue, scheduler, scheduler.next_seq())
+    assert redalert.dedupe_counters["new"] == 1
+    assert redalert.dedupe_counters["hits"] == 1
+    assert redalert.dedupe_counters["test_filtered"] == 1  # the same test alert polled twice
+    assert redalert.poll_counters["timeouts"] == 1
+
+
+@pytest.mark.asyncio
+async def test_metrics_handler(monkeypatch):
+    monkeypatch.setattr(redalert, 'publish_histograms', {})
+    await redalert.publish_alert(AsyncMock(), make_alert("1"))
+    redalert.metric_histograms["area_lookup"].observe(0.0001)
+
+    response = await redalert.metrics_handler(MagicMock())
+    assert response.status == 200
+    assert response.headers["Content-Type"].startswith("text/plain; version=0.0.4")
+    text = response.body.decode('utf-8')
+    assert "# TYPE redalert_oref_fetch_seconds histogram" in text
+    assert 'redalert_mqtt_publish_seconds_count{topic="cat"} 1' in text
+    assert 'redalert_mqtt_publish_seconds_count{topic="raw_data"} 1' in text
+    assert 'redalert_poll_fast_path_total{path="unchanged"} 0' in text
+    for name in ("redalert_polls_total", "redalert_new_alerts_total", "redalert_dedupe_hit_polls_total",
+                 "redalert_test_alerts_filtered_total", "redalert_fetch_timeouts_total", "redalert_area_lookup_seconds_count"):
+        assert f"\n{name} " in text
+
+
 class AsyncJsonContextResponse:
     def __init__(self, status, json_value):
         self.status = status
@@ -927,6 +2501,108 @@ async def test_fetch_area_polygons_success():
     assert len(result["תל אביב"]["polygon"]) == 4
 
 
+def make_area_source(cities, segments, polygons, requested):
+    async def mock_get(url, **kwargs):
+        requested.append(url)
+        if "GetCitiesMix" in url:
+            return AsyncJsonContextResponse(200, cities)
+        elif "segments" in url:
+            return AsyncJsonContextResponse(200, {"segments": segments})
+        for seg_id, polygon in polygons.items():
+            if url.endswith(f"id={seg_id}"):
+                return AsyncJsonContextResponse(200, {"polygonPointList": [polygon]})
+        return AsyncJsonContextResponse(500, None)
+    session = AsyncMock()
+    session.get = mock_get
+    return session
+
+
+@pytest.mark.asyncio
+async def test_fetch_area_polygons_incremental():
+    square = [[32.0, 34.7], [32.1, 34.7], [32.1, 34.8], [32.0, 34.8]]
+    moved = [[32.2, 34.7], [32.3, 34.7], [32.3, 34.8], [32.2, 34.8]]
+    segments = {
+        "1": {"id": 1, "name": "תל אביב", "centerX": 34.78, "centerY": 32.08},
+        "2": {"id": 2, "name": "חיפה", "centerX": 34.99, "centerY": 32.82},
+        "3": {"id": 3, "name": "גבעתיים", "centerX": 34.81, "centerY": 32.07},
+    }
+    cities = [
+        {"label": "תל אביב", "migun_time": "90"},
+        {"label": "חיפה", "migun_time": "60"},
+        {"label": "גבעתיים", "migun_time": "90"},
+    ]
+    requested = []
+    session = make_area_source(cities, segments, {1: square, 2: square, 3: square}, requested)
+    first = await redalert.fetch_area_polygons(session)
+    assert sum("polygon/id" in u for u in requested) == 3
+    assert first["חיפה"]["segment_id"] == 2
+    assert first["חיפה"]["fingerprint"] == redalert.segment_fingerprint(segments["2"])
+
+    # Haifa's segment changes, Tel Aviv's shelter time changes, Givatayim leaves the city list
+    segments["2"] = {**segments["2"], "centerY": 32.83}
+    cities = [{"label": "תל אביב", "migun_time": "30"}, {"label": "חיפה", "migun_time": "60"}]
+    requested = []
+    session = make_area_source(cities, segments, {1: moved, 2: moved}, requested)
+    second = await redalert.fetch_area_polygons(session, first)
+
+    assert [u for u in requested if "polygon/id" in u] == [redalert.MESER_POLYGON_URL_TEMPLATE.format(segment_id=2)]
+    assert list(second) == ["תל אביב", "חיפה"]
+    assert second["תל אביב"]["polygon"] == square
+    assert second["תל אביב"]["migun_time"] == 30
+    assert second["חיפה"]["polygon"] == moved
+
+
+@pytest.mark.asyncio
+async def test_fetch_area_polygons_refetches_aged_polygons(monkeypatch):
+    square = [[32.0, 34.7], [32.1, 34.7], [32.1, 34.8], [32.0, 34.8]]
+    segments = {"1": {"id": 1, "name": "תל אביב"}}
+    cities = [{"label": "תל אביב", "migun_time": "90"}]
+    previous = {"תל אביב": {
+        "migun_time": 90, "polygon": square, "segment_id": 1,
+        "fingerprint": redalert.segment_fingerprint(segments["1"]),
+        "fetched_at": time.time() - redalert.AREA_POLYGON_MAX_AGE - 1,
+    }}
+    requested = []
+    session = make_area_source(cities, segments, {1: square}, requested)
+    result = await redalert.fetch_area_polygons(session, previous)
+    assert sum("polygon/id" in u for u in requested) == 1
+    assert result["תל אביב"]["fetched_at"] > previous["תל אביב"]["fetched_at"]
+
+
+@pytest.mark.asyncio
+async def test_fetch_area_polygons_failed_refetch_keeps_previous():
+    square = [[32.0, 34.7], [32.1, 34.7], [32.1, 34.8], [32.0, 34.8]]
+    segments = {"1": {"id": 1, "name": "תל אביב", "version": 2}}
+    cities = [{"label": "תל אביב", "migun_time": "45"}]
+    previous = {"תל אביב": {"migun_time": 90, "polygon": square, "segment_id": 1, "fingerprint": "outdated"}}
+    session = make_area_source(cities, segments, {}, [])
+    result = await redalert.fetch_area_polygons(session, previous)
+    assert result["תל אביב"]["polygon"] == square
+    assert result["תל אביב"]["migun_time"] == 45
+
+
+@pytest.mark.asyncio
+async def test_load_area_data_passes_previous_dataset(monkeypatch, tmp_path):
+    previous = {"old_city": {"migun_time": 30, "polygon": [[31.0, 34.0], [31.1, 34.0], [31.1, 34.1]]}}
+    f = tmp_path / "area_polygons.json"
+    f.write_text(json.dumps(previous))
+    old_time = time.time() - 90000
+    os.utime(str(f), (old_time, old_time))
+    monkeypatch.setattr(redalert, 'AREA_POLYGONS_FILE', str(f))
+    install_area_data(monkeypatch, {})
+    monkeypatch.setattr(redalert, 'area_data_loaded', False)
+
+    seen = []
+    async def mock_fetch(session, previous=None):
+        seen.append(previous)
+        return previous
+    monkeypatch.setattr(redalert, 'fetch_area_polygons', mock_fetch)
+
+    await redalert.load_area_data()
+    assert seen == [previous]
+    assert redalert.area_data_loaded is True
+
+
 @pytest.mark.asyncio
 async def test_fetch_area_polygons_cities_failure():
     async def mock_get(url, **kwargs):
@@ -978,10 +2654,61 @@ async def test_load_area_data_from_fresh_file(monkeypatch, tmp_path):
     monkeypatch.setattr(redalert, 'AREA_POLYGONS_FILE', str(f))
     monkeypatch.setattr(redalert, 'area_data_loaded', False)
     monkeypatch.setattr(redalert, 'area_bbox_index', {})
+    monkeypatch.setattr(redalert, 'area_geometries', {})
+    monkeypatch.setattr(redalert, 'area_spatial_index', None)
 
     await redalert.load_area_data()
     assert redalert.area_data_loaded is True
     assert "תל אביב" in redalert.area_bbox_index
+    assert "תל אביב" in redalert.area_geometries
+    assert redalert.area_spatial_index.names == ["תל אביב"]
+
+
+@pytest.mark.asyncio
+async def test_load_area_data_imports_json_into_binary_store(monkeypatch, tmp_path):
+    area_data = {
+        "תל אביב": {
+            "migun_time": 90,
+            "polygon": [[32.0, 34.7], [32.1, 34.7], [32.1, 34.8], [32.0, 34.8]]
+        }
+    }
+    f = tmp_path / "area_polygons.json"
+    f.write_text(json.dumps(area_data, ensure_ascii=False))
+    monkeypatch.setattr(redalert, 'AREA_POLYGONS_FILE', str(f))
+    install_area_data(monkeypatch, {})
+    monkeypatch.setattr(redalert, 'area_data_loaded', False)
+
+    loads = MagicMock(wraps=redalert.json_loads)
+    monkeypatch.setattr(redalert, 'json_loads', loads)
+    await redalert.load_area_data()
+    assert loads.call_count == 1  # cold start parses the JSON
+    assert (tmp_path / "area_polygons.bin").exists()
+    assert redalert.read_area_store(str(tmp_path / "area_polygons.bin")).names == ["תל אביב"]
+
+    # Warm start: the binary store is used and the JSON is not parsed again
+    loads.reset_mock()
+    await redalert.load_area_data()
+    loads.assert_not_called()
+    assert redalert.area_data_loaded is True
+    assert redalert.lookup_area(32.05, 34.75) == {"area": "תל אביב", "migun_time": 90}
+
+
+@pytest.mark.asyncio
+async def test_load_area_data_json_newer_than_binary(monkeypatch, tmp_path):
+    square = [[32.0, 34.7], [32.1, 34.7], [32.1, 34.8], [32.0, 34.8]]
+    f = tmp_path / "area_polygons.json"
+    monkeypatch.setattr(redalert, 'AREA_POLYGONS_FILE', str(f))
+    install_area_data(monkeypatch, {})
+    monkeypatch.setattr(redalert, 'area_data_loaded', False)
+    redalert.write_area_store(redalert.area_store_from_data({"old": {"migun_time": 1, "polygon": square}}),
+                              redalert.area_store_path())
+    old_time = time.time() - 100
+    os.utime(redalert.area_store_path(), (old_time, old_time))
+    f.write_text(json.dumps({"new": {"migun_time": 2, "polygon": square}}))
+
+    await redalert.load_area_data()
+    assert list(redalert.area_bbox_index) == ["new"]
+    assert redalert.read_area_store(redalert.area_store_path()).names == ["new"]
 
 
 @pytest.mark.asyncio
@@ -990,6 +2717,8 @@ async def test_load_area_data_fetch_and_save(monkeypatch, tmp_path):
     monkeypatch.setattr(redalert, 'AREA_POLYGONS_FILE', str(f))
     monkeypatch.setattr(redalert, 'area_data_loaded', False)
     monkeypatch.setattr(redalert, 'area_bbox_index', {})
+    monkeypatch.setattr(redalert, 'area_geometries', {})
+    monkeypatch.setattr(redalert, 'area_spatial_index', None)
 
     test_data = {
         "חיפה": {
@@ -998,7 +2727,7 @@ async def test_load_area_data_fetch_and_save(monkeypatch, tmp_path):
         }
     }
 
-    async def mock_fetch(session):
+    async def mock_fetch(session, previous=None):
         return test_data
     monkeypatch.setattr(redalert, 'fetch_area_polygons', mock_fetch)
 
@@ -1006,6 +2735,7 @@ async def test_load_area_data_fetch_and_save(monkeypatch, tmp_path):
     assert redalert.area_data_loaded is True
     assert "חיפה" in redalert.area_bbox_index
     assert f.exists()
+    assert redalert.read_area_store(str(tmp_path / "area_polygons.bin")).names == ["חיפה"]
 
 
 @pytest.mark.asyncio
@@ -1024,8 +2754,10 @@ async def test_load_area_data_fetch_fails_stale_file(monkeypatch, tmp_path):
     monkeypatch.setattr(redalert, 'AREA_POLYGONS_FILE', str(f))
     monkeypatch.setattr(redalert, 'area_data_loaded', False)
     monkeypatch.setattr(redalert, 'area_bbox_index', {})
+    monkeypatch.setattr(redalert, 'area_geometries', {})
+    monkeypatch.setattr(redalert, 'area_spatial_index', None)
 
-    async def mock_fetch(session):
+    async def mock_fetch(session, previous=None):
         return {}
     monkeypatch.setattr(redalert, 'fetch_area_polygons', mock_fetch)
 
@@ -1040,8 +2772,10 @@ async def test_load_area_data_fetch_fails_no_file(monkeypatch, tmp_path):
     monkeypatch.setattr(redalert, 'AREA_POLYGONS_FILE', str(f))
     monkeypatch.setattr(redalert, 'area_data_loaded', False)
     monkeypatch.setattr(redalert, 'area_bbox_index', {})
+    monkeypatch.setattr(redalert, 'area_geometries', {})
+    monkeypatch.setattr(redalert, 'area_spatial_index', None)
 
-    async def mock_fetch(session):
+    async def mock_fetch(session, previous=None):
         return {}
     monkeypatch.setattr(redalert, 'fetch_area_polygons', mock_fetch)
 
@@ -1049,6 +2783,58 @@ async def test_load_area_data_fetch_fails_no_file(monkeypatch, tmp_path):
     assert redalert.area_data_loaded is False
 
 
+@pytest.mark.asyncio
+async def test_load_area_data_failure_keeps_current_index(monkeypatch, tmp_path):
+    square = [[32.0, 34.7], [32.1, 34.7], [32.1, 34.8], [32.0, 34.8]]
+    monkeypatch.setattr(redalert, 'AREA_POLYGONS_FILE', str(tmp_path / "area_polygons.json"))
+    install_area_data(monkeypatch, {"current": {"migun_time": 90, "polygon": square}})
+    monkeypatch.setattr(redalert, 'area_data_loaded', True)
+
+    async def mock_fetch(session, previous=None):
+        return {}
+    monkeypatch.setattr(redalert, 'fetch_area_polygons', mock_fetch)
+
+    await redalert.load_area_data()
+    assert redalert.area_data_loaded is True
+    assert redalert.lookup_area(32.05, 34.75) == {"area": "current", "migun_time": 90}
+
+
+@pytest.mark.asyncio
+async def test_load_area_data_rebuild_does_not_stall_event_loop(monkeypatch, tmp_path):
+    """A slow index rebuild must not delay a concurrent 1 s-style poll loop."""
+    square = [[32.0, 34.7], [32.1, 34.7], [32.1, 34.8], [32.0, 34.8]]
+    f = tmp_path / "area_polygons.json"
+    f.write_text(json.dumps({"new": {"migun_time": 90, "polygon": square}}))
+    monkeypatch.setattr(redalert, 'AREA_POLYGONS_FILE', str(f))
+    install_area_data(monkeypatch, {"old": {"migun_time": 10, "polygon": square}})
+    monkeypatch.setattr(redalert, 'area_data_loaded', True)
+
+    original_build = redalert.build_area_index
+    def slow_build(*args, **kwargs):
+        time.sleep(0.5)  # blocking work, as a large GEOS build would be
+        return original_build(*args, **kwargs)
+    monkeypatch.setattr(redalert, 'build_area_index', slow_build)
+
+    ticks = []
+    lookups_during_rebuild = []
+    async def poll_loop():
+        while True:
+            ticks.append(time.monotonic())
+            lookups_during_rebuild.append(redalert.lookup_area(32.05, 34.75))
+            await asyncio.sleep(0.02)
+
+    poller = asyncio.create_task(poll_loop())
+    await redalert.load_area_data()
+    poller.cancel()
+
+    gaps = [b - a for a, b in zip(ticks, ticks[1:])]
+    assert len(ticks) > 10
+    assert max(gaps) < 0.2
+    # The old index kept answering until the new one was swapped in
+    assert lookups_during_rebuild[0] == {"area": "old", "migun_time": 10}
+    assert redalert.lookup_area(32.05, 34.75) == {"area": "new", "migun_time": 90}
+
+
 @pytest.mark.asyncio
 async def test_area_refresh_loop(monkeypatch):
     call_count = 0
@@ -1109,7 +2895,7 @@ async def test_run_health_server_registers_area_route(monkeypatch):
     mock_runner = AsyncMock()
     mock_site = AsyncMock()
 
-    monkeypatch.setattr(redalert.aiohttp.web, 'Application', lambda: mock_app)
+    monkeypatch.setattr(redalert.aiohttp.web, 'Application', lambda **kw: mock_app)
     monkeypatch.setattr(redalert.aiohttp.web, 'AppRunner', lambda *a, **kw: mock_runner)
     monkeypatch.setattr(redalert.aiohttp.web, 'TCPSite', lambda runner, host, port: mock_site)
 
@@ -1127,6 +2913,11 @@ async def test_run_health_server_registers_area_route(monkeypatch):
     routes = [call[0][0] for call in add_get_calls]
     assert "/health" in routes
     assert "/area" in routes
+    assert "/stats" in routes
+    assert "/alerts/recent" in routes
+    assert "/metrics" in routes
+    post_routes = [call[0][0] for call in mock_app.router.add_post.call_args_list]
+    assert "/area/batch" in post_routes
 
 
 @pytest.mark.asyncio
@@ -1185,7 +2976,7 @@ def test_lookup_area_polygon_too_few_points(monkeypatch, tmp_path):
     f = tmp_path / "area_polygons.json"
     f.write_text(json.dumps(area_data, ensure_ascii=False))
     monkeypatch.setattr(redalert, 'AREA_POLYGONS_FILE', str(f))
-    monkeypatch.setattr(redalert, 'area_bbox_index', redalert.build_bbox_index(area_data))
+    install_area_data(monkeypatch, area_data)
 
     result = redalert.lookup_area(32.05, 34.75)
     assert result is None